@@ -0,0 +1,131 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+
+
+# ==========================================
+# 💬 Semantic Answer Cache
+# ==========================================
+#
+# Scoped per (user_id, thread_id, doc_id). An entry matches a new question
+# when the question embeddings are within the cosine threshold AND the
+# retrieval returned exactly the same chunk ids. Entries remember the
+# thread's index version, so adding documents invalidates them.
+
+class AnswerCache:
+
+    def __init__(self, threshold, ttl_seconds, max_entries):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._scopes = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, scope, version, question_embedding, chunk_ids):
+        """
+        Return (answer, similarity) for a matching entry, or None.
+        """
+
+        query = self._normalize(question_embedding)
+        chunk_ids = frozenset(chunk_ids)
+        now = time.time()
+
+        with self._lock:
+            best = None
+
+            for entry_id in list(self._scopes.get(scope, ())):
+                entry = self._entries[entry_id]
+
+                if entry["version"] != version:
+                    self._drop(entry_id)
+                    self.invalidations += 1
+                    continue
+
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._drop(entry_id)
+                    self.evictions += 1
+                    continue
+
+                if entry["chunk_ids"] != chunk_ids:
+                    continue
+
+                similarity = float(np.dot(query, entry["embedding"]))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (entry_id, similarity)
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best[0])
+            self.hits += 1
+            return self._entries[best[0]]["answer"], best[1]
+
+    def put(self, scope, version, question_embedding, chunk_ids, answer):
+        with self._lock:
+            entry_id = next(self._ids)
+
+            self._entries[entry_id] = {
+                "scope": scope,
+                "version": version,
+                "embedding": self._normalize(question_embedding),
+                "chunk_ids": frozenset(chunk_ids),
+                "answer": answer,
+                "created_at": time.time()
+            }
+            self._scopes.setdefault(scope, []).append(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_thread(self, user_id, thread_id):
+        with self._lock:
+            for scope in [s for s in self._scopes if s[:2] == (user_id, thread_id)]:
+                for entry_id in list(self._scopes[scope]):
+                    self._drop(entry_id)
+                    self.invalidations += 1
+
+    def _drop(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        scope_ids = self._scopes[entry["scope"]]
+        scope_ids.remove(entry_id)
+        if not scope_ids:
+            del self._scopes[entry["scope"]]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+answer_cache = AnswerCache(ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES)
@@ -32,4 +32,39 @@ def chunk_text(text: str):
         separators=["\n\n", "\n", ".", " ", ""]
     )
 
-    return splitter.split_text(text)
\ No newline at end of file
+    return splitter.split_text(text)
+
+def iter_chunks(pages, chunk_size: int, chunk_overlap: int):
+    """
+    Incremental version of chunk_text for a stream of page texts.
+
+    Text is buffered until it holds a few chunks' worth, split, and all
+    but the last chunk are emitted. The last (possibly incomplete) chunk
+    is carried into the next split, so chunks follow the same size and
+    overlap rules as chunk_text while memory stays bounded by the buffer.
+    """
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ".", " ", ""]
+    )
+
+    flush_at = chunk_size * 8
+    buffer = ""
+
+    for page_text in pages:
+        buffer += page_text + "\n"
+
+        if len(buffer) < flush_at:
+            continue
+
+        chunks = splitter.split_text(buffer)
+        if len(chunks) < 2:
+            continue
+
+        yield from chunks[:-1]
+        buffer = chunks[-1]
+
+    if buffer.strip():
+        yield from splitter.split_text(buffer)
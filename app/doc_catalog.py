@@ -0,0 +1,103 @@
+import time
+
+from app.thread_store import get_connection
+from app.vector_store import add_embeddings, get_document_vectors
+
+
+# =========================
+# Document Catalog
+# =========================
+#
+# Maps a user's uploaded file content (sha256 of the PDF bytes) to the
+# threads/doc_ids where it is already indexed, so re-uploading the same
+# PDF into another thread can reuse its chunks and vectors.
+
+def init_catalog_table():
+    conn = get_connection()
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS documents (
+        user_id TEXT,
+        content_hash TEXT,
+        thread_id TEXT,
+        doc_id TEXT,
+        filename TEXT,
+        chunks INTEGER,
+        created_at REAL,
+        PRIMARY KEY (user_id, content_hash, thread_id)
+    )
+    """)
+
+    conn.commit()
+
+
+def register_document(user_id, content_hash, thread_id, doc_id, filename, chunks):
+    conn = get_connection()
+
+    with conn:
+        conn.execute("""
+        INSERT OR REPLACE INTO documents
+            (user_id, content_hash, thread_id, doc_id, filename, chunks, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, content_hash, thread_id, doc_id, filename, chunks, time.time()))
+
+
+def find_document(user_id, content_hash, thread_id=None):
+    """
+    Look up an indexed copy of this content for the user, preferring one
+    already in `thread_id`.
+    """
+
+    conn = get_connection()
+
+    row = conn.execute("""
+    SELECT thread_id, doc_id, filename, chunks FROM documents
+    WHERE user_id = ? AND content_hash = ?
+    ORDER BY thread_id = ? DESC, created_at
+    LIMIT 1
+    """, (user_id, content_hash, thread_id)).fetchone()
+
+    if row is None:
+        return None
+
+    return {"thread_id": row[0], "doc_id": row[1], "filename": row[2], "chunks": row[3]}
+
+
+def forget_document(user_id, content_hash, thread_id):
+    conn = get_connection()
+
+    with conn:
+        conn.execute("""
+        DELETE FROM documents
+        WHERE user_id = ? AND content_hash = ? AND thread_id = ?
+        """, (user_id, content_hash, thread_id))
+
+
+def attach_document(user_id, content_hash, source, thread_id, doc_id, filename):
+    """
+    Copy an already indexed document (chunks + vectors) from its source
+    thread into `thread_id` under a new doc_id. No translation or model
+    inference is involved. Returns the number of chunks attached.
+
+    Returns 0 if the source thread no longer holds the document; its
+    catalog row is removed so the upload can be ingested instead.
+    """
+
+    chunks, vectors = get_document_vectors(user_id, source["thread_id"], source["doc_id"])
+
+    if not chunks:
+        forget_document(user_id, content_hash, source["thread_id"])
+        return 0
+
+    add_embeddings(
+        user_id=user_id,
+        thread_id=thread_id,
+        doc_id=doc_id,
+        embeddings=vectors,
+        chunks=chunks,
+        filename=filename
+    )
+
+    register_document(user_id, content_hash, thread_id, doc_id, filename, len(chunks))
+
+    return len(chunks)
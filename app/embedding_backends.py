@@ -0,0 +1,249 @@
+import os
+import threading
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+# Known up front so the cache and vector store don't have to load a model
+EMBEDDING_DIMENSION = 384
+MAX_SEQ_LENGTH = 256
+
+# "sentence_transformers" (PyTorch, default) or "onnx"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence_transformers")
+# Directory written by `python -m app.embedding_backends export`
+ONNX_MODEL_DIR = os.getenv("EMBEDDING_ONNX_DIR", "models/all-MiniLM-L6-v2-onnx")
+ONNX_QUANTIZED = os.getenv("EMBEDDING_ONNX_INT8", "1") == "1"
+ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+# Load the model during app startup instead of on the first request
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "1") == "1"
+
+
+# ==========================================
+# 🧩 Backend Interface
+# ==========================================
+
+class EmbeddingBackend:
+    """
+    Turns texts into unit-length float32 vectors of `dimension` values.
+
+    Heavy imports and model weights are loaded on first use (or by
+    load()), never at import time. `name` identifies the model and
+    runtime, and is part of every embedding cache key.
+    """
+
+    name = None
+    dimension = EMBEDDING_DIMENSION
+
+    def __init__(self):
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def encode(self, texts, batch_size):
+        """
+        Encode texts in order. Callers sort by length; batches are taken
+        as given.
+        """
+
+        self.load()
+        return self._encode(texts, batch_size)
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _encode(self, texts, batch_size):
+        raise NotImplementedError
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+
+    def __init__(self, model_name=MODEL_NAME):
+        super().__init__()
+        # Same name as before backends existed, so cached vectors stay valid
+        self.name = model_name
+        self.model_name = model_name
+        self.model = None
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(self.model_name, device="cpu")
+
+    def _encode(self, texts, batch_size):
+        vectors = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.asarray(vectors, dtype="float32")
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    The same MiniLM network exported to ONNX (optionally int8 dynamic
+    quantized) and run with ONNX Runtime: mean pooling over the attention
+    mask followed by L2 normalisation, like the sentence-transformers
+    pipeline.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, model_name=MODEL_NAME):
+        super().__init__()
+        self.model_dir = model_dir
+        self.quantized = quantized
+        self.name = f"{model_name}:onnx-{'int8' if quantized else 'fp32'}"
+        self.session = None
+        self.tokenizer = None
+
+    def _load(self):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_file = "model_int8.onnx" if self.quantized else "model.onnx"
+        model_path = os.path.join(self.model_dir, model_file)
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found; run `python -m app.embedding_backends export`"
+            )
+
+        options = onnxruntime.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def _encode(self, texts, batch_size):
+        vectors = np.empty((len(texts), self.dimension), dtype="float32")
+
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[start:start + batch_size]))
+
+            feed = {
+                "input_ids": np.array([e.ids for e in encodings], dtype="int64"),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype="int64"),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype="int64")
+            }
+            feed = {k: v for k, v in feed.items() if k in self._inputs}
+
+            token_vectors = self.session.run(None, feed)[0]
+
+            mask = feed["attention_mask"][..., None].astype("float32")
+            pooled = (token_vectors * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+            vectors[start:start + len(encodings)] = pooled
+
+        return vectors
+
+
+# ==========================================
+# 🔌 Process-Wide Backend
+# ==========================================
+
+BACKENDS = {
+    "sentence_transformers": SentenceTransformerBackend,
+    "onnx": OnnxBackend
+}
+
+_backend = None
+_backend_guard = threading.Lock()
+
+
+def get_backend():
+    """
+    The configured backend. Constructing it is cheap; weights load on
+    first encode or in warm_up().
+    """
+
+    global _backend
+
+    with _backend_guard:
+        if _backend is None:
+            if EMBEDDING_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+            _backend = BACKENDS[EMBEDDING_BACKEND]()
+
+        return _backend
+
+
+def warm_up():
+    """
+    Load the model and run one tiny batch so the first real request
+    doesn't pay for weight loading or kernel initialisation.
+    """
+
+    backend = get_backend()
+    backend.encode(["warm up"], 1)
+    return backend
+
+
+# ==========================================
+# 📦 ONNX Export
+# ==========================================
+
+def export_onnx(out_dir=ONNX_MODEL_DIR, model_name=MODEL_NAME):
+    """
+    Export the transformer to ONNX and write an int8 dynamically
+    quantized copy plus the tokenizer. Needs torch, sentence-transformers
+    and onnxruntime; serving only needs onnxruntime and tokenizers.
+    """
+
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(out_dir, "model.onnx")
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in names),
+            model_path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=14
+        )
+
+    quantize_dynamic(model_path, os.path.join(out_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, "tokenizer.json"))
+
+    return out_dir
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] != ["export"]:
+        raise SystemExit("usage: python -m app.embedding_backends export [OUT_DIR]")
+
+    print(f"Exported to {export_onnx(*sys.argv[2:3])}")
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+
+CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+CACHE_CAPACITY = int(os.getenv("EMBEDDING_CACHE_CAPACITY", "100000"))
+
+
+# ==========================================
+# 🔑 Cache Keys
+# ==========================================
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_key(model_name: str, text: str) -> bytes:
+    payload = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+# ==========================================
+# 🧮 Embedding Cache (Memory-Mapped Vectors)
+# ==========================================
+#
+# Vectors live in one float32 memmap of `capacity` slots; a SQLite table
+# maps key -> slot. Slots are reused in ring order, so the oldest
+# entries are evicted first once the cache is full.
+#
+# Other processes share both files, so a slot is only written once no
+# committed key refers to it: writes reserve their slots (evicting the
+# old keys) in one transaction, fill them, then publish the new keys.
+
+class EmbeddingCache:
+
+    def __init__(self, cache_dir, dimension, capacity):
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.dimension = dimension
+        self.capacity = capacity
+        self._lock = threading.Lock()
+
+        vectors_path = os.path.join(cache_dir, f"vectors_{dimension}.f32")
+        size = capacity * dimension * np.dtype("float32").itemsize
+
+        # Created, or grown after EMBEDDING_CACHE_CAPACITY was raised
+        if not os.path.exists(vectors_path) or os.path.getsize(vectors_path) < size:
+            with open(vectors_path, "ab") as f:
+                f.truncate(size)
+
+        self._vectors = np.memmap(vectors_path, dtype="float32", mode="r+", shape=(capacity, dimension))
+
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, f"index_{dimension}.db"),
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+            key BLOB PRIMARY KEY,
+            slot INTEGER UNIQUE
+        )
+        """)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            name TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        """)
+        self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('next_slot', 0)")
+
+        # Entries past a lowered capacity point outside the memmap
+        self._conn.execute("DELETE FROM entries WHERE slot >= ?", (capacity,))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, keys):
+        """
+        Return {key: vector} for the keys present in the cache.
+        """
+
+        if not keys:
+            return {}
+
+        found = {}
+
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+
+                for key, slot in rows:
+                    # Written by a process configured with a larger capacity
+                    if slot < self.capacity:
+                        found[bytes(key)] = np.array(self._vectors[slot])
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, keys, vectors):
+        # Later duplicates win; a batch larger than the ring keeps its tail
+        pending = dict(zip(keys, vectors))
+        pending = list(pending.items())[-self.capacity:]
+
+        if not pending:
+            return
+
+        with self._lock:
+            slots = self._reserve_slots(len(pending))
+
+            for (_, vector), slot in zip(pending, slots):
+                self._vectors[slot] = vector
+            self._vectors.flush()
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, slot) VALUES (?, ?)",
+                    [(key, slot) for (key, _), slot in zip(pending, slots)]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _reserve_slots(self, count):
+        """
+        Take the next `count` ring slots and evict the keys stored in
+        them, so nothing reads those slots while they are rewritten.
+        """
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            next_slot = self._conn.execute(
+                "SELECT value FROM meta WHERE name = 'next_slot'"
+            ).fetchone()[0]
+
+            slots = [(next_slot + offset) % self.capacity for offset in range(count)]
+
+            self.evictions += self._conn.executemany(
+                "DELETE FROM entries WHERE slot = ?", [(slot,) for slot in slots]
+            ).rowcount
+            self._conn.execute(
+                "UPDATE meta SET value = ? WHERE name = 'next_slot'", (next_slot + count,)
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        return slots
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                "entries": entries,
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions
+            }
@@ -1,6 +1,80 @@
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+from app.embedding_backends import get_backend, warm_up
+from app.embedding_cache import CACHE_CAPACITY, CACHE_DIR, EmbeddingCache, embedding_key
 
-def generate_embedding(text: str):
-    return model.encode(text).tolist()
\ No newline at end of file
+DEFAULT_BATCH_SIZE = 64
+
+# The model itself is loaded lazily by the backend (see warm_up)
+embedding_cache = EmbeddingCache(CACHE_DIR, get_backend().dimension, CACHE_CAPACITY)
+
+
+def _encode(texts, batch_size):
+    """
+    Run the model over texts, sorted by length so each forward pass pads
+    to a similar length, and return vectors in input order.
+    """
+
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    sorted_texts = [texts[i] for i in order]
+
+    sorted_vectors = get_backend().encode(sorted_texts, batch_size)
+
+    vectors = np.empty_like(sorted_vectors, dtype="float32")
+    vectors[order] = sorted_vectors
+
+    return vectors
+
+
+def generate_embeddings_with_stats(texts, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Embed many texts at once, returning (vectors, stats).
+
+    Identical texts (after whitespace normalisation) are embedded once,
+    and vectors already in the embedding cache are not recomputed.
+    `vectors` is one contiguous float32 array of shape (len(texts), dim).
+    """
+
+    texts = list(texts)
+    backend = get_backend()
+    dimension = backend.dimension
+
+    stats = {"texts": len(texts), "unique": 0, "cache_hits": 0, "encoded": 0, "passes_saved": 0}
+
+    if not texts:
+        return np.empty((0, dimension), dtype="float32"), stats
+
+    # Backends produce slightly different vectors, so each has its own keys
+    keys = [embedding_key(backend.name, t) for t in texts]
+
+    # Dedupe within the batch: first text seen for each key is encoded
+    unique = {}
+    for key, text in zip(keys, texts):
+        unique.setdefault(key, text)
+
+    cached = embedding_cache.get_many(list(unique))
+    missing = [key for key in unique if key not in cached]
+
+    if missing:
+        computed = _encode([unique[key] for key in missing], batch_size)
+        embedding_cache.put_many(missing, computed)
+        cached.update(zip(missing, computed))
+
+    vectors = np.empty((len(texts), dimension), dtype="float32")
+    for row, key in enumerate(keys):
+        vectors[row] = cached[key]
+
+    stats["unique"] = len(unique)
+    stats["cache_hits"] = len(unique) - len(missing)
+    stats["encoded"] = len(missing)
+    stats["passes_saved"] = len(texts) - len(missing)
+
+    return vectors, stats
+
+
+def generate_embeddings(texts, batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+    return generate_embeddings_with_stats(texts, batch_size)[0]
+
+
+def generate_embedding(text: str) -> np.ndarray:
+    return generate_embeddings([text])[0]
@@ -0,0 +1,64 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# ==========================================
+# ⚙️ Execution Pools
+# ==========================================
+#
+# Async endpoints must never block the event loop. Blocking work is
+# routed to one of three bounded pools:
+#   IO   – outbound HTTP (Sarvam, Gemini), sqlite, FAISS file reads
+#   CPU  – embedding inference (torch/FAISS release the GIL)
+#   PDF  – pdfplumber parsing, pure Python, so it gets its own processes
+
+IO_WORKERS = int(os.getenv("IO_WORKERS", "32"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 2)))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+
+io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+_pdf_pool = None
+
+
+def get_pdf_pool():
+    # Created lazily so importing the app doesn't fork worker processes
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pdf_pool
+
+
+async def _run(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_io(func, *args, **kwargs):
+    return await _run(io_pool, func, *args, **kwargs)
+
+
+async def run_cpu(func, *args, **kwargs):
+    return await _run(cpu_pool, func, *args, **kwargs)
+
+
+def queue_depths():
+    """
+    Tasks submitted to each thread pool but not yet picked up by a worker.
+    """
+
+    # ThreadPoolExecutor exposes no public size, its work queue is a SimpleQueue
+    return {
+        "io_pool": io_pool._work_queue.qsize(),
+        "cpu_pool": cpu_pool._work_queue.qsize()
+    }
+
+
+def shutdown():
+    io_pool.shutdown(wait=False)
+    cpu_pool.shutdown(wait=False)
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False)
@@ -1,42 +1,115 @@
 from google import genai
+import json
 import os
+import threading
+import time
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY not found")
+from app.metrics import LLM_TOKENS, OUTBOUND_ERRORS, OUTBOUND_SECONDS
 
-client = genai.Client(api_key=GOOGLE_API_KEY)
+# Overrides the API endpoint, e.g. a local stand-in (benchmarks/gemini_stub.py)
+GEMINI_API_URL = os.getenv("GEMINI_API_URL")
 
 CHAT_MODEL = "models/gemini-2.5-flash"
 
-def generate_answer(context: str, question: str):
+_client = None
+_client_guard = threading.Lock()
 
-    prompt = f"""
-    You are a helpful assistant.
-    Explain the following document content in simple language.
-    Provide a detailed and complete answer using all relevant information from the document context.
-    Do not shorten the response.
 
-    Context:
-    {context}
+def get_client():
+    """
+    Create the Gemini client on first use, so importing this module
+    doesn't need GOOGLE_API_KEY.
+    """
+
+    global _client
+
+    with _client_guard:
+        if _client is None:
+            api_key = os.getenv("GOOGLE_API_KEY")
+
+            if not api_key:
+                raise ValueError("GOOGLE_API_KEY not found")
+
+            http_options = {"base_url": GEMINI_API_URL} if GEMINI_API_URL else None
+            _client = genai.Client(api_key=api_key, http_options=http_options)
+
+        return _client
 
-    Question:
-    {question}
+
+def record_usage(call, usage):
+    # usage_metadata as reported by the API; absent on some error paths
+    if usage is None:
+        return
+
+    LLM_TOKENS.inc(usage.prompt_token_count or 0, call, "input")
+    LLM_TOKENS.inc(usage.candidates_token_count or 0, call, "output")
+
+
+def _generate(call, **kwargs):
+    """
+    One timed generate_content call, with its token usage recorded.
     """
 
-    response = client.models.generate_content(
-        model=CHAT_MODEL,
-        contents=prompt,
-        config={
-            "temperature": 0.2,
-            "top_p": 0.9,
-            "max_output_tokens": 8000
-        }
-    )
+    with OUTBOUND_SECONDS.time("gemini", call):
+        try:
+            response = get_client().models.generate_content(model=CHAT_MODEL, **kwargs)
+        except Exception:
+            OUTBOUND_ERRORS.inc(1, "gemini", call)
+            raise
+
+    record_usage(call, response.usage_metadata)
+
+    return response
+
+ANSWER_CONFIG = {
+    "temperature": 0.2,
+    "top_p": 0.9,
+    "max_output_tokens": 8000
+}
+
+
+def generate_answer(prompt: str):
+    """
+    Send a fully assembled prompt (see app.prompt_builder) as-is.
+    """
+
+    response = _generate("answer", contents=prompt, config=ANSWER_CONFIG)
 
     return response.text
 
+
+def stream_answer(prompt: str):
+    """
+    Same as generate_answer, but yields text pieces as Gemini produces them.
+    """
+
+    start = time.perf_counter()
+    first = True
+    usage = None
+
+    try:
+        stream = get_client().models.generate_content_stream(
+            model=CHAT_MODEL,
+            contents=prompt,
+            config=ANSWER_CONFIG
+        )
+
+        for chunk in stream:
+            # Every chunk carries the running totals; the last one wins
+            usage = chunk.usage_metadata or usage
+
+            if chunk.text:
+                if first:
+                    OUTBOUND_SECONDS.observe(time.perf_counter() - start, "gemini", "answer_stream_first_token")
+                    first = False
+                yield chunk.text
+    except Exception:
+        OUTBOUND_ERRORS.inc(1, "gemini", "answer_stream")
+        raise
+    finally:
+        OUTBOUND_SECONDS.observe(time.perf_counter() - start, "gemini", "answer_stream")
+        record_usage("answer_stream", usage)
+
 def summarize_conversation(summary: str, messages: list):
 
     conversation_text = ""
@@ -56,30 +129,33 @@ New conversation:
 Create an updated concise summary preserving important context.
 """
 
-    response = client.models.generate_content(
-        model=CHAT_MODEL,
-        contents=prompt
-    )
+    response = _generate("summarize", contents=prompt)
 
     return response.text
 
-import json
-from google import genai
 
-client = genai.Client(api_key=GOOGLE_API_KEY)
+def extract_structured_memory(messages):
+    """
+    Extract long-term user facts from one message or a batch of messages
+    (oldest first). Returns a single dict; later messages win on conflicts.
+    """
 
-CHAT_MODEL = "models/gemini-2.5-flash"
+    if isinstance(messages, str):
+        messages = [messages]
 
+    message_text = "\n".join(
+        f"{n}. {message}" for n, message in enumerate(messages, start=1)
+    )
 
-def extract_structured_memory(message: str):
     prompt = f"""
 You are a memory extraction engine.
 
-Extract permanent user facts from the message.
+Extract permanent user facts from the messages.
 
 Rules:
 - Only extract factual, long-term information.
 - Ignore temporary statements.
+- Messages are in chronological order; if they conflict, keep the latest.
 - Return ONLY valid JSON.
 - If nothing important, return empty JSON {{}}.
 
@@ -91,16 +167,13 @@ Possible fields:
 - goals
 - location
 
-Message:
-{message}
+Messages:
+{message_text}
 """
 
-    response = client.models.generate_content(
-        model=CHAT_MODEL,
-        contents=prompt
-    )
+    response = _generate("extract_memory", contents=prompt)
 
     try:
         return json.loads(response.text.strip())
     except:
-        return {}
\ No newline at end of file
+        return {}
@@ -0,0 +1,290 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from app.chunking import get_dynamic_chunk_params, iter_chunks
+from app.embedding_utils import generate_embeddings_with_stats
+from app.executors import PDF_WORKERS, get_pdf_pool
+from app.metrics import OPERATION_SECONDS, STAGE_SECONDS
+from app.pdf_utils import count_pdf_pages, extract_pages
+from app.sarvam_utils import translate_document_to_english
+from app.vector_store import add_embeddings
+
+# Bounded queues between stages keep memory flat regardless of PDF size
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "128"))
+# Chunks per index commit. A commit writes only its own vectors (a delta
+# file, see vector_store), so its cost doesn't grow with the thread;
+# committing as we go keeps memory flat and lets a resumed job skip
+# everything already indexed
+WRITE_BATCH = int(os.getenv("INGEST_WRITE_BATCH", "1024"))
+TRANSLATE_PAGES = int(os.getenv("INGEST_TRANSLATE_PAGES", "8"))
+# Pages parsed per PDF process pool task
+EXTRACT_PAGES = int(os.getenv("INGEST_EXTRACT_PAGES", "8"))
+DETECT_CHARS = 2000
+
+_DONE = object()
+
+
+def detect_language(text: str) -> str:
+    try:
+        from langdetect import detect
+        return detect(text[:DETECT_CHARS])  # detect using first 2000 chars
+    except:
+        return "unknown"
+
+
+# ==========================================
+# 🧵 Pipeline Plumbing
+# ==========================================
+
+class _Pipeline:
+    """
+    Runs generator stages in threads connected by bounded queues.
+    The first failure stops every stage and is re-raised by run().
+    """
+
+    def __init__(self):
+        self.error = None
+        self.stopped = threading.Event()
+
+    def put(self, q, item):
+        while not self.stopped.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def drain(self, q):
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if self.stopped.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def stage(self, produce, out_q):
+        def run():
+            try:
+                for item in produce():
+                    if self.stopped.is_set():
+                        return
+                    self.put(out_q, item)
+            except BaseException as e:
+                self.error = e
+                self.stopped.set()
+            finally:
+                self.put(out_q, _DONE)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+# ==========================================
+# 📥 Streaming PDF Ingestion
+# ==========================================
+
+def ingest_pdf(file_path, user_id, thread_id, doc_id, filename=None, info=None, skip_chunks=0, on_indexed=None):
+    """
+    pages -> (translate) -> chunks -> batched embeddings -> index append.
+
+    Each arrow is a bounded queue, so extraction, translation, embedding
+    and index writes overlap and only a few batches are in memory at once.
+
+    `info` (optional dict) is updated live with stage/pages/chunks so a
+    caller can report progress. `skip_chunks` resumes an interrupted run:
+    chunking is deterministic, so the first `skip_chunks` chunks (already
+    indexed) are not embedded or written again. `on_indexed(info)` is
+    called after every index write.
+    """
+
+    start = time.perf_counter()
+    pipeline = _Pipeline()
+
+    total_pages = count_pdf_pages(file_path)
+
+    pages_q = queue.Queue(QUEUE_SIZE)
+    english_q = queue.Queue(QUEUE_SIZE)
+    chunks_q = queue.Queue(QUEUE_SIZE)
+    vectors_q = queue.Queue(QUEUE_SIZE)
+
+    info = info if info is not None else {}
+    info.update({
+        "stage": "extracting",
+        "language": "unknown",
+        "pages": 0,
+        "total_pages": total_pages,
+        "chunks": skip_chunks,
+        "passes_saved": 0
+    })
+
+    # ===============================
+    # 1️⃣ Extract pages
+    # ===============================
+    def extract():
+        # pdfplumber is pure Python; parsing in the PDF processes keeps it
+        # from holding the API process's GIL. A few page ranges are in
+        # flight at once, and pages still come out in order.
+        pool = get_pdf_pool()
+        pending = deque()
+        ranges = deque((first, min(first + EXTRACT_PAGES, total_pages))
+                       for first in range(0, total_pages, EXTRACT_PAGES))
+
+        try:
+            while ranges or pending:
+                while ranges and len(pending) <= PDF_WORKERS:
+                    pending.append(pool.submit(extract_pages, file_path, *ranges.popleft()))
+
+                for page_text, seconds in pending.popleft().result():
+                    OPERATION_SECONDS.observe(seconds, "pdf_extract_page")
+                    info["pages"] += 1
+                    if page_text:
+                        yield page_text
+        finally:
+            for future in pending:
+                future.cancel()
+
+    # ===============================
+    # 2️⃣ Detect language + translate
+    # ===============================
+    # English text goes downstream as (text, pages it covers)
+    def translate_group(group):
+        with STAGE_SECONDS.time("ingest", "translate"):
+            return translate_document_to_english("\n\n".join(group)), len(group)
+
+    def translate():
+        pages = pipeline.drain(pages_q)
+
+        # Buffer just enough leading pages to detect the language
+        head = []
+        for page_text in pages:
+            head.append(page_text)
+            if sum(len(p) for p in head) >= DETECT_CHARS:
+                break
+
+        info["language"] = detect_language("\n".join(head)) if head else "unknown"
+        info["stage"] = "embedding" if info["language"] == "en" else "translating"
+
+        def all_pages():
+            yield from head
+            yield from pages
+
+        if info["language"] == "en":
+            for page_text in all_pages():
+                yield page_text, 1
+            return
+
+        # Translate a few pages per call so their pieces go out in parallel
+        group = []
+        for page_text in all_pages():
+            group.append(page_text)
+            if len(group) >= TRANSLATE_PAGES:
+                yield translate_group(group)
+                group = []
+        if group:
+            yield translate_group(group)
+
+    # ===============================
+    # 3️⃣ Chunk
+    # ===============================
+    def chunk():
+        pages = pipeline.drain(english_q)
+
+        first = next(pages, None)
+        if first is None:
+            return
+
+        # Size chunks for the whole document, estimated from the first
+        # page (or translated group of pages)
+        first_text, first_pages = first
+        chunk_size, chunk_overlap = get_dynamic_chunk_params(len(first_text) * total_pages // first_pages)
+
+        def all_pages():
+            yield first_text
+            for text, _ in pages:
+                yield text
+
+        for position, chunk_text in enumerate(iter_chunks(all_pages(), chunk_size, chunk_overlap)):
+            if position >= skip_chunks:
+                yield chunk_text
+
+    # ===============================
+    # 4️⃣ Embed in batches
+    # ===============================
+    def embed():
+        batch = []
+        for chunk_text in pipeline.drain(chunks_q):
+            batch.append(chunk_text)
+            if len(batch) >= EMBED_BATCH:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def embed_batches():
+        for batch in embed():
+            with STAGE_SECONDS.time("ingest", "embed"):
+                vectors, stats = generate_embeddings_with_stats(batch)
+            info["passes_saved"] += stats["passes_saved"]
+            yield batch, vectors
+
+    pipeline.stage(extract, pages_q)
+    pipeline.stage(translate, english_q)
+    pipeline.stage(chunk, chunks_q)
+    pipeline.stage(embed_batches, vectors_q)
+
+    # ===============================
+    # 5️⃣ Append to the thread index
+    # ===============================
+    pending_chunks = []
+    pending_vectors = []
+
+    def flush():
+        if not pending_chunks:
+            return
+
+        with STAGE_SECONDS.time("ingest", "index_write"):
+            add_embeddings(
+                user_id=user_id,
+                thread_id=thread_id,
+                doc_id=doc_id,
+                embeddings=np.concatenate(pending_vectors),
+                chunks=list(pending_chunks),
+                filename=filename
+            )
+        info["chunks"] += len(pending_chunks)
+        pending_chunks.clear()
+        pending_vectors.clear()
+
+        if on_indexed:
+            on_indexed(info)
+
+    try:
+        for batch, vectors in pipeline.drain(vectors_q):
+            pending_chunks.extend(batch)
+            pending_vectors.append(vectors)
+            if len(pending_chunks) >= WRITE_BATCH:
+                flush()
+
+        if pipeline.error is not None:
+            raise pipeline.error
+
+        flush()
+    finally:
+        pipeline.stopped.set()
+
+    info["stage"] = "done"
+    info["elapsed_s"] = round(time.perf_counter() - start, 3)
+    STAGE_SECONDS.observe(time.perf_counter() - start, "ingest", "document")
+
+    return info
@@ -0,0 +1,332 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+
+from app.answer_cache import answer_cache
+from app.doc_catalog import register_document
+from app.ingest import ingest_pdf
+from app.thread_store import get_connection
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "2"))
+# A running job with no heartbeat for this long is assumed dead and requeued
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+
+
+# =========================
+# Job Table
+# =========================
+
+def init_jobs_table():
+    conn = get_connection()
+
+    # Run by every API worker: the write lock keeps two of them from both
+    # seeing a column missing and adding it
+    conn.execute("BEGIN IMMEDIATE")
+
+    try:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_jobs (
+            job_id TEXT PRIMARY KEY,
+            user_id TEXT,
+            thread_id TEXT,
+            doc_id TEXT,
+            filename TEXT,
+            file_path TEXT,
+            content_hash TEXT,
+            status TEXT,
+            stage TEXT,
+            language TEXT,
+            total_pages INTEGER DEFAULT 0,
+            pages_processed INTEGER DEFAULT 0,
+            chunks_indexed INTEGER DEFAULT 0,
+            error TEXT,
+            result TEXT,
+            created_at REAL,
+            started_at REAL,
+            heartbeat_at REAL,
+            finished_at REAL
+        )
+        """)
+
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(ingest_jobs)")}
+        if "content_hash" not in columns:
+            conn.execute("ALTER TABLE ingest_jobs ADD COLUMN content_hash TEXT")
+
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS ingest_jobs_status
+        ON ingest_jobs (status, created_at)
+        """)
+
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def create_job(user_id, thread_id, doc_id, filename, file_path, content_hash=None):
+    conn = get_connection()
+    job_id = str(uuid.uuid4())
+
+    with conn:
+        conn.execute("""
+        INSERT INTO ingest_jobs (
+            job_id, user_id, thread_id, doc_id, filename, file_path,
+            content_hash, status, stage, created_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', 'queued', ?)
+        """, (job_id, user_id, thread_id, doc_id, filename, file_path, content_hash, time.time()))
+
+    return job_id
+
+
+def get_job(job_id):
+    conn = get_connection()
+
+    row = conn.execute("""
+    SELECT job_id, user_id, thread_id, doc_id, filename, status, stage, language,
+           total_pages, pages_processed, chunks_indexed, error, result,
+           created_at, started_at, finished_at
+    FROM ingest_jobs WHERE job_id = ?
+    """, (job_id,)).fetchone()
+
+    if row is None:
+        return None
+
+    job = dict(zip([
+        "job_id", "user_id", "thread_id", "doc_id", "filename", "status", "stage", "language",
+        "total_pages", "pages_processed", "chunks_indexed", "error", "result",
+        "created_at", "started_at", "finished_at"
+    ], row))
+
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["eta_seconds"] = estimate_eta(job)
+
+    return job
+
+
+def estimate_eta(job):
+    if job["status"] != "running" or not job["pages_processed"] or not job["total_pages"]:
+        return None
+
+    elapsed = time.time() - job["started_at"]
+    remaining = max(job["total_pages"] - job["pages_processed"], 0)
+
+    return round(elapsed / job["pages_processed"] * remaining, 1)
+
+
+def count_queued():
+    conn = get_connection()
+    return conn.execute(
+        "SELECT COUNT(*) FROM ingest_jobs WHERE status = 'queued'"
+    ).fetchone()[0]
+
+
+def requeue_stale_jobs():
+    """
+    Put jobs whose worker died (no heartbeat for JOB_STALE_SECONDS) back
+    in the queue. They resume after their last indexed chunk.
+    """
+
+    conn = get_connection()
+
+    with conn:
+        return conn.execute("""
+        UPDATE ingest_jobs SET status = 'queued', stage = 'queued'
+        WHERE status = 'running' AND heartbeat_at < ?
+        """, (time.time() - JOB_STALE_SECONDS,)).rowcount
+
+
+# =========================
+# Worker Pool
+# =========================
+
+class IngestWorkerPool:
+    """
+    Local worker threads that process queued ingestion jobs.
+
+    Jobs for different threads run in parallel; a thread's jobs run one
+    at a time, oldest first, because they append to the same index. The
+    claim is made in SQLite, so this holds across API worker processes.
+    """
+
+    def __init__(self, workers=INGEST_WORKERS):
+        self.workers = workers
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    def start(self):
+        init_jobs_table()
+        requeue_stale_jobs()
+
+        for n in range(self.workers):
+            worker = threading.Thread(target=self._work_loop, name=f"ingest-{n}", daemon=True)
+            worker.start()
+            self._threads.append(worker)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _claim_next(self):
+        conn = get_connection()
+
+        # Take the write lock before reading, so no other process can
+        # claim a job of the same thread in between
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Oldest job whose thread index isn't already being written
+            row = conn.execute("""
+            SELECT job_id, user_id, thread_id FROM ingest_jobs AS queued
+            WHERE status = 'queued'
+              AND NOT EXISTS (
+                SELECT 1 FROM ingest_jobs
+                WHERE user_id = queued.user_id AND thread_id = queued.thread_id
+                  AND status = 'running'
+              )
+            ORDER BY created_at
+            LIMIT 1
+            """).fetchone()
+
+            claimed = 0
+
+            if row is not None:
+                job_id, user_id, thread_id = row
+                claimed = conn.execute("""
+                UPDATE ingest_jobs
+                SET status = 'running', stage = 'starting',
+                    started_at = COALESCE(started_at, ?), heartbeat_at = ?
+                WHERE job_id = ? AND status = 'queued'
+                  AND NOT EXISTS (
+                    SELECT 1 FROM ingest_jobs
+                    WHERE user_id = ? AND thread_id = ? AND status = 'running'
+                  )
+                """, (time.time(), time.time(), job_id, user_id, thread_id)).rowcount
+
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        return job_id if claimed else None
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            try:
+                job_id = self._claim_next()
+
+                if job_id is None:
+                    self._wakeup.wait(JOB_POLL_SECONDS)
+                    self._wakeup.clear()
+                    requeue_stale_jobs()
+                    continue
+
+                self._run(job_id)
+
+            except Exception:
+                # e.g. "database is locked"; the worker must survive it
+                traceback.print_exc()
+                self._stop.wait(JOB_POLL_SECONDS)
+
+    def _run(self, job_id):
+        conn = get_connection()
+
+        user_id, thread_id, doc_id, filename, file_path, content_hash, chunks_indexed = conn.execute("""
+        SELECT user_id, thread_id, doc_id, filename, file_path, content_hash, chunks_indexed
+        FROM ingest_jobs WHERE job_id = ?
+        """, (job_id,)).fetchone()
+
+        info = {}
+        done = threading.Event()
+
+        def heartbeat():
+            # Persist live progress from the pipeline until the job ends
+            while not done.wait(JOB_HEARTBEAT_SECONDS):
+                save_progress(job_id, info)
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+
+        try:
+            result = ingest_pdf(
+                file_path,
+                user_id=user_id,
+                thread_id=thread_id,
+                doc_id=doc_id,
+                filename=filename,
+                info=info,
+                skip_chunks=chunks_indexed or 0,
+                # Record indexed chunks right away so a resume never re-adds them
+                on_indexed=lambda live: save_progress(job_id, live)
+            )
+            done.set()
+            beat.join()
+
+            if result["chunks"] == 0:
+                finish_job(job_id, "failed", info, error="No text found in PDF")
+                return
+
+            print(f"Ingested {filename}: {result['pages']} pages, {result['chunks']} chunks, "
+                  f"language={result['language']}, {result['passes_saved']} embedding passes saved, "
+                  f"{result['elapsed_s']}s")
+
+            # Later uploads of the same bytes can now reuse this document
+            if content_hash:
+                register_document(user_id, content_hash, thread_id, doc_id, filename, result["chunks"])
+
+            # Answers cached before this document was indexed are stale
+            answer_cache.invalidate_thread(user_id, thread_id)
+
+            finish_job(job_id, "done", info, result=result)
+
+        except Exception as e:
+            done.set()
+            beat.join()
+            traceback.print_exc()
+            finish_job(job_id, "failed", info, error=str(e))
+
+
+def save_progress(job_id, info):
+    conn = get_connection()
+
+    with conn:
+        conn.execute("""
+        UPDATE ingest_jobs
+        SET stage = COALESCE(?, stage), language = COALESCE(?, language),
+            total_pages = COALESCE(?, total_pages),
+            pages_processed = COALESCE(?, pages_processed),
+            chunks_indexed = COALESCE(?, chunks_indexed),
+            heartbeat_at = ?
+        WHERE job_id = ?
+        """, (
+            info.get("stage"), info.get("language"), info.get("total_pages"),
+            info.get("pages"), info.get("chunks"), time.time(), job_id
+        ))
+
+
+def finish_job(job_id, status, info, result=None, error=None):
+    save_progress(job_id, info)
+
+    conn = get_connection()
+
+    with conn:
+        conn.execute("""
+        UPDATE ingest_jobs
+        SET status = ?, stage = ?, error = ?, result = ?, finished_at = ?
+        WHERE job_id = ?
+        """, (
+            status, "done" if status == "done" else "failed", error,
+            json.dumps(result) if result is not None else None,
+            time.time(), job_id
+        ))
+
+
+worker_pool = IngestWorkerPool()
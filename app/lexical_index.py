@@ -0,0 +1,430 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Adjacent segments are merged once a thread has more than this many
+BM25_MAX_SEGMENTS = int(os.getenv("BM25_MAX_SEGMENTS", "8"))
+LEXICAL_CACHE_ENTRIES = int(os.getenv("LEXICAL_CACHE_ENTRIES", "256"))
+# A memory-mapped array keeps a file descriptor open for as long as it
+# is cached; arrays smaller than this are read into memory instead
+BM25_MMAP_MIN_BYTES = int(os.getenv("BM25_MMAP_MIN_BYTES", str(1024 * 1024)))
+
+MANIFEST = "manifest.json"
+
+# Identifiers such as "G.O.Ms.No.45", "12/3A" or "PM-KISAN" are kept
+# whole and also indexed by their parts
+INDIC = "\u0900-\u0DFF"
+TOKEN = re.compile(rf"[\w{INDIC}]+(?:[./\-][\w{INDIC}]+)*")
+PART = re.compile(rf"[\w{INDIC}]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "to", "of",
+    "in", "on", "for", "and", "or", "as", "at", "by", "with", "from", "it",
+    "its", "this", "that", "these", "those", "which", "who", "what", "how",
+    "when", "where", "why", "do", "does", "can", "shall", "will", "may"
+})
+
+
+def tokenize(text):
+    tokens = []
+
+    for match in TOKEN.finditer(text.lower()):
+        token = match.group()
+        parts = PART.findall(token)
+
+        if len(parts) > 1:
+            tokens.append(token)
+
+        tokens.extend(part for part in parts if part not in STOPWORDS)
+
+    return tokens
+
+
+def _file_stamp(path):
+    # os.replace() gives the file a new inode, so this changes on every commit
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return st.st_ino, st.st_mtime_ns
+
+
+def _load_array(path):
+    if os.path.getsize(path) < BM25_MMAP_MIN_BYTES:
+        return np.load(path)
+
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Zero-length arrays can't be memory mapped
+        return np.load(path)
+
+
+# ==========================================
+# 🧱 Immutable Postings Segment
+# ==========================================
+#
+# One segment per add_embeddings call, covering chunk ids [start, end):
+#   {name}.terms         sorted vocabulary, one term per line
+#   {name}.offsets.npy   postings of term i are [offsets[i], offsets[i+1])
+#   {name}.ids.npy       chunk ids (uint32), ascending per term
+#   {name}.tfs.npy       term frequencies (uint16)
+#   {name}.lengths.npy   token count per chunk (uint16), indexed by id - start
+
+class Segment:
+
+    SUFFIXES = (".terms", ".offsets.npy", ".ids.npy", ".tfs.npy", ".lengths.npy")
+
+    def __init__(self, folder, name, start, end):
+        self.folder = folder
+        self.name = name
+        self.start = start
+        self.end = end
+
+        base = os.path.join(folder, name)
+
+        with open(base + ".terms", encoding="utf-8") as f:
+            terms = f.read().split("\n") if os.path.getsize(base + ".terms") else []
+
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.offsets = _load_array(base + ".offsets.npy")
+        self.ids = _load_array(base + ".ids.npy")
+        self.tfs = _load_array(base + ".tfs.npy")
+        self.lengths = _load_array(base + ".lengths.npy")
+
+    @classmethod
+    def write(cls, folder, name, start, postings, lengths):
+        """
+        postings: {term: (ids, tfs)} with ids ascending.
+        """
+
+        terms = sorted(postings)
+        counts = [len(postings[term][0]) for term in terms]
+
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        np.cumsum(counts, out=offsets[1:])
+
+        if terms:
+            ids = np.concatenate([postings[term][0] for term in terms]).astype("uint32")
+            tfs = np.concatenate([postings[term][1] for term in terms]).astype("uint16")
+        else:
+            ids = np.empty(0, dtype="uint32")
+            tfs = np.empty(0, dtype="uint16")
+
+        base = os.path.join(folder, name)
+
+        with open(base + ".terms", "w", encoding="utf-8") as f:
+            f.write("\n".join(terms))
+
+        np.save(base + ".offsets.npy", offsets)
+        np.save(base + ".ids.npy", ids)
+        np.save(base + ".tfs.npy", tfs)
+        np.save(base + ".lengths.npy", np.minimum(lengths, 65535).astype("uint16"))
+
+        return cls(folder, name, start, start + len(lengths))
+
+    @classmethod
+    def from_chunks(cls, folder, name, start, chunks):
+        postings = {}
+        lengths = np.empty(len(chunks), dtype="int64")
+
+        for offset, text in enumerate(chunks):
+            tokens = tokenize(text)
+            lengths[offset] = len(tokens)
+
+            for term, tf in Counter(tokens).items():
+                ids, tfs = postings.setdefault(term, ([], []))
+                ids.append(start + offset)
+                tfs.append(tf)
+
+        return cls.write(folder, name, start, postings, lengths)
+
+    @classmethod
+    def merge(cls, folder, name, first, second):
+        # first covers lower ids, so concatenated postings stay sorted
+        postings = {}
+
+        for term in set(first.vocab) | set(second.vocab):
+            parts = [seg.postings(term) for seg in (first, second)]
+            parts = [part for part in parts if part is not None]
+
+            postings[term] = (
+                np.concatenate([ids for ids, _ in parts]),
+                np.concatenate([tfs for _, tfs in parts])
+            )
+
+        lengths = np.concatenate([first.lengths, second.lengths])
+
+        return cls.write(folder, name, first.start, postings, lengths)
+
+    def postings(self, term):
+        i = self.vocab.get(term)
+        if i is None:
+            return None
+
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return self.ids[lo:hi], self.tfs[lo:hi]
+
+    def size_bytes(self):
+        return sum(
+            os.path.getsize(os.path.join(self.folder, self.name + suffix))
+            for suffix in self.SUFFIXES
+        )
+
+    def remove(self):
+        for suffix in self.SUFFIXES:
+            try:
+                os.remove(os.path.join(self.folder, self.name + suffix))
+            except FileNotFoundError:
+                pass
+
+    def meta(self):
+        return {"name": self.name, "start": self.start, "end": self.end}
+
+
+# ==========================================
+# 🔤 Per-Thread BM25 Index
+# ==========================================
+
+class LexicalIndex:
+    """
+    Append-only BM25 index over a thread's chunks, kept next to its
+    index. Writers are serialized (across processes) by the vector store's
+    write lock; searches read an immutable snapshot of the segment list,
+    refreshed from the manifest when another process commits.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+        self._stamp = None
+        self._next_segment = 0
+        self._state = ((), 0)
+        self.refresh()
+
+    def refresh(self):
+        """
+        Pick up segments committed by other processes. Costs one stat()
+        of the manifest when nothing changed.
+        """
+
+        manifest_path = os.path.join(self.folder, MANIFEST)
+
+        for _ in range(3):
+            stamp = _file_stamp(manifest_path)
+            if stamp == self._stamp:
+                return
+
+            if stamp is None:
+                manifest = {"segments": [], "next_segment": 0, "total_length": 0}
+            else:
+                with open(manifest_path, encoding="utf-8") as f:
+                    st = os.fstat(f.fileno())
+                    manifest = json.load(f)
+                stamp = (st.st_ino, st.st_mtime_ns)
+
+            # Segments are immutable, so ones already open are reused
+            current = {seg.name: seg for seg in self._state[0]}
+
+            try:
+                segments = tuple(
+                    current.get(meta["name"]) or Segment(self.folder, meta["name"], meta["start"], meta["end"])
+                    for meta in manifest["segments"]
+                )
+            except FileNotFoundError:
+                # Another process merged these segments away meanwhile
+                continue
+
+            self._next_segment = manifest["next_segment"]
+            self._state = (segments, manifest["total_length"])
+            self._stamp = stamp
+            return
+
+    @property
+    def end(self):
+        """
+        First chunk id not yet indexed.
+        """
+
+        segments, _ = self._state
+        return segments[-1].end if segments else 0
+
+    @property
+    def doc_count(self):
+        segments, _ = self._state
+        return sum(seg.end - seg.start for seg in segments)
+
+    def add(self, start_id, chunks):
+        """
+        Index chunks with ids start_id, start_id + 1, ... Ids already
+        covered are skipped, so replaying an add is harmless.
+        """
+
+        skip = max(self.end - start_id, 0)
+        chunks = list(chunks)[skip:]
+        start_id += skip
+
+        if not chunks:
+            return
+
+        if start_id != self.end:
+            raise ValueError(f"Lexical index expects id {self.end}, got {start_id}")
+
+        segments, total_length = self._state
+
+        segment = Segment.from_chunks(self.folder, self._new_name(), start_id, chunks)
+        segments = segments + (segment,)
+        total_length += int(segment.lengths.sum())
+
+        removed = []
+
+        while len(segments) > BM25_MAX_SEGMENTS:
+            # Merge the cheapest adjacent pair, keeping segments in id order
+            i = min(range(len(segments) - 1), key=lambda n: segments[n + 1].end - segments[n].start)
+            merged = Segment.merge(self.folder, self._new_name(), segments[i], segments[i + 1])
+            removed.extend(segments[i:i + 2])
+            segments = segments[:i] + (merged,) + segments[i + 2:]
+
+        self._write_manifest(segments, total_length)
+        self._state = (segments, total_length)
+
+        # Readers holding the old snapshot keep their open memory maps
+        for old in removed:
+            old.remove()
+
+    def _new_name(self):
+        name = f"seg{self._next_segment:06d}"
+        self._next_segment += 1
+        return name
+
+    def _write_manifest(self, segments, total_length):
+        manifest = {
+            "segments": [seg.meta() for seg in segments],
+            "next_segment": self._next_segment,
+            "total_length": total_length
+        }
+
+        path = os.path.join(self.folder, MANIFEST)
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        os.replace(tmp_path, path)
+        self._stamp = _file_stamp(path)
+
+    def search(self, query, top_k=5, ranges=None, limit_id=None):
+        """
+        BM25 top_k over chunk ids, optionally restricted to [start, end)
+        ranges and to ids below limit_id. Returns [(id, score)], best first.
+        """
+
+        segments, total_length = self._state
+        doc_count = sum(seg.end - seg.start for seg in segments)
+
+        if not doc_count:
+            return []
+
+        avg_length = max(total_length / doc_count, 1.0)
+        terms = set(tokenize(query))
+
+        all_ids = []
+        all_scores = []
+
+        for term in terms:
+            found = [(seg, seg.postings(term)) for seg in segments]
+            found = [(seg, post) for seg, post in found if post is not None]
+
+            df = sum(len(post[0]) for _, post in found)
+            if not df:
+                continue
+
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+            for seg, (ids, tfs) in found:
+                ids = np.asarray(ids, dtype="int64")
+                tf = np.asarray(tfs, dtype="float32")
+                length = seg.lengths[ids - seg.start].astype("float32")
+
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+
+                all_ids.append(ids)
+                all_scores.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+        if not all_ids:
+            return []
+
+        ids = np.concatenate(all_ids)
+        scores = np.concatenate(all_scores)
+
+        keep = np.ones(len(ids), dtype=bool)
+
+        if ranges is not None:
+            in_ranges = np.zeros(len(ids), dtype=bool)
+            for start, end in ranges:
+                in_ranges |= (ids >= start) & (ids < end)
+            keep &= in_ranges
+
+        if limit_id is not None:
+            keep &= ids < limit_id
+
+        ids, scores = ids[keep], scores[keep]
+
+        if not len(ids):
+            return []
+
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+
+        best = np.argsort(-totals, kind="stable")[:top_k]
+
+        return [(int(unique_ids[i]), float(totals[i])) for i in best]
+
+    def size_bytes(self):
+        segments, _ = self._state
+        return sum(seg.size_bytes() for seg in segments)
+
+    def stats(self):
+        segments, total_length = self._state
+        return {
+            "chunks": self.doc_count,
+            "segments": len(segments),
+            "bytes": self.size_bytes(),
+            "avg_length": round(total_length / self.doc_count, 1) if self.doc_count else 0
+        }
+
+
+# ==========================================
+# 🧊 Open Index Cache
+# ==========================================
+
+_open_indexes = OrderedDict()
+_open_guard = threading.Lock()
+
+
+def open_lexical_index(folder):
+    with _open_guard:
+        index = _open_indexes.get(folder)
+
+        if index is None:
+            index = LexicalIndex(folder)
+            _open_indexes[folder] = index
+
+        _open_indexes.move_to_end(folder)
+
+        while len(_open_indexes) > LEXICAL_CACHE_ENTRIES:
+            _open_indexes.popitem(last=False)
+
+    index.refresh()
+    return index
+
@@ -1,19 +1,34 @@
 from fastapi import FastAPI, UploadFile, File
-import shutil
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import hashlib
+import json
 import os
+import time
 
 from dotenv import load_dotenv
 load_dotenv(
     
 )
 
-from app.thread_store import init_db, load_thread, save_thread, load_all_memory, save_memory
-from app.pdf_utils import extract_text_from_pdf
-from app.vector_store import add_embeddings, search
-from app.embedding_utils import generate_embedding
-from app.gemini_utils import generate_answer, summarize_conversation, extract_structured_memory
-from app.chunking import chunk_text
-from app.sarvam_utils import sarvam_speech_to_text, sarvam_translate_to_english, translate_document_to_english
+from app.thread_store import (
+    init_db, load_thread, load_thread_page, append_messages,
+    load_all_memory, list_user_threads
+)
+from app.vector_store import search, search_hits, get_thread_version, cache_stats, RETRIEVAL_MODES
+from app.embedding_utils import generate_embedding, embedding_cache, warm_up
+from app.embedding_backends import EMBEDDING_WARMUP
+from app.gemini_utils import generate_answer, stream_answer
+from app.jobs import init_jobs_table, create_job, get_job, count_queued, worker_pool
+from app.doc_catalog import init_catalog_table, find_document, attach_document
+from app.stages import StageGraph
+from app import executors
+from app.executors import run_io, run_cpu
+from app.sarvam_utils import sarvam_speech_to_text, sarvam_translate_to_english
+from app.translation_cache import translation_cache
+from app.answer_cache import answer_cache
+from app.post_turn import post_turn, MAX_MESSAGES
+from app.metrics import MetricsMiddleware, STAGE_SECONDS, register_collector, render as render_metrics
+from app.prompt_builder import build_answer_prompt
 # In-memory conversation store
 # ===== Conversational Memory Store =====
 
@@ -23,7 +38,35 @@ MAX_RECENT_TURNS = 6           # keep last 6 exchanges
 SUMMARY_TRIGGER_TURNS = 12     # summarize when history exceeds this
 
 app = FastAPI()
+app.add_middleware(MetricsMiddleware)
 init_db()
+init_catalog_table()
+init_jobs_table()
+
+
+@app.on_event("startup")
+def start_ingest_workers():
+    worker_pool.start()
+    post_turn.start()
+
+
+@app.on_event("startup")
+def warm_up_embeddings():
+    # Requests are only accepted once startup handlers finish
+    if not EMBEDDING_WARMUP:
+        return
+
+    start = time.perf_counter()
+    backend = warm_up()
+    print(f"Embedding backend {backend.name} ready in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+@app.on_event("shutdown")
+def shutdown_pools():
+    worker_pool.stop()
+    post_turn.stop()
+    executors.shutdown()
+
 
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -41,92 +84,120 @@ async def upload_pdf(
 
     doc_id = str(uuid.uuid4())
 
-    # ===============================
-    # 1️⃣ Save file
-    # ===============================
-    os.makedirs("uploads", exist_ok=True)
-    file_path = os.path.join("uploads", file.filename)
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # ===============================
-    # 2️⃣ Extract text
-    # ===============================
-    raw_text = extract_text_from_pdf(file_path)
-
-    if not raw_text.strip():
-        return {"error": "No text found in PDF"}
-
-    # ===============================
-    # 3️⃣ Detect language (optional optimization)
-    # ===============================
-    try:
-        from langdetect import detect
-        language = detect(raw_text[:2000])  # detect using first 2000 chars
-    except:
-        language = "unknown"
-
-    # ===============================
-    # 4️⃣ Translate FULL document if needed
-    # ===============================
-    if language != "en":
-        print(f"Translating document from {language} to English...")
-
-        english_text = translate_document_to_english(raw_text)
-
-    else:
-        english_text = raw_text
-
-    # ===============================
-    # 5️⃣ Chunk translated text
-    # ===============================
-    chunks = chunk_text(english_text)
+    upload_start = time.perf_counter()
 
     # ===============================
-    # 6️⃣ Generate embeddings
-    # ===============================
-    embeddings = [generate_embedding(chunk) for chunk in chunks]
-
+    # 1️⃣ Save file (hashing while streaming to disk)
     # ===============================
-    # 7️⃣ Store in FAISS (thread-bound)
-    # ===============================
-    add_embeddings(
-        user_id=user_id,
-        thread_id=thread_id,
-        doc_id=doc_id,
-        embeddings=embeddings,
-        chunks=chunks,
-        filename=file.filename
-    )
+    os.makedirs("uploads", exist_ok=True)
+    file_path = os.path.join("uploads", f"{doc_id}_{file.filename}")
+
+    def save_upload():
+        digest = hashlib.sha256()
+        with open(file_path, "wb") as buffer:
+            while True:
+                block = file.file.read(1024 * 1024)
+                if not block:
+                    break
+                digest.update(block)
+                buffer.write(block)
+        return digest.hexdigest()
+
+    with STAGE_SECONDS.time("upload", "save"):
+        content_hash = await run_io(save_upload)
+
+    # ===============================
+    # 2️⃣ Reuse an already ingested copy of the same PDF
+    # ===============================
+    with STAGE_SECONDS.time("upload", "dedup_lookup"):
+        existing = await run_io(find_document, user_id, content_hash, thread_id)
+
+    if existing and existing["thread_id"] != thread_id:
+        with STAGE_SECONDS.time("upload", "attach"):
+            chunks_added = await run_io(
+                attach_document,
+                user_id, content_hash, existing, thread_id, doc_id, file.filename
+            )
+
+        if chunks_added:
+            answer_cache.invalidate_thread(user_id, thread_id)
+        else:
+            # The catalogued copy is gone; ingest this upload as new
+            existing = None
+
+    elif existing:
+        # Already in this thread: nothing to attach
+        doc_id = existing["doc_id"]
+        chunks_added = 0
+
+    if existing:
+        os.remove(file_path)
+
+        return {
+            "user_id": user_id,
+            "thread_id": thread_id,
+            "doc_id": doc_id,
+            "filename": file.filename,
+            "status": "done",
+            "deduplicated": True,
+            "source_thread_id": existing["thread_id"],
+            "chunks_added": chunks_added,
+            "elapsed_ms": round((time.perf_counter() - upload_start) * 1000, 1)
+        }
+
+    # ===============================
+    # 3️⃣ Queue ingestion (pages -> translate -> chunk -> embed -> FAISS)
+    # ===============================
+    with STAGE_SECONDS.time("upload", "create_job"):
+        job_id = await run_io(create_job, user_id, thread_id, doc_id, file.filename, file_path, content_hash)
+    worker_pool.notify()
 
     return {
         "user_id": user_id,
         "thread_id": thread_id,
         "doc_id": doc_id,
         "filename": file.filename,
-        "detected_language": language,
-        "translated": language != "en",
-        "chunks_added": len(chunks)
+        "job_id": job_id,
+        "status": "queued",
+        "deduplicated": False,
+        "elapsed_ms": round((time.perf_counter() - upload_start) * 1000, 1)
     }
 
+
+@app.get("/upload-status")
+async def upload_status(job_id: str):
+    job = await run_io(get_job, job_id)
+
+    if job is None:
+        return {"error": "Unknown job_id"}
+
+    return job
+
+
 @app.post("/search")
 async def search_query(
     user_id: str,
     thread_id: str,   # 🔥 REQUIRED NOW
     query: str,
     doc_id: str = None,
-    top_k: int = 5
+    top_k: int = 5,
+    retrieval: str = None   # "dense", "lexical" or "hybrid"
 ):
 
-    query_embedding = generate_embedding(query)
+    if retrieval and retrieval not in RETRIEVAL_MODES:
+        return {"error": f"retrieval must be one of {', '.join(RETRIEVAL_MODES)}"}
 
-    results = search(
+    query_embedding = await run_cpu(generate_embedding, query)
+
+    results = await run_io(
+        search,
         user_id=user_id,
         thread_id=thread_id,   # 🔥 pass thread_id
         query_embedding=query_embedding,
         doc_id=doc_id,
-        top_k=top_k
+        top_k=top_k,
+        query_text=query,
+        mode=retrieval
     )
 
     return {
@@ -134,145 +205,324 @@ async def search_query(
         "thread_id": thread_id,
         "doc_id_filter": doc_id,
         "top_k": top_k,
+        "retrieval": retrieval,
         "results": results
     }
-@app.post("/ask")
-async def ask_question(
-    user_id: str,
-    thread_id: str,
-    question: str,
-    doc_id: str = None
-):
 
-    MAX_MESSAGES = 6
+
+# ===============================
+# 🕸 /ask STAGE GRAPH
+# ===============================
+
+def build_turn_graph(user_id, thread_id, question, doc_id=None, retrieval=None, endpoint="ask"):
+    """
+    Stages shared by /ask and /ask-stream, up to the final prompt.
+    """
 
     # ===============================
     # 🌍 1️⃣ TRANSLATE INPUT (Typed OR Voice)
     # ===============================
-    english_question = sarvam_translate_to_english(question)
+
+    def translate():
+        return sarvam_translate_to_english(question)
 
     # ===============================
-    # 🔐 LOAD THREAD
+    # ⏳ PREVIOUS TURN'S SUMMARY / MEMORY
     # ===============================
-    thread_data = load_thread(thread_id, user_id)
-    summary = thread_data.get("summary", "")
-    messages = thread_data.get("messages", [])
 
-    # Store ORIGINAL user message (for UI display)
-    messages.append({
-        "role": "user",
-        "content": question
-    })
+    async def previous_turn():
+        # Summary and memory updates from earlier turns of this thread
+        # run in the background; they must land before we read them
+        if not await post_turn.wait_for_thread(user_id, thread_id):
+            print(f"Post-turn work for {thread_id} still pending, continuing")
 
     # ===============================
-    # 🧠 2️⃣ STRUCTURED MEMORY EXTRACTION
+    # 🔐 LOAD THREAD
     # ===============================
 
-    new_memory = extract_structured_memory(question)
-
-    if isinstance(new_memory, dict):
-        for key, value in new_memory.items():
-            if value:
-                save_memory(user_id, key, str(value))
+    def load_history(previous_turn):
+        # The question itself goes in its own prompt section
+        return load_thread(thread_id, user_id, limit=MAX_MESSAGES - 1)
 
     # ===============================
-    # 🧠 3️⃣ CONVERSATION SUMMARIZATION
+    # 🔎 4️⃣ DOCUMENT RETRIEVAL (THREAD + USER ISOLATED)
     # ===============================
 
-    if len(messages) > MAX_MESSAGES:
-        old_messages = messages[:-MAX_MESSAGES]
-        recent_messages = messages[-MAX_MESSAGES:]
+    def embed_query(translate):
+        return generate_embedding(translate)
 
-        summary = summarize_conversation(summary, old_messages)
-        messages = recent_messages
+    def retrieve(translate, embed_query):
+        # Read the version first: an upload committing in between then
+        # leaves the answer cached under an older version, which is
+        # dropped, rather than pairing older hits with the newer one
+        version = get_thread_version(user_id, thread_id)
+        hits = search_hits(
+            user_id=user_id,
+            thread_id=thread_id,
+            query_embedding=embed_query,
+            doc_id=doc_id,
+            query_text=translate,
+            mode=retrieval
+        )
+        return {
+            "hits": hits,
+            "version": version
+        }
 
     # ===============================
-    # 🔎 4️⃣ DOCUMENT RETRIEVAL (THREAD + USER ISOLATED)
+    # 💬 SEMANTIC ANSWER CACHE
     # ===============================
 
-    query_embedding = generate_embedding(english_question)
-
-    relevant_chunks = search(
-        user_id=user_id,
-        thread_id=thread_id,
-        query_embedding=query_embedding,
-        doc_id=doc_id
-    )
-
-    document_context = "\n".join(relevant_chunks) if relevant_chunks else ""
+    def lookup_answer(embed_query, retrieve):
+        return answer_cache.get(
+            (user_id, thread_id, doc_id),
+            retrieve["version"],
+            embed_query,
+            [hit["id"] for hit in retrieve["hits"]]
+        )
 
     # ===============================
     # 🧠 5️⃣ LOAD USER MEMORY
     # ===============================
 
-    memory_data = load_all_memory(user_id)
-
-    memory_text = "\n".join(
-        [f"{k}: {v}" for k, v in memory_data.items()]
-    )
+    def load_memory(previous_turn):
+        return load_all_memory(user_id)
 
     # ===============================
-    # 🧾 6️⃣ FORMAT RECENT HISTORY
+    # 🎯 6️⃣ BUILD FINAL PROMPT
     # ===============================
 
-    history_text = "\n".join(
-        [f"{msg['role'].upper()}: {msg['content']}" for msg in messages]
+    def build_prompt(translate, load_history, retrieve, load_memory):
+        return build_answer_prompt(
+            question=translate,
+            memory=load_memory,
+            summary=load_history.get("summary", ""),
+            messages=load_history.get("messages", []),
+            hits=retrieve["hits"]
+        )
+
+    graph = StageGraph(endpoint)
+    graph.add("translate", translate)
+    graph.add("previous_turn", previous_turn)
+    graph.add("load_history", load_history, deps=["previous_turn"])
+    graph.add("embed_query", embed_query, deps=["translate"], pool="cpu")
+    graph.add("retrieve", retrieve, deps=["translate", "embed_query"])
+    graph.add("answer_cache", lookup_answer, deps=["embed_query", "retrieve"])
+    graph.add("load_memory", load_memory, deps=["previous_turn"])
+    graph.add("build_prompt", build_prompt, deps=["translate", "load_history", "retrieve", "load_memory"])
+
+    return graph
+
+
+def store_turn(user_id, thread_id, question, answer, english_question=None):
+    seq = append_messages(thread_id, user_id, [
+        {
+            "role": "user",
+            "content": question
+        },
+        {
+            "role": "assistant",
+            "content": answer
+        }
+    ])
+
+    # Summarization and memory extraction only matter for later turns
+    post_turn.submit(user_id, thread_id, seq, question, english_question)
+
+
+def cache_answer(user_id, thread_id, doc_id, results, answer):
+    retrieved = results["retrieve"]
+
+    answer_cache.put(
+        (user_id, thread_id, doc_id),
+        retrieved["version"],
+        results["embed_query"],
+        [hit["id"] for hit in retrieved["hits"]],
+        answer
     )
 
-    # ===============================
-    # 🎯 7️⃣ BUILD FINAL PROMPT
-    # ===============================
 
-    final_prompt = f"""
-You are an intelligent and personalized AI assistant.
+async def lookup_cached_answer(graph):
+    """
+    Wait for the answer cache stage only. On a hit the rest of the graph
+    is cancelled and (answer, similarity, english_question, memory) is
+    returned.
+    """
+
+    cached = await graph.result("answer_cache")
+    if cached is None:
+        return None
+
+    memory_data = await graph.result("load_memory")
+    english_question = await graph.result("translate")
+    graph.cancel()
 
-Guidelines:
-- Use structured user memory if relevant.
-- Use document context strictly when answering document-related questions.
-- If no document context is available, rely on conversation and memory.
-- Answer completely and clearly.
-- Never cut responses midway.
+    answer, similarity = cached
 
-User Memory:
-{memory_text}
+    return answer, similarity, english_question, memory_data
 
-Conversation Summary:
-{summary}
 
-Recent Conversation:
-{history_text}
+@app.post("/ask")
+async def ask_question(
+    user_id: str,
+    thread_id: str,
+    question: str,
+    doc_id: str = None,
+    retrieval: str = None
+):
 
-Document Context:
-{document_context}
+    if retrieval and retrieval not in RETRIEVAL_MODES:
+        return {"error": f"retrieval must be one of {', '.join(RETRIEVAL_MODES)}"}
 
-Question:
-{english_question}
-"""
+    graph = build_turn_graph(user_id, thread_id, question, doc_id, retrieval)
 
     # ===============================
-    # 🤖 8️⃣ GENERATE ANSWER
+    # 🤖 7️⃣ GENERATE ANSWER
     # ===============================
 
-    answer = generate_answer(final_prompt, english_question)
+    def generate(build_prompt, answer_cache):
+        # A hit is answered from the cache; don't pay for a Gemini call
+        if answer_cache is not None:
+            return None
+
+        prompt, _ = build_prompt
+        return generate_answer(prompt)
+
+    graph.add("generate", generate, deps=["build_prompt", "answer_cache"])
+
+    cached = await lookup_cached_answer(graph)
+
+    if cached is not None:
+        answer, similarity, english_question, memory_data = cached
+
+        timings = graph.report("answer_cache")
+
+        await run_io(store_turn, user_id, thread_id, question, answer, english_question)
+
+        return {
+            "user_id": user_id,
+            "thread_id": thread_id,
+            "memory_used": memory_data,
+            "answer": answer,
+            "cached": True,
+            "similarity": round(similarity, 4),
+            "timings": timings
+        }
+
+    results = await graph.run()
+
+    answer = results["generate"]
+    memory_data = results["load_memory"]
+    _, prompt_stats = results["build_prompt"]
+
+    timings = graph.report("generate")
 
     # ===============================
-    # 💾 9️⃣ STORE ASSISTANT RESPONSE
+    # 💾 8️⃣ STORE ASSISTANT RESPONSE
     # ===============================
 
-    messages.append({
-        "role": "assistant",
-        "content": answer
-    })
-
-    save_thread(thread_id, user_id, summary, messages)
+    await run_io(store_turn, user_id, thread_id, question, answer, results["translate"])
+    cache_answer(user_id, thread_id, doc_id, results, answer)
 
     return {
         "user_id": user_id,
         "thread_id": thread_id,
         "memory_used": memory_data,
-        "answer": answer
+        "answer": answer,
+        "cached": False,
+        "prompt": prompt_stats,
+        "timings": timings
     }
 
+@app.post("/ask-stream")
+async def ask_question_stream(
+    user_id: str,
+    thread_id: str,
+    question: str,
+    doc_id: str = None,
+    retrieval: str = None
+):
+    """
+    Same as /ask, but streams the answer as Server-Sent Events:
+    `token` events carry text pieces, a final `done` event carries
+    time-to-first-token and stage timings.
+    """
+
+    if retrieval and retrieval not in RETRIEVAL_MODES:
+        return {"error": f"retrieval must be one of {', '.join(RETRIEVAL_MODES)}"}
+
+    request_start = time.perf_counter()
+
+    graph = build_turn_graph(user_id, thread_id, question, doc_id, retrieval, endpoint="ask_stream")
+
+    cached = await lookup_cached_answer(graph)
+
+    if cached is not None:
+        answer, similarity, english_question, memory_data = cached
+        timings = graph.report("answer_cache")
+
+        async def cached_stream():
+            ttft_ms = round((time.perf_counter() - request_start) * 1000, 1)
+            yield f"event: token\ndata: {json.dumps({'text': answer})}\n\n"
+
+            await run_io(store_turn, user_id, thread_id, question, answer, english_question)
+
+            done = {
+                "ttft_ms": ttft_ms,
+                "total_ms": round((time.perf_counter() - request_start) * 1000, 1),
+                "memory_used": memory_data,
+                "cached": True,
+                "similarity": round(similarity, 4),
+                "timings": timings
+            }
+            yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+        return StreamingResponse(cached_stream(), media_type="text/event-stream")
+
+    results = await graph.run()
+
+    final_prompt, prompt_stats = results["build_prompt"]
+    timings = graph.report("build_prompt")
+
+    async def event_stream():
+        pieces = []
+        ttft_ms = None
+
+        tokens = stream_answer(final_prompt)
+        generate_start = time.perf_counter()
+
+        while True:
+            piece = await run_io(next, tokens, None)
+            if piece is None:
+                break
+
+            if ttft_ms is None:
+                ttft_ms = round((time.perf_counter() - request_start) * 1000, 1)
+                STAGE_SECONDS.observe(time.perf_counter() - generate_start, "ask_stream", "first_token")
+
+            pieces.append(piece)
+            yield f"event: token\ndata: {json.dumps({'text': piece})}\n\n"
+
+        answer = "".join(pieces)
+        total_ms = round((time.perf_counter() - request_start) * 1000, 1)
+        STAGE_SECONDS.observe(time.perf_counter() - generate_start, "ask_stream", "generate")
+
+        # Persist once the full answer is known
+        await run_io(store_turn, user_id, thread_id, question, answer, results["translate"])
+        cache_answer(user_id, thread_id, doc_id, results, answer)
+
+        done = {
+            "ttft_ms": ttft_ms,
+            "total_ms": total_ms,
+            "memory_used": results["load_memory"],
+            "cached": False,
+            "prompt": prompt_stats,
+            "timings": timings
+        }
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.post("/voice-ask")
 async def voice_ask(
     user_id: str,
@@ -282,10 +532,16 @@ async def voice_ask(
 
     file_path = f"temp_{audio.filename}"
 
-    with open(file_path, "wb") as f:
-        f.write(await audio.read())
+    content = await audio.read()
 
-    raw_text = sarvam_speech_to_text(file_path)
+    def save_audio():
+        with open(file_path, "wb") as f:
+            f.write(content)
+
+    await run_io(save_audio)
+
+    with STAGE_SECONDS.time("voice_ask", "speech_to_text"):
+        raw_text = await run_io(sarvam_speech_to_text, file_path)
 
     # ❌ REMOVE translation here
     return await ask_question(
@@ -295,34 +551,25 @@ async def voice_ask(
     )
 
 @app.get("/get-thread")
-async def get_thread(user_id: str, thread_id: str):
-    thread_data = load_thread(thread_id, user_id)
+async def get_thread(
+    user_id: str,
+    thread_id: str,
+    before_seq: int = None,
+    limit: int = 50
+):
+    thread_data = await run_io(load_thread, thread_id, user_id, limit=0)
+    page = await run_io(load_thread_page, thread_id, user_id, before_seq=before_seq, limit=limit)
 
     return {
         "thread_id": thread_id,
         "summary": thread_data["summary"],
-        "messages": thread_data["messages"]
+        "messages": page["messages"],
+        "next_before_seq": page["next_before_seq"]
     }
 
-from fastapi import FastAPI
-import sqlite3
-
 @app.get("/list-threads")
 async def list_threads(user_id: str):
-    conn = sqlite3.connect("threads.db")
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT thread_id 
-        FROM threads
-        WHERE user_id = ?
-        ORDER BY rowid DESC
-    """, (user_id,))
-
-    rows = cursor.fetchall()
-    conn.close()
-
-    threads = [row[0] for row in rows]
+    threads = await run_io(list_user_threads, user_id)
 
     return {"threads": threads}
 
@@ -338,4 +585,67 @@ async def list_documents(user_id: str):
         if f.endswith(".pdf")
     ]
 
-    return {"documents": files}
\ No newline at end of file
+    return {"documents": files}
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    return {
+        "vector_index_cache": cache_stats(),
+        "translation_cache": translation_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "answer_cache": answer_cache.stats()
+    }
+
+
+# ===============================
+# 📊 METRICS
+# ===============================
+
+def runtime_metrics():
+    """
+    Cache hit ratios and queue depths, read from the components that
+    already track them whenever /metrics is scraped.
+    """
+
+    translation = translation_cache.stats()
+    caches = {
+        "vector_index": cache_stats(),
+        "embedding": embedding_cache.stats(),
+        "answer": answer_cache.stats(),
+        "translation": {
+            "hits": translation["memory_hits"] + translation["disk_hits"],
+            "misses": translation["misses"]
+        }
+    }
+
+    def ratio(stats):
+        lookups = stats["hits"] + stats["misses"]
+        return stats["hits"] / lookups if lookups else 0.0
+
+    turns = post_turn.stats()
+    queues = {"ingest_jobs": count_queued(), "post_turn_threads": turns["pending_threads"]}
+    queues.update(executors.queue_depths())
+
+    return [
+        ("rag_cache_hits_total", "counter", "Cache hits",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("rag_cache_misses_total", "counter", "Cache misses",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("rag_cache_hit_ratio", "gauge", "Cache hits / lookups since startup",
+         [({"cache": name}, ratio(stats)) for name, stats in caches.items()]),
+        ("rag_queue_depth", "gauge", "Work waiting to start, per queue",
+         [({"queue": name}, depth) for name, depth in queues.items()]),
+        ("rag_post_turn_total", "counter", "Background summary and memory work",
+         [({"kind": kind}, turns[kind]) for kind in (
+             "turns", "summaries", "memory_calls", "messages_extracted", "messages_filtered", "waits"
+         )])
+    ]
+
+
+register_collector(runtime_metrics)
+
+
+@app.get("/metrics")
+async def metrics():
+    body = await run_io(render_metrics)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
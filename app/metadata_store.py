@@ -0,0 +1,237 @@
+import os
+import pickle
+import sqlite3
+import threading
+
+
+# ==========================================
+# 🗃 Chunk Metadata Store (Append Only)
+# ==========================================
+#
+# One SQLite file per thread. Row id == FAISS vector id, so search can
+# fetch just the returned ids and uploads only insert their own rows.
+
+class MetadataStore:
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+        with self._lock:
+            self._create_tables()
+
+        self._backfill_ranges()
+
+    def _connect(self):
+        # Called with self._lock held. A closed store (evicted from the
+        # vector store's cache while a search still held it) reopens
+        if self._conn is None:
+            # Other processes (API workers) may hold the write lock briefly
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        return self._conn
+
+    def _create_tables(self):
+        conn = self._connect()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS chunks (
+            id INTEGER PRIMARY KEY,
+            doc_id TEXT,
+            filename TEXT,
+            text TEXT
+        )
+        """)
+        # Contiguous vector id ranges [start_id, end_id) per document,
+        # used to restrict FAISS search to one document
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS doc_ranges (
+            doc_id TEXT,
+            start_id INTEGER,
+            end_id INTEGER,
+            PRIMARY KEY (doc_id, start_id)
+        )
+        """)
+        conn.commit()
+
+    def append(self, start_id, doc_id, chunks, filename=None):
+        rows = [
+            (start_id + offset, doc_id, filename, chunk)
+            for offset, chunk in enumerate(chunks)
+        ]
+
+        self._insert_rows(rows)
+
+    def truncate(self, end_id):
+        """
+        Drop rows with id >= end_id. The vector store calls this before
+        appending, to discard rows of a write that never committed.
+        """
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM chunks WHERE id >= ?", (end_id,))
+            conn.execute("DELETE FROM doc_ranges WHERE start_id >= ?", (end_id,))
+            conn.execute("UPDATE doc_ranges SET end_id = ? WHERE end_id > ?", (end_id, end_id))
+            conn.commit()
+
+    def _insert_rows(self, rows):
+        # Group consecutive ids of the same document into ranges
+        ranges = []
+        for row_id, doc_id, _, _ in sorted(rows, key=lambda r: r[0]):
+            if ranges and ranges[-1][0] == doc_id and ranges[-1][2] == row_id:
+                ranges[-1][2] = row_id + 1
+            else:
+                ranges.append([doc_id, row_id, row_id + 1])
+
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("""
+            INSERT OR REPLACE INTO chunks (id, doc_id, filename, text)
+            VALUES (?, ?, ?, ?)
+            """, rows)
+            conn.executemany("""
+            INSERT OR REPLACE INTO doc_ranges (doc_id, start_id, end_id)
+            VALUES (?, ?, ?)
+            """, ranges)
+            conn.commit()
+
+    def _backfill_ranges(self):
+        # Stores written before doc_ranges existed have chunks but no ranges
+        with self._lock:
+            conn = self._connect()
+            has_ranges = conn.execute("SELECT 1 FROM doc_ranges LIMIT 1").fetchone()
+            if has_ranges:
+                return
+            rows = conn.execute("""
+            SELECT id, doc_id, filename, text FROM chunks ORDER BY id
+            """).fetchall()
+
+        if rows:
+            self._insert_rows(rows)
+
+    def doc_ranges(self, doc_id):
+        """
+        Return the [start_id, end_id) vector id ranges of a document.
+        """
+
+        with self._lock:
+            rows = self._connect().execute("""
+            SELECT start_id, end_id FROM doc_ranges
+            WHERE doc_id = ?
+            ORDER BY start_id
+            """, (doc_id,)).fetchall()
+
+        return [(start, end) for start, end in rows]
+
+    def get(self, ids):
+        """
+        Fetch metadata for the given vector ids, returned in the same order.
+        Unknown ids are skipped.
+        """
+
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+
+        placeholders = ",".join("?" * len(ids))
+
+        with self._lock:
+            rows = self._connect().execute(f"""
+            SELECT id, doc_id, filename, text FROM chunks
+            WHERE id IN ({placeholders})
+            """, ids).fetchall()
+
+        by_id = {
+            row[0]: {"id": row[0], "doc_id": row[1], "filename": row[2], "text": row[3]}
+            for row in rows
+        }
+
+        return [by_id[i] for i in ids if i in by_id]
+
+    def get_doc(self, doc_id):
+        """
+        All chunks of a document, in vector id order.
+        """
+
+        with self._lock:
+            rows = self._connect().execute("""
+            SELECT id, doc_id, filename, text FROM chunks
+            WHERE doc_id = ?
+            ORDER BY id
+            """, (doc_id,)).fetchall()
+
+        return [
+            {"id": row[0], "doc_id": row[1], "filename": row[2], "text": row[3]}
+            for row in rows
+        ]
+
+    def count(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        """
+        Release the connection (three file descriptors with WAL). The
+        store stays usable and reconnects on its next call.
+        """
+
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# ==========================================
+# 🔁 Migration From metadata.pkl
+# ==========================================
+
+def migrate_pickle(pickle_path, store):
+    """
+    Import a legacy metadata.pkl list into the store and rename the
+    pickle so it is not imported twice.
+    """
+
+    with open(pickle_path, "rb") as f:
+        metadata = pickle.load(f)
+
+    rows = [
+        (idx, item.get("doc_id"), item.get("filename"), item.get("text"))
+        for idx, item in enumerate(metadata)
+    ]
+
+    store._insert_rows(rows)
+
+    os.replace(pickle_path, pickle_path + ".migrated")
+
+    return len(rows)
+
+
+def migrate_all(base_path):
+    """
+    Migrate every <base_path>/<user>/<thread>/metadata.pkl in place.
+    """
+
+    migrated = 0
+
+    for root, _, files in os.walk(base_path):
+        if "metadata.pkl" not in files:
+            continue
+
+        store = MetadataStore(os.path.join(root, "metadata.db"))
+        count = migrate_pickle(os.path.join(root, "metadata.pkl"), store)
+        store.close()
+
+        print(f"Migrated {count} chunks in {root}")
+        migrated += 1
+
+    return migrated
+
+
+if __name__ == "__main__":
+    import sys
+
+    base = sys.argv[1] if len(sys.argv) > 1 else "vector_store"
+    print(f"Migrated {migrate_all(base)} thread(s)")
@@ -0,0 +1,240 @@
+import bisect
+import math
+import os
+import threading
+import time
+
+# Set to 0 to turn every observe()/inc() into a no-op
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Seconds: sub-millisecond lookups up to slow generations
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ==========================================
+# 📈 Metric Types
+# ==========================================
+#
+# Label values are passed positionally, in labelnames order, so the hot
+# path is a tuple lookup under a lock and nothing else.
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, *labels):
+        if not METRICS_ENABLED:
+            return
+
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class _Timer:
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+
+        i = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(labels)
+
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        """
+        Context manager observing the elapsed seconds of its block.
+        """
+
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total)}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+def register_collector(collect):
+    """
+    Add a callable run at scrape time, for values that already live
+    elsewhere (queue sizes, cache stats). It returns a list of
+    (name, kind, help, [(labels dict, value)]).
+    """
+
+    _collectors.append(collect)
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format (0.0.4).
+    """
+
+    lines = []
+
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+
+    for collect in _collectors:
+        for name, kind, help_text, samples in collect():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for labels, value in samples:
+                text = _format_labels(tuple(labels), tuple(labels.values()))
+                lines.append(f"{name}{text} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ==========================================
+# 📏 Shared Metrics
+# ==========================================
+
+REQUEST_SECONDS = Histogram(
+    "rag_http_request_seconds", "HTTP request duration, including streamed bodies", ["endpoint"]
+)
+REQUESTS = Counter(
+    "rag_http_requests_total", "HTTP requests by endpoint and status", ["endpoint", "status"]
+)
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Duration of request and ingestion stages", ["endpoint", "stage"]
+)
+OPERATION_SECONDS = Histogram(
+    "rag_operation_seconds", "Duration of storage operations (FAISS, BM25, SQLite)", ["operation"]
+)
+OUTBOUND_SECONDS = Histogram(
+    "rag_outbound_seconds", "Duration of calls to external APIs", ["service", "call"]
+)
+OUTBOUND_ERRORS = Counter(
+    "rag_outbound_errors_total", "Failed calls to external APIs", ["service", "call"]
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total", "Gemini tokens reported by the API", ["call", "direction"]
+)
+
+
+# ==========================================
+# 🌐 ASGI Middleware
+# ==========================================
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request until its last body chunk is sent, so
+    streamed responses are measured end to end. Requests are labelled
+    with the route template, never the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+            REQUESTS.inc(1, endpoint, str(status[0]))
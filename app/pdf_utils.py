@@ -1,12 +1,73 @@
+import os
+import time
+from collections import OrderedDict
+
 import pdfplumber
 
-def extract_text_from_pdf(file_path: str) -> str:
-    full_text = ""
+# Documents kept open in each PDF pool process. An upload is parsed as
+# many page ranges; reusing the open document means its page tree is
+# built once per process, not once per range
+PDF_OPEN_DOCUMENTS = int(os.getenv("PDF_OPEN_DOCUMENTS", "2"))
+
+_open_documents = OrderedDict()
+
+
+def iter_pdf_pages(file_path: str):
+    """
+    Yield the text of each page, one page at a time.
+    Page layout caches are released as we go so memory stays flat.
+    """
 
     with pdfplumber.open(file_path) as pdf:
         for page in pdf.pages:
             page_text = page.extract_text()
+            page.close()
             if page_text:
-                full_text += page_text + "\n"
+                yield page_text
+
+
+def _open_document(file_path: str):
+    # Pool processes run one task at a time, so no lock is needed. The
+    # key changes if an upload path is reused for another file
+    st = os.stat(file_path)
+    key = (file_path, st.st_ino, st.st_mtime_ns)
+
+    pdf = _open_documents.get(key)
+
+    if pdf is None:
+        pdf = _open_documents[key] = pdfplumber.open(file_path)
+
+        while len(_open_documents) > PDF_OPEN_DOCUMENTS:
+            _, oldest = _open_documents.popitem(last=False)
+            oldest.close()
+
+    _open_documents.move_to_end(key)
+    return pdf
 
-    return full_text
\ No newline at end of file
+
+def extract_pages(file_path: str, start: int, end: int):
+    """
+    Text of pages [start, end) as (text, seconds) pairs, empty text for
+    pages without any. Runs in the PDF process pool, so timings are
+    returned rather than recorded here.
+    """
+
+    pages = []
+
+    for page in _open_document(file_path).pages[start:end]:
+        page_start = time.perf_counter()
+        page_text = page.extract_text() or ""
+        # Drops the page's parsed layout; the document stays open
+        page.close()
+        pages.append((page_text, time.perf_counter() - page_start))
+
+    return pages
+
+
+def count_pdf_pages(file_path: str) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_text_from_pdf(file_path: str) -> str:
+    return "".join(page_text + "\n" for page_text in iter_pdf_pages(file_path))
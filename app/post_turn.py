@@ -0,0 +1,383 @@
+import asyncio
+import os
+import re
+import threading
+import time
+import traceback
+
+from app.executors import run_io
+from app.gemini_utils import extract_structured_memory, summarize_conversation
+from app.thread_store import (
+    load_thread, load_messages, load_processing_state, mark_processed, save_summary, save_memory
+)
+
+POST_TURN_WORKERS = int(os.getenv("POST_TURN_WORKERS", "2"))
+# A user's pending messages go to Gemini in one call once this many are
+# queued or the oldest has waited MEMORY_BATCH_SECONDS
+MEMORY_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "8"))
+MEMORY_BATCH_SECONDS = float(os.getenv("MEMORY_BATCH_SECONDS", "2"))
+# Upper bound on how long a turn waits for the previous turn's updates
+POST_TURN_WAIT_SECONDS = float(os.getenv("POST_TURN_WAIT_SECONDS", "30"))
+# How often a turn re-checks work left by other API worker processes
+POST_TURN_POLL_SECONDS = float(os.getenv("POST_TURN_POLL_SECONDS", "0.05"))
+
+# Messages kept verbatim in the prompt (including the new question);
+# everything older is folded into the thread summary
+MAX_MESSAGES = 6
+
+# Cheap check for statements about the user; anything else is never sent
+# for memory extraction
+FIRST_PERSON_FACT = re.compile(
+    r"\b(?:i am|i'm|im|i work|i live|i study|i speak|i prefer|i like|i love|"
+    r"i enjoy|i want|i plan|i need|my|call me)\b"
+    r"|मैं|मेरा|मेरी|मेरे|मुझे",
+    re.IGNORECASE
+)
+
+
+def has_personal_facts(*texts):
+    return any(text and FIRST_PERSON_FACT.search(text) for text in texts)
+
+
+# ==========================================
+# 🧠 Post-turn Work
+# ==========================================
+
+def summarize_thread(user_id, thread_id):
+    """
+    Fold everything that has fallen out of the next turn's history window
+    into the thread summary. Returns True if the summary changed.
+    """
+
+    thread_data = load_thread(thread_id, user_id, limit=MAX_MESSAGES - 1)
+    messages = thread_data["messages"]
+
+    if not messages:
+        return False
+
+    summarized_seq = thread_data["summarized_seq"]
+    cutoff_seq = messages[0]["seq"] - 1
+
+    if cutoff_seq <= summarized_seq:
+        return False
+
+    old_messages = load_messages(
+        thread_id, user_id,
+        after_seq=summarized_seq,
+        through_seq=cutoff_seq
+    )
+
+    summary = summarize_conversation(thread_data["summary"], old_messages)
+    save_summary(thread_id, user_id, summary, cutoff_seq)
+
+    return True
+
+
+def extract_memory(user_id, messages):
+    new_memory = extract_structured_memory(messages)
+
+    if isinstance(new_memory, dict):
+        for key, value in new_memory.items():
+            if value:
+                save_memory(user_id, key, str(value))
+
+
+# ==========================================
+# ⏩ Background Processor
+# ==========================================
+
+class PostTurnProcessor:
+    """
+    Runs summarization and memory extraction after a turn's answer has
+    been returned.
+
+    Summaries are per thread; memory messages are batched per user. Every
+    thread keeps a count of outstanding work, and wait_for_thread() holds
+    the next turn of that thread until it reaches zero, flushing any
+    partially filled memory batch right away. Once a thread's work is
+    done its `processed_seq` is recorded in SQLite, which is what a turn
+    served by another API worker process waits on.
+
+    Because of that flush a batch only ever holds messages that arrived
+    before the next turn of their thread: turns of several threads of
+    the same user, or a burst sent without waiting for answers. A single
+    conversation answered turn by turn gets one extraction call per
+    personal message; the pre-filter is what saves calls there.
+    """
+
+    def __init__(self, workers=POST_TURN_WORKERS, batch_size=MEMORY_BATCH_SIZE,
+                 batch_seconds=MEMORY_BATCH_SECONDS):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+
+        self._cond = threading.Condition()
+        self._summaries = []
+        self._memory = {}
+        self._flush_users = set()
+        self._busy_threads = set()
+        self._busy_users = set()
+        self._outstanding = {}
+        # Highest message seq submitted per thread with work outstanding
+        self._pending_seq = {}
+        # (loop, future) pairs of turns waiting on a thread, released on
+        # their event loop when its count reaches zero
+        self._waiters = {}
+        self._stopping = False
+        self._threads = []
+
+        self.turns = 0
+        self.summaries = 0
+        self.memory_calls = 0
+        self.messages_extracted = 0
+        self.messages_filtered = 0
+        self.waits = 0
+        self.wait_ms = 0.0
+
+    def start(self):
+        for n in range(self.workers):
+            worker = threading.Thread(target=self._work_loop, name=f"post-turn-{n}", daemon=True)
+            worker.start()
+            self._threads.append(worker)
+
+    def stop(self, timeout=POST_TURN_WAIT_SECONDS):
+        # Workers drain everything still queued before exiting
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+        for worker in self._threads:
+            worker.join(timeout)
+
+        self._threads = []
+
+    def submit(self, user_id, thread_id, seq, *texts):
+        """
+        Queue post-turn work for a stored turn ending at message `seq`.
+        `texts` are the user's question (original and/or translated) for
+        memory extraction.
+        """
+
+        key = (user_id, thread_id)
+        personal = has_personal_facts(*texts)
+        # The translated text alone is enough when there is one
+        message = next((text for text in reversed(texts) if text), None)
+
+        # Without workers (scripts, benchmarks) do the work inline
+        if not self._threads:
+            summarize_thread(user_id, thread_id)
+            if personal:
+                extract_memory(user_id, [message])
+            mark_processed(thread_id, user_id, seq)
+            return
+
+        with self._cond:
+            self.turns += 1
+            self._pending_seq[key] = max(self._pending_seq.get(key, 0), seq)
+
+            if key not in self._summaries:
+                self._summaries.append(key)
+                self._outstanding[key] = self._outstanding.get(key, 0) + 1
+
+            if personal:
+                batch = self._memory.setdefault(user_id, {
+                    "messages": [],
+                    "threads": set(),
+                    "since": time.monotonic()
+                })
+                batch["messages"].append(message)
+
+                if key not in batch["threads"]:
+                    batch["threads"].add(key)
+                    self._outstanding[key] = self._outstanding.get(key, 0) + 1
+            else:
+                self.messages_filtered += 1
+
+            self._cond.notify_all()
+
+    async def wait_for_thread(self, user_id, thread_id, timeout=POST_TURN_WAIT_SECONDS):
+        """
+        Wait until the thread's previous turns have been fully processed,
+        by this process or any other. Returns False if the timeout expired
+        first.
+
+        A coroutine, so a burst of waiting turns holds no pool threads:
+        only the short SQLite reads between polls run on the io pool.
+        """
+
+        key = (user_id, thread_id)
+        start = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        waited = False
+        done = True
+        waiter = None
+
+        with self._cond:
+            if self._outstanding.get(key):
+                waited = True
+                loop = asyncio.get_running_loop()
+                waiter = (loop, loop.create_future())
+                self._waiters.setdefault(key, []).append(waiter)
+                self._flush_users.add(user_id)
+                self._cond.notify_all()
+
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter[1], timeout)
+            except asyncio.TimeoutError:
+                done = False
+            finally:
+                with self._cond:
+                    waiters = self._waiters.get(key, [])
+                    if waiter in waiters:
+                        waiters.remove(waiter)
+                    if not waiters:
+                        self._waiters.pop(key, None)
+
+        # Earlier turns may have been answered by another worker process
+        while done:
+            last_seq, processed_seq = await run_io(load_processing_state, thread_id, user_id)
+
+            if processed_seq >= last_seq:
+                break
+
+            if time.monotonic() >= deadline:
+                # The process holding that work may have died; don't make
+                # every later turn of the thread wait out the timeout too
+                await run_io(mark_processed, thread_id, user_id, last_seq)
+                done = False
+                break
+
+            waited = True
+            await asyncio.sleep(POST_TURN_POLL_SECONDS)
+
+        if waited:
+            with self._cond:
+                self.waits += 1
+                self.wait_ms += (time.perf_counter() - start) * 1000
+
+        return done
+
+    def _release_waiters(self, key):
+        # Called with self._cond held, once the key's count reaches zero
+        for loop, future in self._waiters.pop(key, []):
+            loop.call_soon_threadsafe(_set_done, future)
+
+    def _next_task(self):
+        # Called with self._cond held
+        while True:
+            for key in self._summaries:
+                if key not in self._busy_threads:
+                    self._summaries.remove(key)
+                    self._busy_threads.add(key)
+                    return "summary", key, None
+
+            now = time.monotonic()
+            next_due = None
+
+            for user_id, batch in self._memory.items():
+                if user_id in self._busy_users:
+                    continue
+
+                due_at = batch["since"] + self.batch_seconds
+
+                if (self._stopping or user_id in self._flush_users
+                        or len(batch["messages"]) >= self.batch_size or now >= due_at):
+                    self._flush_users.discard(user_id)
+                    self._busy_users.add(user_id)
+                    return "memory", user_id, self._memory.pop(user_id)
+
+                next_due = due_at if next_due is None else min(next_due, due_at)
+
+            if self._stopping and not self._summaries and not self._memory:
+                return None
+
+            self._cond.wait(None if next_due is None else next_due - now)
+
+    def _work_loop(self):
+        while True:
+            with self._cond:
+                task = self._next_task()
+
+            if task is None:
+                return
+
+            kind, target, batch = task
+
+            try:
+                if kind == "summary":
+                    if summarize_thread(*target):
+                        self.summaries += 1
+                else:
+                    extract_memory(target, batch["messages"])
+                    self.memory_calls += 1
+                    self.messages_extracted += len(batch["messages"])
+            except Exception:
+                traceback.print_exc()
+            finally:
+                done_keys = [target] if kind == "summary" else batch["threads"]
+                finished = []
+
+                with self._cond:
+                    if kind == "summary":
+                        self._busy_threads.discard(target)
+                    else:
+                        self._busy_users.discard(target)
+
+                    for key in done_keys:
+                        if self._outstanding[key] == 1:
+                            finished.append((key, self._pending_seq[key]))
+                        else:
+                            self._outstanding[key] -= 1
+
+                    self._cond.notify_all()
+
+                # A thread's last piece of work is recorded in SQLite before
+                # its count drops, so released waiters already see it
+                while finished:
+                    for (user_id, thread_id), seq in finished:
+                        try:
+                            mark_processed(thread_id, user_id, seq)
+                        except Exception:
+                            traceback.print_exc()
+
+                    with self._cond:
+                        later = []
+
+                        for key, seq in finished:
+                            if self._outstanding[key] == 1 and self._pending_seq[key] > seq:
+                                # Newer turns were submitted and done meanwhile
+                                later.append((key, self._pending_seq[key]))
+                                continue
+
+                            self._outstanding[key] -= 1
+                            if not self._outstanding[key]:
+                                del self._outstanding[key]
+                                del self._pending_seq[key]
+                                self._release_waiters(key)
+
+                        self._cond.notify_all()
+
+                    finished = later
+
+    def stats(self):
+        with self._cond:
+            return {
+                "turns": self.turns,
+                "summaries": self.summaries,
+                "memory_calls": self.memory_calls,
+                "messages_extracted": self.messages_extracted,
+                "messages_filtered": self.messages_filtered,
+                "pending_threads": len(self._outstanding),
+                "waits": self.waits,
+                "wait_ms": round(self.wait_ms, 1)
+            }
+
+
+def _set_done(future):
+    # The waiter may have timed out and cancelled it already
+    if not future.done():
+        future.set_result(None)
+
+
+post_turn = PostTurnProcessor()
@@ -0,0 +1,280 @@
+import os
+import re
+
+# Per-section budgets in (estimated) Gemini tokens
+PROMPT_MEMORY_TOKENS = int(os.getenv("PROMPT_MEMORY_TOKENS", "200"))
+PROMPT_SUMMARY_TOKENS = int(os.getenv("PROMPT_SUMMARY_TOKENS", "400"))
+PROMPT_HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", "800"))
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "3000"))
+
+# No single history message takes more than this share of its budget,
+# so a long answer can't crowd out the question before it
+HISTORY_MESSAGE_SHARE = 0.5
+# Don't add a message cut down to fewer tokens than this
+HISTORY_MIN_TOKENS = 16
+
+# Chunks sharing this fraction of their word trigrams count as duplicates
+NEAR_DUPLICATE_OVERLAP = float(os.getenv("NEAR_DUPLICATE_OVERLAP", "0.8"))
+
+# Longest chunk overlap the splitter produces is 200 chars; look a bit further
+MAX_CHUNK_OVERLAP = 400
+MIN_CHUNK_OVERLAP = 20
+
+WORD = re.compile(r"\w+")
+
+PROMPT_TEMPLATE = """You are an intelligent and personalized AI assistant.
+
+Guidelines:
+- Use structured user memory if relevant.
+- Use document context strictly when answering document-related questions.
+- If no document context is available, rely on conversation and memory.
+- Explain document content in simple language.
+- Answer completely and clearly.
+- Never cut responses midway.
+
+User Memory:
+{memory}
+
+Conversation Summary:
+{summary}
+
+Recent Conversation:
+{history}
+
+Document Context:
+{context}
+
+Question:
+{question}
+"""
+
+
+# ==========================================
+# 🔢 Token Estimates
+# ==========================================
+
+def estimate_tokens(text):
+    """
+    Rough Gemini token count without a tokenizer: ~4 chars per token for
+    ASCII text, ~2 for Indic and other non-ASCII scripts.
+    """
+
+    if not text:
+        return 0
+
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - non_ascii
+
+    return (ascii_chars + 3) // 4 + (non_ascii + 1) // 2
+
+
+def truncate_to_tokens(text, max_tokens, keep="head"):
+    """
+    Cut text to fit max_tokens on a word boundary, keeping the start
+    ("head") or the end ("tail").
+    """
+
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    if max_tokens <= 0:
+        return ""
+
+    length = len(text)
+
+    while length > 0:
+        length = int(length * 0.9)
+        piece = text[:length] if keep == "head" else text[len(text) - length:]
+
+        if estimate_tokens(piece) <= max_tokens:
+            break
+
+    # Don't leave half a word at the cut
+    if keep == "head":
+        piece = piece.rsplit(None, 1)[0] if " " in piece else piece
+    else:
+        piece = piece.split(None, 1)[-1] if " " in piece else piece
+
+    return piece
+
+
+# ==========================================
+# 📚 Document Context
+# ==========================================
+
+def merge_overlap(first, second):
+    """
+    Join two consecutive chunks, dropping the text the splitter repeated
+    at the start of the second one.
+    """
+
+    longest = min(len(first), len(second), MAX_CHUNK_OVERLAP)
+
+    for size in range(longest, MIN_CHUNK_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+
+    return first + " " + second
+
+
+def merge_adjacent_hits(hits):
+    """
+    Group hits (best first) into runs of consecutive chunk ids from the
+    same document and merge each run into one passage. A run keeps the
+    best rank of its members.
+    """
+
+    ranked = sorted(enumerate(hits), key=lambda item: (item[1]["doc_id"], item[1]["id"]))
+    passages = []
+
+    for rank, hit in ranked:
+        last = passages[-1] if passages else None
+
+        if last and last["doc_id"] == hit["doc_id"] and hit["id"] == last["ids"][-1] + 1:
+            last["text"] = merge_overlap(last["text"], hit["text"])
+            last["ids"].append(hit["id"])
+            last["rank"] = min(last["rank"], rank)
+            continue
+
+        passages.append({
+            "doc_id": hit["doc_id"],
+            "ids": [hit["id"]],
+            "text": hit["text"],
+            "rank": rank
+        })
+
+    return passages
+
+
+def _shingles(text):
+    words = WORD.findall(text.lower())
+    if len(words) < 3:
+        return {tuple(words)}
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def select_passages(hits, max_tokens):
+    """
+    Merge, deduplicate and rank retrieved hits, then fill the context
+    budget best-first. Returns (passages, stats).
+    """
+
+    passages = merge_adjacent_hits(hits)
+    passages.sort(key=lambda passage: passage["rank"])
+
+    selected = []
+    kept_shingles = []
+    used = 0
+    duplicates = 0
+    over_budget = 0
+
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+
+        if any(
+            len(shingles & kept) / max(min(len(shingles), len(kept)), 1) >= NEAR_DUPLICATE_OVERLAP
+            for kept in kept_shingles
+        ):
+            duplicates += 1
+            continue
+
+        tokens = estimate_tokens(passage["text"])
+
+        if used + tokens > max_tokens:
+            if selected:
+                # A shorter, lower-ranked passage may still fit
+                over_budget += 1
+                continue
+
+            # Never send an empty context because the best hit is long
+            passage["text"] = truncate_to_tokens(passage["text"], max_tokens)
+            tokens = estimate_tokens(passage["text"])
+
+        selected.append(passage)
+        kept_shingles.append(shingles)
+        used += tokens
+
+    stats = {
+        "hits": len(hits),
+        "passages": len(passages),
+        "duplicates_dropped": duplicates,
+        "over_budget_dropped": over_budget,
+        "passages_used": len(selected)
+    }
+
+    return selected, stats
+
+
+# ==========================================
+# 🎯 Final Prompt
+# ==========================================
+
+def build_history(messages, max_tokens):
+    """
+    Most recent messages that fit the budget, oldest first. Long
+    messages are cut to fit rather than dropped.
+    """
+
+    lines = []
+    used = 0
+    message_tokens = int(max_tokens * HISTORY_MESSAGE_SHARE)
+
+    for msg in reversed(messages):
+        prefix = f"{msg['role'].upper()}: "
+        limit = min(max_tokens - used, message_tokens) - estimate_tokens(prefix) - 1
+
+        if limit < HISTORY_MIN_TOKENS:
+            break
+
+        line = prefix + truncate_to_tokens(msg["content"], limit)
+
+        lines.append(line)
+        used += estimate_tokens(line) + 1
+
+    return "\n".join(reversed(lines))
+
+
+def build_memory(memory, max_tokens):
+    lines = []
+    used = 0
+
+    for key, value in memory.items():
+        line = f"{key}: {value}"
+        tokens = estimate_tokens(line) + 1
+
+        if used + tokens > max_tokens:
+            break
+
+        lines.append(line)
+        used += tokens
+
+    return "\n".join(lines)
+
+
+def build_answer_prompt(question, memory=None, summary="", messages=(), hits=()):
+    """
+    Assemble the Gemini prompt with every section held to its token
+    budget. Returns (prompt, stats); stats["prompt_tokens"] is the
+    estimated size of what is sent.
+    """
+
+    passages, context_stats = select_passages(list(hits), PROMPT_CONTEXT_TOKENS)
+
+    sections = {
+        "memory": build_memory(memory or {}, PROMPT_MEMORY_TOKENS),
+        # Newest part of the summary matters most
+        "summary": truncate_to_tokens(summary or "", PROMPT_SUMMARY_TOKENS, keep="tail"),
+        "history": build_history(list(messages), PROMPT_HISTORY_TOKENS),
+        "context": "\n\n".join(passage["text"] for passage in passages),
+        "question": question
+    }
+
+    prompt = PROMPT_TEMPLATE.format(**sections)
+
+    stats = {
+        "prompt_tokens": estimate_tokens(prompt),
+        "section_tokens": {name: estimate_tokens(text) for name, text in sections.items()},
+        **context_stats
+    }
+
+    return prompt, stats
@@ -1,47 +1,188 @@
 import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.metrics import OUTBOUND_ERRORS, OUTBOUND_SECONDS
+from app.translation_cache import is_probably_english, translation_cache
 
 load_dotenv()
 
 SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
+SARVAM_API_URL = os.getenv("SARVAM_API_URL", "https://api.sarvam.ai")
+
+MAX_CHARS = 4000  # adjust based on Sarvam limits
+TRANSLATE_WORKERS = int(os.getenv("SARVAM_TRANSLATE_WORKERS", "8"))
+REQUEST_TIMEOUT = float(os.getenv("SARVAM_TIMEOUT", "60"))
+
+
+# ==========================================
+# 🔌 Shared HTTP Session (Keep-Alive + Retries)
+# ==========================================
+
+def _build_session():
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=max(TRANSLATE_WORKERS, 10),
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Authorization"] = f"Bearer {SARVAM_API_KEY}"
+
+    return session
+
+
+session = _build_session()
+
+
+def _post(call, url, **kwargs):
+    # Timed including urllib3's retries, which is what the caller waits for
+    with OUTBOUND_SECONDS.time("sarvam", call):
+        try:
+            response = session.post(url, timeout=REQUEST_TIMEOUT, **kwargs)
+        except requests.RequestException:
+            OUTBOUND_ERRORS.inc(1, "sarvam", call)
+            raise
+
+    if response.status_code != 200:
+        OUTBOUND_ERRORS.inc(1, "sarvam", call)
+
+    return response
+
+
+# ==========================================
+# ✂️ Sentence-Aware Splitting
+# ==========================================
+
+# Sentence ends: Latin punctuation plus Devanagari danda / double danda
+SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+")
+
+
+def _safe_cut(text, limit):
+    """
+    Cut position <= limit that doesn't split a word or a grapheme
+    cluster (combining marks stay with their base character).
+    """
+
+    cut = text.rfind(" ", 0, limit)
+    if cut > 0:
+        return cut + 1
+
+    # Step back over combining marks, and past a virama so conjuncts
+    # like "क्ष" are not split
+    cut = limit
+    while cut > 1 and (
+        unicodedata.category(text[cut]).startswith("M")
+        or unicodedata.combining(text[cut - 1]) == 9
+    ):
+        cut -= 1
+    return cut
+
+
+def split_for_translation(text: str, max_chars: int = MAX_CHARS):
+    """
+    Split text into pieces of at most max_chars along paragraph, then
+    sentence boundaries. Returns [(piece, separator)] where separator is
+    the whitespace to put back after the translated piece.
+    """
+
+    pieces = []
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        if not paragraph.strip():
+            continue
+
+        current = ""
+
+        for sentence in SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:
+                cut = _safe_cut(sentence, max_chars)
+                if current:
+                    pieces.append((current, " "))
+                    current = ""
+                pieces.append((sentence[:cut].rstrip(), " "))
+                sentence = sentence[cut:]
+
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                pieces.append((current, " "))
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+
+        if current:
+            pieces.append((current, "\n\n"))
+
+    return pieces
+
+
+# ==========================================
+# 🌍 Document Translation (Parallel Batches)
+# ==========================================
 
 def translate_document_to_english(text: str) -> str:
     """
     Translates full document text to English.
-    Handles large text by batching.
+    Splits on paragraph/sentence boundaries and translates the pieces
+    concurrently, reassembling them in order.
     """
 
-    MAX_CHARS = 4000  # adjust based on Sarvam limits
+    pieces = split_for_translation(text)
+
+    if not pieces:
+        return ""
 
-    translated_parts = []
+    with ThreadPoolExecutor(max_workers=TRANSLATE_WORKERS) as executor:
+        translated = list(executor.map(
+            sarvam_translate_to_english,
+            [piece for piece, _ in pieces]
+        ))
 
-    for i in range(0, len(text), MAX_CHARS):
-        chunk = text[i:i+MAX_CHARS]
-        translated = sarvam_translate_to_english(chunk)
-        translated_parts.append(translated)
+    return "".join(
+        part + separator
+        for part, (_, separator) in zip(translated, pieces)
+    ).strip()
 
-    return "\n".join(translated_parts)
 
 def sarvam_speech_to_text(audio_path: str):
-    url = "https://api.sarvam.ai/speech-to-text"  # example endpoint
+    url = f"{SARVAM_API_URL}/speech-to-text"  # example endpoint
 
     with open(audio_path, "rb") as f:
         files = {"file": f}
-        headers = {"Authorization": f"Bearer {SARVAM_API_KEY}"}
 
-        response = requests.post(url, files=files, headers=headers)
+        response = _post("speech_to_text", url, files=files)
 
     return response.json().get("text", "")
 
 
 def sarvam_translate_to_english(text: str):
-    url = "https://api.sarvam.ai/translate"
 
-    headers = {
-        "Authorization": f"Bearer {SARVAM_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    # Skip the remote call entirely for text that is already English
+    if is_probably_english(text):
+        translation_cache.record_skip()
+        return text
+
+    cached = translation_cache.get(text, "auto", "en")
+    if cached is not None:
+        return cached
+
+    url = f"{SARVAM_API_URL}/translate"
 
     data = {
         "source_language": "auto",
@@ -49,7 +190,17 @@ def sarvam_translate_to_english(text: str):
         "text": text
     }
 
-    response = requests.post(url, json=data, headers=headers)
+    response = _post("translate", url, json=data)
+
+    if response.status_code != 200:
+        return text
+
+    translated = response.json().get("translated_text")
+
+    # Only successful translations are cached
+    if translated is None:
+        return text
 
-    return response.json().get("translated_text", text)
+    translation_cache.put(text, "auto", "en", translated)
 
+    return translated
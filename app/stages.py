@@ -0,0 +1,119 @@
+import asyncio
+import inspect
+import time
+
+from app.executors import run_cpu, run_io
+from app.metrics import STAGE_SECONDS
+
+
+# ==========================================
+# 🕸 Stage Graph (Concurrent Request Stages)
+# ==========================================
+
+class StageGraph:
+    """
+    A small dependency graph of request stages.
+
+    Each stage is a callable receiving its dependencies' results as
+    keyword arguments (named after the dependency). Stages start as soon
+    as their dependencies finish; blocking callables run on the "io" or
+    "cpu" pool, coroutine functions run on the event loop.
+
+    Stage durations are also recorded in the rag_stage_seconds
+    histogram, labelled with the graph's endpoint name.
+    """
+
+    def __init__(self, endpoint="request"):
+        self.endpoint = endpoint
+        self._stages = {}
+        self.timings = {}
+
+    def add(self, name, func, deps=(), pool="io"):
+        self._stages[name] = (func, tuple(deps), pool)
+
+    def start(self):
+        """
+        Schedule every stage. Safe to call more than once.
+        """
+
+        if getattr(self, "_tasks", None) is not None:
+            return
+
+        self._t0 = time.perf_counter()
+        self._tasks = {}
+
+        for name in self._stages:
+            self._tasks[name] = asyncio.ensure_future(self._run_stage(name))
+
+    async def result(self, name):
+        """
+        Wait for one stage only, leaving the others running.
+        """
+
+        self.start()
+        return await self._tasks[name]
+
+    def cancel(self):
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+
+    async def run(self):
+        self.start()
+
+        try:
+            results = await asyncio.gather(*self._tasks.values())
+        except BaseException:
+            self.cancel()
+            raise
+
+        return dict(zip(self._tasks.keys(), results))
+
+    async def _run_stage(self, name):
+        func, deps, pool = self._stages[name]
+
+        kwargs = {}
+        for dep in deps:
+            kwargs[dep] = await self._tasks[dep]
+
+        start = time.perf_counter()
+
+        if inspect.iscoroutinefunction(func):
+            result = await func(**kwargs)
+        else:
+            result = await (run_cpu if pool == "cpu" else run_io)(func, **kwargs)
+
+        end = time.perf_counter()
+
+        STAGE_SECONDS.observe(end - start, self.endpoint, name)
+
+        self.timings[name] = {
+            "start_ms": round((start - self._t0) * 1000, 1),
+            "end_ms": round((end - self._t0) * 1000, 1),
+            "duration_ms": round((end - start) * 1000, 1)
+        }
+
+        return result
+
+    def critical_path(self, final_stage):
+        """
+        Walk back from final_stage through the dependency that finished
+        last at each step.
+        """
+
+        path = [final_stage]
+
+        while True:
+            _, deps, _ = self._stages[path[-1]]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda d: self.timings[d]["end_ms"]))
+
+        return list(reversed(path))
+
+    def report(self, final_stage):
+        return {
+            "total_ms": max(t["end_ms"] for t in self.timings.values()),
+            "critical_path": self.critical_path(final_stage),
+            "stages": self.timings
+        }
@@ -1,26 +1,131 @@
 import sqlite3
 import json
+import os
+import threading
+import time
 
 DB_PATH = "threads.db"
 
+# Connection tuning
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE = 128
+
+
+# =========================
+# Connection Manager
+# =========================
+
+_local = threading.local()
+
+
+def get_connection():
+    """
+    Return this OS thread's connection to DB_PATH, opening it on first use.
+
+    WAL mode lets readers in other threads/processes run while one writer
+    commits; the sqlite3 statement cache reuses prepared statements for
+    the fixed queries below.
+    """
+
+    conn = getattr(_local, "conn", None)
+
+    if conn is not None and _local.path == DB_PATH:
+        return conn
+
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=DB_STATEMENT_CACHE
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    _local.conn = conn
+    _local.path = DB_PATH
+
+    return conn
+
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = get_connection()
+
+    # Every API worker runs this at startup. The write lock makes the
+    # column checks and ALTERs below one step, so two workers can't both
+    # add the same column
+    conn.execute("BEGIN IMMEDIATE")
 
+    try:
+        _create_tables(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    migrate_message_blobs()
+
+
+def _create_tables(conn):
     # 🧵 Thread storage
-    cursor.execute("""
+    # `messages` is the legacy JSON blob, emptied once migrated into the
+    # messages table; `summarized_seq` is the last seq folded into summary;
+    # `processed_seq` is the last seq whose post-turn work has finished
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS threads (
         thread_id TEXT,
         user_id TEXT,
         summary TEXT,
         messages TEXT,
+        summarized_seq INTEGER DEFAULT 0,
+        updated_at REAL,
+        processed_seq INTEGER DEFAULT 0,
         PRIMARY KEY (thread_id, user_id)
     )
     """)
 
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(threads)")}
+    if "summarized_seq" not in columns:
+        conn.execute("ALTER TABLE threads ADD COLUMN summarized_seq INTEGER DEFAULT 0")
+    if "updated_at" not in columns:
+        conn.execute("ALTER TABLE threads ADD COLUMN updated_at REAL")
+
+    # 💬 Append-only message log
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS messages (
+        thread_id TEXT,
+        user_id TEXT,
+        seq INTEGER,
+        role TEXT,
+        content TEXT,
+        PRIMARY KEY (thread_id, user_id, seq)
+    ) WITHOUT ROWID
+    """)
+
+    if "processed_seq" not in columns:
+        # Nothing is pending for threads that existed before the column
+        conn.execute("ALTER TABLE threads ADD COLUMN processed_seq INTEGER DEFAULT 0")
+        conn.execute("""
+        UPDATE threads SET processed_seq = (
+            SELECT COALESCE(MAX(seq), 0) FROM messages
+            WHERE messages.thread_id = threads.thread_id
+              AND messages.user_id = threads.user_id
+        )
+        """)
+
     # 🧠 Structured Long-Term Memory
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS user_memory (
         user_id TEXT,
         key TEXT,
@@ -29,46 +134,210 @@ def init_db():
     )
     """)
 
-    conn.commit()
-    conn.close()
+
+def migrate_message_blobs():
+    """
+    Move legacy JSON message blobs from the threads table into the
+    messages log.
+    """
+
+    conn = get_connection()
+
+    rows = conn.execute("""
+    SELECT thread_id, user_id, messages FROM threads
+    WHERE messages IS NOT NULL AND messages != ''
+    """).fetchall()
+
+    with conn:
+        for thread_id, user_id, blob in rows:
+            messages = json.loads(blob)
+
+            conn.executemany("""
+            INSERT OR IGNORE INTO messages (thread_id, user_id, seq, role, content)
+            VALUES (?, ?, ?, ?, ?)
+            """, [
+                (thread_id, user_id, seq, msg["role"], msg["content"])
+                for seq, msg in enumerate(messages, start=1)
+            ])
+
+            conn.execute("""
+            UPDATE threads SET messages = NULL, processed_seq = ?
+            WHERE thread_id = ? AND user_id = ?
+            """, (len(messages), thread_id, user_id))
+
+    return len(rows)
 
 
 # =========================
 # Thread Functions
 # =========================
 
-def load_thread(thread_id, user_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def _rows_to_messages(rows):
+    return [
+        {"seq": seq, "role": role, "content": content}
+        for seq, role, content in rows
+    ]
+
+
+def load_thread(thread_id, user_id, limit=None):
+    """
+    Load the summary and the last `limit` messages (all if None),
+    oldest first.
+    """
 
-    cursor.execute("""
-    SELECT summary, messages FROM threads
+    conn = get_connection()
+
+    row = conn.execute("""
+    SELECT summary, summarized_seq FROM threads
+    WHERE thread_id = ? AND user_id = ?
+    """, (thread_id, user_id)).fetchone()
+
+    rows = conn.execute("""
+    SELECT seq, role, content FROM messages
     WHERE thread_id = ? AND user_id = ?
-    """, (thread_id, user_id))
+    ORDER BY seq DESC
+    LIMIT ?
+    """, (thread_id, user_id, -1 if limit is None else limit)).fetchall()
+
+    return {
+        "summary": (row[0] or "") if row else "",
+        "summarized_seq": (row[1] or 0) if row else 0,
+        "messages": _rows_to_messages(reversed(rows))
+    }
+
+
+def load_messages(thread_id, user_id, after_seq=0, through_seq=None):
+    """
+    Load messages with after_seq < seq <= through_seq, oldest first.
+    """
+
+    conn = get_connection()
+
+    rows = conn.execute("""
+    SELECT seq, role, content FROM messages
+    WHERE thread_id = ? AND user_id = ? AND seq > ? AND seq <= ?
+    ORDER BY seq
+    """, (thread_id, user_id, after_seq, through_seq if through_seq is not None else 2 ** 62)).fetchall()
+
+    return _rows_to_messages(rows)
+
+
+def load_thread_page(thread_id, user_id, before_seq=None, limit=50):
+    """
+    Keyset pagination: up to `limit` messages with seq < before_seq,
+    oldest first, plus the cursor for the previous page.
+    """
+
+    conn = get_connection()
+
+    rows = conn.execute("""
+    SELECT seq, role, content FROM messages
+    WHERE thread_id = ? AND user_id = ? AND seq < ?
+    ORDER BY seq DESC
+    LIMIT ?
+    """, (thread_id, user_id, before_seq if before_seq is not None else 2 ** 62, limit + 1)).fetchall()
+
+    has_more = len(rows) > limit
+    messages = _rows_to_messages(reversed(rows[:limit]))
+
+    return {
+        "messages": messages,
+        "next_before_seq": messages[0]["seq"] if has_more else None
+    }
+
+
+def append_messages(thread_id, user_id, messages):
+    """
+    Append new messages to the thread's log. Only the new rows are written.
+    """
+
+    conn = get_connection()
 
-    row = cursor.fetchone()
-    conn.close()
+    with conn:
+        conn.execute("""
+        INSERT INTO threads (thread_id, user_id, summary, summarized_seq, updated_at)
+        VALUES (?, ?, '', 0, ?)
+        ON CONFLICT(thread_id, user_id)
+        DO UPDATE SET updated_at = excluded.updated_at
+        """, (thread_id, user_id, time.time()))
 
-    if row:
-        return {
-            "summary": row[0] or "",
-            "messages": json.loads(row[1]) if row[1] else []
-        }
+        last_seq = conn.execute("""
+        SELECT COALESCE(MAX(seq), 0) FROM messages
+        WHERE thread_id = ? AND user_id = ?
+        """, (thread_id, user_id)).fetchone()[0]
 
-    return {"summary": "", "messages": []}
+        conn.executemany("""
+        INSERT INTO messages (thread_id, user_id, seq, role, content)
+        VALUES (?, ?, ?, ?, ?)
+        """, [
+            (thread_id, user_id, last_seq + offset, msg["role"], msg["content"])
+            for offset, msg in enumerate(messages, start=1)
+        ])
 
+    return last_seq + len(messages)
 
-def save_thread(thread_id, user_id, summary, messages):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
 
-    cursor.execute("""
-    INSERT OR REPLACE INTO threads (thread_id, user_id, summary, messages)
-    VALUES (?, ?, ?, ?)
-    """, (thread_id, user_id, summary, json.dumps(messages)))
+def save_summary(thread_id, user_id, summary, summarized_seq):
+    conn = get_connection()
 
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("""
+        INSERT INTO threads (thread_id, user_id, summary, summarized_seq, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(thread_id, user_id)
+        DO UPDATE SET summary = excluded.summary,
+                      summarized_seq = excluded.summarized_seq
+        """, (thread_id, user_id, summary, summarized_seq, time.time()))
+
+
+def mark_processed(thread_id, user_id, seq):
+    """
+    Record that post-turn work for every message up to `seq` has finished.
+    """
+
+    conn = get_connection()
+
+    with conn:
+        conn.execute("""
+        UPDATE threads SET processed_seq = MAX(COALESCE(processed_seq, 0), ?)
+        WHERE thread_id = ? AND user_id = ?
+        """, (seq, thread_id, user_id))
+
+
+def load_processing_state(thread_id, user_id):
+    """
+    (last message seq, last processed seq) of a thread; post-turn work is
+    pending while the first is ahead of the second.
+    """
+
+    conn = get_connection()
+
+    row = conn.execute("""
+    SELECT COALESCE(processed_seq, 0),
+           (SELECT COALESCE(MAX(seq), 0) FROM messages
+            WHERE thread_id = threads.thread_id AND user_id = threads.user_id)
+    FROM threads
+    WHERE thread_id = ? AND user_id = ?
+    """, (thread_id, user_id)).fetchone()
+
+    if row is None:
+        return 0, 0
+
+    processed_seq, last_seq = row
+    return last_seq, processed_seq
+
+
+def list_user_threads(user_id):
+    conn = get_connection()
+
+    rows = conn.execute("""
+    SELECT thread_id
+    FROM threads
+    WHERE user_id = ?
+    ORDER BY updated_at DESC, rowid DESC
+    """, (user_id,)).fetchall()
+
+    return [row[0] for row in rows]
 
 
 # =========================
@@ -76,30 +345,23 @@ def save_thread(thread_id, user_id, summary, messages):
 # =========================
 
 def save_memory(user_id, key, value):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = get_connection()
 
-    cursor.execute("""
-    INSERT INTO user_memory (user_id, key, value)
-    VALUES (?, ?, ?)
-    ON CONFLICT(user_id, key)
-    DO UPDATE SET value = excluded.value
-    """, (user_id, key, value))
-
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("""
+        INSERT INTO user_memory (user_id, key, value)
+        VALUES (?, ?, ?)
+        ON CONFLICT(user_id, key)
+        DO UPDATE SET value = excluded.value
+        """, (user_id, key, value))
 
 
 def load_all_memory(user_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = get_connection()
 
-    cursor.execute("""
+    rows = conn.execute("""
     SELECT key, value FROM user_memory
     WHERE user_id = ?
-    """, (user_id,))
-
-    rows = cursor.fetchall()
-    conn.close()
+    """, (user_id,)).fetchall()
 
     return {key: value for key, value in rows}
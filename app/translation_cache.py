@@ -0,0 +1,190 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DB_PATH = os.getenv("TRANSLATION_CACHE_DB", "translation_cache.db")
+MEMORY_MAX_ITEMS = int(os.getenv("TRANSLATION_CACHE_MEMORY_ITEMS", "4096"))
+DISK_MAX_BYTES = int(os.getenv("TRANSLATION_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+# ==========================================
+# 🔤 Cheap "Already English?" Check
+# ==========================================
+
+ENGLISH_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "in",
+    "on", "for", "and", "or", "what", "which", "who", "how", "when", "where",
+    "why", "do", "does", "can", "i", "my", "me", "you", "it", "this", "that",
+    "with", "from", "at", "by", "need", "needed", "should", "will", "have", "has"
+}
+
+WORD = re.compile(r"[A-Za-z']+")
+
+
+def is_probably_english(text: str) -> bool:
+    """
+    True when text is written only in ASCII Latin letters and contains
+    common English function words, so romanised Hindi such as "kya
+    documents chahiye" or "yojana kab" still goes to Sarvam. Short
+    queries get no exemption; a wrongly translated English keyword costs
+    one cached Sarvam call.
+    """
+
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return True
+
+    if any(not c.isascii() for c in letters):
+        return False
+
+    words = [w.lower() for w in WORD.findall(text)]
+
+    stopwords = sum(1 for w in words if w in ENGLISH_STOPWORDS)
+    return stopwords / len(words) >= 0.15
+
+
+# ==========================================
+# 🗄 Two-Tier Cache (Memory LRU + SQLite)
+# ==========================================
+
+def cache_key(text, source_language, target_language):
+    payload = f"{source_language}\x00{target_language}\x00{text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class TranslationCache:
+
+    def __init__(self, db_path, memory_max_items, disk_max_bytes):
+        self.memory_max_items = memory_max_items
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS translations (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            size INTEGER,
+            last_used REAL
+        )
+        """)
+        self._conn.execute("""
+        CREATE INDEX IF NOT EXISTS translations_last_used
+        ON translations (last_used)
+        """)
+        self._conn.commit()
+
+        self.disk_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM translations"
+        ).fetchone()[0]
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped_english = 0
+        self.evictions = 0
+
+    def get(self, text, source_language, target_language):
+        key = cache_key(text, source_language, target_language)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE translations SET last_used = ? WHERE key = ?",
+                (time.time(), key)
+            )
+            self._conn.commit()
+
+            self.disk_hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, text, source_language, target_language, translated):
+        key = cache_key(text, source_language, target_language)
+        size = len(key) + len(translated.encode("utf-8"))
+
+        with self._lock:
+            self._remember(key, translated)
+
+            old = self._conn.execute(
+                "SELECT size FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+
+            self._conn.execute("""
+            INSERT OR REPLACE INTO translations (key, value, size, last_used)
+            VALUES (?, ?, ?, ?)
+            """, (key, translated, size, time.time()))
+
+            self.disk_bytes += size - (old[0] if old else 0)
+            self._evict_disk()
+            self._conn.commit()
+
+    def record_skip(self):
+        with self._lock:
+            self.skipped_english += 1
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        # Drop least recently used rows until back under ~90% of budget
+        if self.disk_bytes <= self.disk_max_bytes:
+            return
+
+        target = int(self.disk_max_bytes * 0.9)
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM translations ORDER BY last_used"
+        )
+
+        doomed = []
+        for key, size in rows:
+            if self.disk_bytes <= target:
+                break
+            doomed.append((key,))
+            self.disk_bytes -= size
+
+        self._conn.executemany("DELETE FROM translations WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_items": len(self._memory),
+                "disk_bytes": self.disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "skipped_english": self.skipped_english,
+                "remote_calls_saved": hits + self.skipped_english,
+                "evictions": self.evictions
+            }
+
+
+translation_cache = TranslationCache(CACHE_DB_PATH, MEMORY_MAX_ITEMS, DISK_MAX_BYTES)
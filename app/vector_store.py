@@ -1,24 +1,533 @@
 import faiss
+import json
 import numpy as np
 import os
-import pickle
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    # No flock() (Windows): writes are only serialized within one process
+    fcntl = None
+
+from app.lexical_index import open_lexical_index
+from app.metadata_store import MetadataStore, migrate_pickle
+from app.metrics import OPERATION_SECONDS
 
 BASE_PATH = "vector_store"
 DIMENSION = 384
 
+# Memory budget for loaded thread indexes kept in this process
+CACHE_MAX_BYTES = int(os.getenv("VECTOR_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Every cached thread also holds its metadata store open (3 file
+# descriptors with WAL), so small threads are capped by count too
+CACHE_MAX_ENTRIES = int(os.getenv("VECTOR_CACHE_MAX_ENTRIES", "128"))
+
+# Approximate index policy: threads past the threshold are rebuilt in the
+# background as "hnsw", "ivf_flat" or "ivf_pq" (0 disables promotion)
+ANN_PROMOTE_THRESHOLD = int(os.getenv("ANN_PROMOTE_THRESHOLD", "50000"))
+ANN_INDEX_TYPE = os.getenv("ANN_INDEX_TYPE", "hnsw")
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+# Doc-scoped searches on an HNSW index score documents up to this many
+# vectors exhaustively; a filtered graph search can come back short
+DOC_EXACT_SEARCH_MAX = int(os.getenv("DOC_EXACT_SEARCH_MAX", "10000"))
+IVF_PQ_M = int(os.getenv("IVF_PQ_M", "48"))
+
+# Writes after the first commit only their own vectors, as delta files.
+# Past INDEX_MAX_DELTAS the cheapest adjacent pair is merged; once deltas
+# hold INDEX_DELTA_RATIO of the base (and at least INDEX_DELTA_MIN
+# vectors) they are folded into a new base in the background
+INDEX_MAX_DELTAS = int(os.getenv("INDEX_MAX_DELTAS", "16"))
+INDEX_DELTA_RATIO = float(os.getenv("INDEX_DELTA_RATIO", "0.25"))
+INDEX_DELTA_MIN = int(os.getenv("INDEX_DELTA_MIN", "8192"))
+
+# How vectors are stored: "float32", "sq_fp16" (2 bytes/dim), "sq_int8"
+# (1 byte/dim) or "pq" (IVF_PQ_M bytes/vector). PQ needs a trained
+# codebook, so threads stay float32 until PQ_TRAIN_MIN vectors.
+VECTOR_CODEC = os.getenv("VECTOR_CODEC", "float32")
+VECTOR_CODECS = ("float32", "sq_fp16", "sq_int8", "pq")
+PQ_TRAIN_MIN = int(os.getenv("PQ_TRAIN_MIN", "4096"))
+# int8 ranges always cover at least +/- this per dimension, so a tiny
+# first batch doesn't clip later vectors (MiniLM output is unit length)
+SQ_INT8_MIN_RANGE = float(os.getenv("SQ_INT8_MIN_RANGE", "0.3"))
+
+# Default retrieval: "dense", "lexical" (BM25) or "hybrid" (RRF of both)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+# Candidates taken from each ranking before fusion, and the RRF constant
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "30"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
 
 # ==========================================
 # 📁 Path Manager (User + Thread Scoped)
 # ==========================================
 
-def get_thread_paths(user_id, thread_id):
+# The manifest names the committed base index file, the delta files
+# written since and the total size; all of them are immutable and
+# versioned, so a reader never sees a partial write
+MANIFEST = "index.json"
+LEGACY_INDEX = "index.faiss"
+
+
+def get_thread_folder(user_id, thread_id):
     thread_folder = os.path.join(BASE_PATH, user_id, thread_id)
     os.makedirs(thread_folder, exist_ok=True)
 
-    index_path = os.path.join(thread_folder, "index.faiss")
-    metadata_path = os.path.join(thread_folder, "metadata.pkl")
+    return thread_folder
+
+
+def get_metadata_path(user_id, thread_id):
+    return os.path.join(get_thread_folder(user_id, thread_id), "metadata.db")
+
+
+def get_lexical_folder(user_id, thread_id):
+    return os.path.join(BASE_PATH, user_id, thread_id, "bm25")
+
+
+def open_metadata_store(metadata_path):
+    """
+    Open the thread's metadata store, importing a legacy metadata.pkl
+    on first access.
+    """
+
+    store = MetadataStore(metadata_path)
+
+    legacy_path = os.path.join(os.path.dirname(metadata_path), "metadata.pkl")
+    if os.path.exists(legacy_path):
+        try:
+            migrate_pickle(legacy_path, store)
+        except FileNotFoundError:
+            # Another process migrated it first
+            pass
+
+    return store
+
+
+# ==========================================
+# 📜 Versioned Manifest (Commit Point)
+# ==========================================
+#
+# <thread>/index.json = {
+#     "version": n, "index": "index.<v>.faiss", "ntotal": n,
+#     "deltas": [{"name": "delta.<v>.<i>.npy", "start": id, "end": id}, ...]
+# }
+#
+# The first write builds the base index; later writes append metadata
+# rows, save just their float32 vectors as a delta file, then replace the
+# manifest with os.replace(). Compaction and conversion write a new base
+# and drop the deltas it absorbed. Metadata rows with id >= ntotal are
+# not committed yet: search never returns them (they aren't in the index)
+# and the next writer truncates them. Threads from before the manifest
+# keep their index.faiss as version 0 until their next write.
+
+def _stamp(st):
+    # os.replace() gives the manifest a new inode on every commit
+    return st.st_ino, st.st_mtime_ns
+
+
+def manifest_stamp(folder):
+    """
+    Cheap change detector for the committed version: one stat().
+    """
+
+    for name in (MANIFEST, LEGACY_INDEX):
+        try:
+            return _stamp(os.stat(os.path.join(folder, name)))
+        except FileNotFoundError:
+            continue
+
+    return None
+
+
+def read_manifest(folder):
+    """
+    Return (manifest, stamp), or (None, None) before the first write.
+    """
+
+    try:
+        with open(os.path.join(folder, MANIFEST), encoding="utf-8") as f:
+            stamp = _stamp(os.fstat(f.fileno()))
+            return json.load(f), stamp
+    except FileNotFoundError:
+        pass
+
+    try:
+        stamp = _stamp(os.stat(os.path.join(folder, LEGACY_INDEX)))
+    except FileNotFoundError:
+        return None, None
+
+    return {"version": 0, "index": LEGACY_INDEX, "ntotal": None, "deltas": []}, stamp
+
+
+def _manifest_files(manifest):
+    if manifest is None:
+        return set()
+    return {manifest["index"]} | {delta["name"] for delta in manifest.get("deltas", ())}
+
+
+def _version_bytes(folder, manifest):
+    return sum(os.path.getsize(os.path.join(folder, name)) for name in _manifest_files(manifest))
+
+
+def _fsync(path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _publish(folder, manifest, previous):
+    path = os.path.join(folder, MANIFEST)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+    # Keep the previous version's files for readers that read the old
+    # manifest just before the swap; anything older is garbage
+    keep = _manifest_files(manifest) | _manifest_files(previous)
 
-    return index_path, metadata_path
+    for old in os.listdir(folder):
+        if old.endswith((".faiss", ".npy")) and old.startswith(("index.", "delta.")) and old not in keep:
+            try:
+                os.remove(os.path.join(folder, old))
+            except FileNotFoundError:
+                pass
+
+    return manifest, _stamp(os.stat(path))
+
+
+def commit_index(user_id, thread_id, index):
+    """
+    Publish index as the thread's next base version, with no deltas.
+    Call with the thread's write lock held, after the metadata rows for
+    its ids are written. Returns (manifest, stamp).
+    """
+
+    folder = get_thread_folder(user_id, thread_id)
+    previous, _ = read_manifest(folder)
+    version = previous["version"] + 1 if previous else 1
+
+    name = f"index.{version:06d}.faiss"
+    faiss.write_index(index, os.path.join(folder, name))
+    _fsync(os.path.join(folder, name))
+
+    manifest = {"version": version, "index": name, "ntotal": index.ntotal, "deltas": []}
+
+    return _publish(folder, manifest, previous)
+
+
+def commit_deltas(user_id, thread_id, writes, drop=()):
+    """
+    Publish the next version as the committed one plus a delta file per
+    (start_id, vectors) in `writes`, minus the deltas named in `drop`
+    (merged into one of the writes). Only the written vectors reach the
+    disk. Call with the thread's write lock held. Returns (manifest, stamp).
+    """
+
+    folder = get_thread_folder(user_id, thread_id)
+    previous, _ = read_manifest(folder)
+    version = previous["version"] + 1
+
+    deltas = [delta for delta in previous.get("deltas", ()) if delta["name"] not in drop]
+
+    for n, (start_id, vectors) in enumerate(writes):
+        name = f"delta.{version:06d}.{n}.npy"
+
+        with open(os.path.join(folder, name), "wb") as f:
+            np.save(f, vectors)
+            f.flush()
+            os.fsync(f.fileno())
+
+        deltas.append({"name": name, "start": start_id, "end": start_id + len(vectors)})
+
+    deltas.sort(key=lambda delta: delta["start"])
+
+    manifest = {"version": version, "index": previous["index"], "ntotal": deltas[-1]["end"], "deltas": deltas}
+
+    return _publish(folder, manifest, previous)
+
+
+# ==========================================
+# 🧩 Committed Version (Base + Deltas)
+# ==========================================
+
+class ThreadIndex:
+    """
+    One committed version of a thread's vectors: the base index plus the
+    deltas written since it was built, each a float32 flat index over
+    ids [start, start + ntotal). Parts are never modified once published,
+    so searches need no lock and a write only adds a part.
+    """
+
+    def __init__(self, base, base_name, deltas=()):
+        self.base = base
+        self.base_name = base_name
+        # ((start_id, index, file name), ...) in id order
+        self.deltas = tuple(deltas)
+        self.delta_count = sum(delta.ntotal for _, delta, _ in self.deltas)
+        self.ntotal = base.ntotal + self.delta_count
+
+    def parts(self):
+        """
+        (first id, faiss index) of the base and every delta.
+        """
+
+        yield 0, self.base
+
+        for start, delta, _ in self.deltas:
+            yield start, delta
+
+    def size_bytes(self):
+        return self.base.ntotal * bytes_per_vector(self.base) + self.delta_count * DIMENSION * 4
+
+
+def new_delta_index(vectors):
+    index = faiss.IndexFlatL2(DIMENSION)
+    index.add(vectors)
+    return index
+
+
+def _clip_ranges(ranges, start, size):
+    """
+    The parts of id ranges that fall in [start, start + size), relative
+    to start.
+    """
+
+    return [
+        (max(lo, start) - start, min(hi, start + size) - start)
+        for lo, hi in ranges
+        if lo < start + size and hi > start
+    ]
+
+
+def read_version(folder, manifest, cached=None):
+    """
+    Load the version a manifest describes, reusing the base and deltas
+    of a cached version that are still part of it.
+    """
+
+    if cached is not None and cached.base_name == manifest["index"]:
+        base = cached.base
+    else:
+        base = faiss.read_index(os.path.join(folder, manifest["index"]))
+
+    known = {name: delta for _, delta, name in cached.deltas} if cached is not None else {}
+
+    deltas = [
+        (
+            entry["start"],
+            known.get(entry["name"]) or new_delta_index(np.load(os.path.join(folder, entry["name"]))),
+            entry["name"]
+        )
+        for entry in manifest.get("deltas", ())
+    ]
+
+    return ThreadIndex(base, manifest["index"], deltas)
+
+
+# ==========================================
+# 🧊 Loaded Index Cache (Process Wide, LRU)
+# ==========================================
+
+class ThreadIndexCache:
+    """
+    LRU cache of (ThreadIndex, metadata store, manifest stamp) per
+    (user_id, thread_id), bounded by an approximate memory budget in bytes
+    and by entry count. A store leaving the cache is closed.
+    """
+
+    def __init__(self, max_bytes, max_entries=CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def estimate_size(index, metadata):
+        # Chunk text stays on disk; only the encoded vectors live in memory
+        return index.size_bytes()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1], entry[3]
+
+    def put(self, key, index, metadata, stamp):
+        size = self.estimate_size(index, metadata)
+
+        with self._lock:
+            # A new version of a cached thread keeps the same store
+            self._discard(key, keep=metadata)
+
+            # Entries larger than the whole budget are never cached
+            if size > self.max_bytes:
+                metadata.close()
+                return
+
+            self._entries[key] = (index, metadata, size, stamp)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._discard(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _discard(self, key, keep=None):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+            # A search still holding the store reconnects on its next call
+            if entry[1] is not keep:
+                entry[1].close()
+
+
+index_cache = ThreadIndexCache(CACHE_MAX_BYTES)
+
+
+def load_thread_index(user_id, thread_id):
+    """
+    Return (ThreadIndex, metadata store) for a thread's latest committed
+    version, from cache when no process has committed since. Parts that
+    are unchanged since the cached version are reused, not re-read.
+    Returns (None, None) if the thread has no index yet.
+    """
+
+    key = (user_id, thread_id)
+    folder = get_thread_folder(user_id, thread_id)
+
+    cached = index_cache.get(key)
+    if cached is not None and cached[2] == manifest_stamp(folder):
+        return cached[0], cached[1]
+
+    for _ in range(3):
+        manifest, stamp = read_manifest(folder)
+
+        if manifest is None:
+            return None, None
+
+        try:
+            with OPERATION_SECONDS.time("faiss_load"):
+                index = read_version(folder, manifest, cached[0] if cached is not None else None)
+            break
+        except (RuntimeError, FileNotFoundError):
+            # Two commits landed while reading and a file was removed
+            continue
+    else:
+        raise RuntimeError(f"Could not read a consistent index for {user_id}/{thread_id}")
+
+    if cached is not None:
+        metadata = cached[1]
+    else:
+        metadata = open_metadata_store(os.path.join(folder, "metadata.db"))
+
+    index_cache.put(key, index, metadata, stamp)
+
+    return index, metadata
+
+
+# ==========================================
+# 🔒 Write Locks (Per Thread, Cross Process)
+# ==========================================
+
+class ThreadWriteLock:
+    """
+    Serializes writers of one thread: a threading.Lock within this
+    process plus flock() on <thread>/write.lock across processes (uvicorn
+    workers, CLI conversions). Readers never take it.
+    """
+
+    def __init__(self, user_id, thread_id):
+        self.user_id = user_id
+        self.thread_id = thread_id
+        self._local = threading.Lock()
+        self._file = None
+
+    def acquire(self, blocking=True):
+        if not self._local.acquire(blocking):
+            return False
+
+        try:
+            path = os.path.join(get_thread_folder(self.user_id, self.thread_id), "write.lock")
+            lock_file = open(path, "a+b")
+
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    lock_file.close()
+                    self._local.release()
+                    return False
+
+        except BaseException:
+            self._local.release()
+            raise
+
+        self._file = lock_file
+        return True
+
+    def release(self):
+        # Closing the file drops the flock
+        lock_file, self._file = self._file, None
+        lock_file.close()
+        self._local.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def get_write_lock(user_id, thread_id):
+    with _write_locks_guard:
+        lock = _write_locks.get((user_id, thread_id))
+        if lock is None:
+            lock = _write_locks[(user_id, thread_id)] = ThreadWriteLock(user_id, thread_id)
+        return lock
 
 
 # ==========================================
@@ -27,64 +536,735 @@ def get_thread_paths(user_id, thread_id):
 
 def add_embeddings(user_id, thread_id, doc_id, embeddings, chunks, filename=None):
 
-    index_path, metadata_path = get_thread_paths(user_id, thread_id)
+    with get_write_lock(user_id, thread_id):
+        index = _add_locked(user_id, thread_id, doc_id, embeddings, chunks, filename)
+
+    maybe_compact(user_id, thread_id, index)
+
+    return doc_id
+
+
+def _add_locked(user_id, thread_id, doc_id, embeddings, chunks, filename):
+
+    # Under the lock this is the latest version, whichever process wrote it
+    current, metadata = load_thread_index(user_id, thread_id)
+
+    vectors = np.ascontiguousarray(embeddings, dtype="float32")
+
+    if current is None:
+        metadata = open_metadata_store(get_metadata_path(user_id, thread_id))
+
+    start_id = current.ntotal if current is not None else 0
+
+    # Rows left by a write that died before committing are replaced;
+    # the new rows only become visible through the manifest below
+    metadata.truncate(start_id)
+    metadata.append(start_id, doc_id, chunks, filename)
+
+    with OPERATION_SECONDS.time("index_commit"):
+        if current is None:
+            base = new_flat_index(vectors)
+            base.add(vectors)
+
+            manifest, stamp = commit_index(user_id, thread_id, base)
+            index = ThreadIndex(base, manifest["index"])
+        else:
+            index, stamp = append_delta(user_id, thread_id, current, start_id, vectors)
+
+    index_cache.put((user_id, thread_id), index, metadata, stamp)
+
+    # BM25 postings are derived data: if this fails they are backfilled
+    # from metadata on the next lexical search
+    try:
+        lexical = sync_lexical_index(user_id, thread_id, metadata, start_id)
+        lexical.add(start_id, chunks)
+    except Exception as e:
+        print(f"Lexical index update failed for {user_id}/{thread_id}: {e}")
+
+    return index
+
+
+def append_delta(user_id, thread_id, current, start_id, vectors):
+    """
+    Commit vectors as a new delta on top of `current`, the latest version,
+    and return (ThreadIndex, stamp). Past INDEX_MAX_DELTAS the cheapest
+    adjacent pair of deltas is merged into one file, so the count stays
+    bounded without touching the base.
+    """
+
+    deltas = list(current.deltas) + [(start_id, new_delta_index(vectors), None)]
+    writes = {start_id: vectors}
+    drop = []
+
+    if len(deltas) > INDEX_MAX_DELTAS:
+        i = min(range(len(deltas) - 1), key=lambda n: deltas[n][1].ntotal + deltas[n + 1][1].ntotal)
+        (first_start, first, first_name), (second_start, second, second_name) = deltas[i:i + 2]
+
+        merged = np.vstack([reconstruct(first, 0, first.ntotal), reconstruct(second, 0, second.ntotal)])
+
+        deltas[i:i + 2] = [(first_start, new_delta_index(merged), None)]
+        writes.pop(second_start, None)
+        writes[first_start] = merged
+        drop = [name for name in (first_name, second_name) if name]
+
+    manifest, stamp = commit_deltas(user_id, thread_id, sorted(writes.items()), drop)
+
+    names = {delta["start"]: delta["name"] for delta in manifest["deltas"]}
+    index = ThreadIndex(current.base, current.base_name, [
+        (start, delta, names[start]) for start, delta, _ in deltas
+    ])
+
+    return index, stamp
+
+
+# ==========================================
+# 🔤 Lexical (BM25) Index
+# ==========================================
+
+LEXICAL_BACKFILL_BATCH = 1024
+
+
+def sync_lexical_index(user_id, thread_id, metadata, until_id):
+    """
+    Open the thread's BM25 index and index any chunks below until_id it
+    is missing (threads created before it existed, or an interrupted
+    write). Call with the thread's write lock held.
+    """
+
+    lexical = open_lexical_index(get_lexical_folder(user_id, thread_id))
+
+    for start in range(lexical.end, until_id, LEXICAL_BACKFILL_BATCH):
+        rows = metadata.get(list(range(start, min(start + LEXICAL_BACKFILL_BATCH, until_id))))
+        lexical.add(start, [row["text"] for row in rows])
+
+    return lexical
+
+
+def load_lexical_index(user_id, thread_id, index, metadata):
+    lexical = open_lexical_index(get_lexical_folder(user_id, thread_id))
+
+    if lexical.end >= index.ntotal:
+        return lexical
+
+    # A writer holding the lock is about to index these chunks itself;
+    # search what is there rather than wait for it
+    lock = get_write_lock(user_id, thread_id)
 
-    if os.path.exists(index_path):
-        index = faiss.read_index(index_path)
-        with open(metadata_path, "rb") as f:
-            metadata = pickle.load(f)
+    if not lock.acquire(blocking=False):
+        return lexical
+
+    try:
+        index, metadata = load_thread_index(user_id, thread_id)
+        return sync_lexical_index(user_id, thread_id, metadata, index.ntotal)
+    finally:
+        lock.release()
+
+
+# ==========================================
+# 📤 Export A Document (For Reuse Elsewhere)
+# ==========================================
+
+def get_document_vectors(user_id, thread_id, doc_id):
+    """
+    Return (chunks, vectors) for a document already indexed in a thread,
+    reconstructed from the index without re-running the model.
+    """
+
+    with get_write_lock(user_id, thread_id):
+        index, metadata = load_thread_index(user_id, thread_id)
+
+        if index is None:
+            return [], np.empty((0, DIMENSION), dtype="float32")
+
+        ranges = [
+            (start, min(end, index.ntotal))
+            for start, end in metadata.doc_ranges(doc_id)
+            if start < index.ntotal
+        ]
+
+        rows = [row for row in metadata.get_doc(doc_id) if row["id"] < index.ntotal]
+
+        vectors = [reconstruct(index, start, end) for start, end in ranges]
+        vectors = np.vstack(vectors) if vectors else np.empty((0, DIMENSION), dtype="float32")
+
+    return [row["text"] for row in rows], np.ascontiguousarray(vectors, dtype="float32")
+
+
+# ==========================================
+# 🗜 Vector Codecs
+# ==========================================
+
+def _codec_spec(codec):
+    # index_factory suffix for the codec
+    return {
+        "float32": "Flat",
+        "sq_fp16": "SQfp16",
+        "sq_int8": "SQ8",
+        "pq": f"PQ{IVF_PQ_M}"
+    }[codec]
+
+
+def _train_sq_int8(index, vectors):
+    bounds = np.full((2, DIMENSION), SQ_INT8_MIN_RANGE, dtype="float32")
+    bounds[0] *= -1
+    index.train(np.vstack([vectors, bounds]))
+
+
+def _storage(index):
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.downcast_index(index.storage)
+    return index
+
+
+def index_codec(index):
+    """
+    Codec an existing index stores its vectors with.
+    """
+
+    storage = _storage(index)
+
+    if isinstance(storage, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "sq_fp16" if storage.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq_int8"
+
+    if isinstance(storage, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+
+    return "float32"
+
+
+def bytes_per_vector(index):
+    if isinstance(index, faiss.IndexHNSW):
+        # Level-0 links dominate the graph overhead
+        return bytes_per_vector(_storage(index)) + 2 * HNSW_M * 4
+
+    if isinstance(index, faiss.IndexIVF):
+        return index.code_size + 8
+
+    return index.sa_code_size()
+
+
+def new_flat_index(vectors, codec=None):
+    """
+    Empty exhaustive-search index for a new thread. `vectors` is only
+    used to train the int8 ranges.
+    """
+
+    codec = codec or VECTOR_CODEC
+
+    if codec == "sq_fp16":
+        return faiss.IndexScalarQuantizer(DIMENSION, faiss.ScalarQuantizer.QT_fp16)
+
+    if codec == "sq_int8":
+        index = faiss.IndexScalarQuantizer(DIMENSION, faiss.ScalarQuantizer.QT_8bit)
+        _train_sq_int8(index, vectors)
+        return index
+
+    # "pq" starts as float32 and is re-encoded once there is enough to train on
+    return faiss.IndexFlatL2(DIMENSION)
+
+
+def build_flat_index(vectors, codec=None):
+    """
+    Exhaustive-search index holding `vectors` in the given codec. PQ uses
+    a single-list IVF so document filters (IDSelector) still work.
+    """
+
+    codec = codec or VECTOR_CODEC
+
+    if codec == "pq":
+        if len(vectors) < PQ_TRAIN_MIN:
+            codec = "float32"
+        else:
+            index = faiss.index_factory(DIMENSION, f"IVF1,PQ{IVF_PQ_M}")
+            index.do_polysemous_training = False
+            index.train(_training_sample(vectors, 256 * 64))
+            index.add(vectors)
+            return index
+
+    index = new_flat_index(vectors, codec)
+    index.add(vectors)
+    return index
+
+
+def _training_sample(vectors, size):
+    n = len(vectors)
+    if n <= size:
+        return vectors
+    return vectors[np.random.default_rng(0).choice(n, size, replace=False)]
+
+
+def reconstruct(index, start, end):
+    """
+    Decode vectors [start, end) back to float32 (lossy for SQ/PQ).
+    """
+
+    if isinstance(index, ThreadIndex):
+        pieces = [
+            reconstruct(part, lo, hi)
+            for offset, part in index.parts()
+            for lo, hi in _clip_ranges([(start, end)], offset, part.ntotal)
+        ]
+        return np.vstack(pieces) if pieces else np.empty((0, DIMENSION), dtype="float32")
+
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+
+    return index.reconstruct_n(start, end - start)
+
+
+def convert_thread(user_id, thread_id, codec):
+    """
+    Re-encode a thread's index in place with another codec, keeping ids
+    and the flat/approximate layout. Returns (old_codec, new_codec, bytes
+    before, bytes after) or None if the thread has no index.
+    """
+
+    if codec not in VECTOR_CODECS:
+        raise ValueError(f"Unknown vector codec: {codec}")
+
+    with get_write_lock(user_id, thread_id):
+        index, metadata = load_thread_index(user_id, thread_id)
+
+        if index is None:
+            return None
+
+        old_codec = index_codec(index.base)
+        vectors = reconstruct(index, 0, index.ntotal)
+
+        if is_flat(index.base):
+            converted = build_flat_index(vectors, codec)
+        else:
+            converted = build_ann_index(vectors, codec=codec)
+
+        folder = get_thread_folder(user_id, thread_id)
+        previous, _ = read_manifest(folder)
+        before = _version_bytes(folder, previous)
+
+        # Deltas are folded in along the way
+        manifest, stamp = commit_index(user_id, thread_id, converted)
+
+        index_cache.put((user_id, thread_id), ThreadIndex(converted, manifest["index"]), metadata, stamp)
+
+    return old_codec, index_codec(converted), before, _version_bytes(folder, manifest)
+
+
+def convert_all(base_path, codec):
+    """
+    Convert every thread index under <base_path>/<user>/<thread>/ in place.
+    """
+
+    converted = 0
+
+    for root, _, files in os.walk(base_path):
+        if MANIFEST not in files and LEGACY_INDEX not in files:
+            continue
+
+        thread_dir = os.path.relpath(root, base_path)
+        user_id, thread_id = os.path.split(thread_dir)
+
+        old_codec, new_codec, before, after = convert_thread(user_id, thread_id, codec)
+
+        print(f"{thread_dir}: {old_codec} -> {new_codec}, {before} -> {after} bytes")
+        converted += 1
+
+    return converted
+
+
+# ==========================================
+# 🚀 Compaction And Promotion To Approximate Index
+# ==========================================
+
+_compactions_running = set()
+_compactions_guard = threading.Lock()
+
+
+def is_flat(index):
+    """
+    True for exhaustive-search indexes, whatever their codec.
+    """
+
+    if isinstance(index, faiss.IndexIVF):
+        return index.nlist == 1
+
+    return isinstance(index, (faiss.IndexFlat, faiss.IndexScalarQuantizer))
+
+
+def build_ann_index(vectors, index_type=None, codec=None):
+    """
+    Build an approximate index over vectors (float32, n x DIMENSION).
+    Vector ids stay 0..n-1, matching the metadata store.
+    """
+
+    index_type = index_type or ANN_INDEX_TYPE
+    codec = codec or VECTOR_CODEC
+    n = len(vectors)
+
+    if index_type == "hnsw":
+        if codec == "float32":
+            index = faiss.IndexHNSWFlat(DIMENSION, HNSW_M)
+        elif codec == "pq":
+            index = faiss.index_factory(DIMENSION, f"HNSW{HNSW_M}_PQ{IVF_PQ_M}")
+        else:
+            index = faiss.index_factory(DIMENSION, f"HNSW{HNSW_M},{_codec_spec(codec)}")
+
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+
+        if codec == "sq_int8":
+            _train_sq_int8(index, _training_sample(vectors, 65536))
+        elif not index.is_trained:
+            index.train(_training_sample(vectors, 256 * 64))
+
+        index.add(vectors)
+        return index
+
+    # ~4 * sqrt(n) lists, with enough points per list to train on
+    nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+
+    if index_type == "ivf_flat":
+        index = faiss.index_factory(DIMENSION, f"IVF{nlist},{_codec_spec(codec)}")
+    elif index_type == "ivf_pq":
+        index = faiss.index_factory(DIMENSION, f"IVF{nlist},PQ{IVF_PQ_M}")
     else:
-        index = faiss.IndexFlatL2(DIMENSION)
-        metadata = []
+        raise ValueError(f"Unknown ANN_INDEX_TYPE: {index_type}")
+
+    if isinstance(index, faiss.IndexIVFPQ):
+        # Polysemous codes are never used for search here and training them is slow
+        index.do_polysemous_training = False
 
-    vectors = np.array(embeddings).astype("float32")
+    index.train(_training_sample(vectors, nlist * 256))
     index.add(vectors)
 
-    for chunk in chunks:
-        metadata.append({
-            "text": chunk,
-            "doc_id": doc_id,
-            "filename": filename
-        })
+    return index
 
-    faiss.write_index(index, index_path)
 
-    with open(metadata_path, "wb") as f:
-        pickle.dump(metadata, f)
+def needs_rebuild(index):
+    """
+    A flat base is rebuilt once the thread passes ANN_PROMOTE_THRESHOLD,
+    or when PQ storage is configured and there is enough data to train it.
+    """
 
-    return doc_id
+    if not is_flat(index.base):
+        return False
+
+    if ANN_PROMOTE_THRESHOLD and index.ntotal >= ANN_PROMOTE_THRESHOLD:
+        return True
+
+    return (
+        VECTOR_CODEC == "pq"
+        and index_codec(index.base) != "pq"
+        and index.ntotal >= PQ_TRAIN_MIN
+    )
+
+
+def needs_compaction(index):
+    """
+    Deltas are folded into the base once they hold INDEX_DELTA_RATIO of
+    it, so the work of compacting stays proportional to what was added.
+    """
+
+    if needs_rebuild(index):
+        return True
+
+    return index.delta_count >= max(INDEX_DELTA_MIN, INDEX_DELTA_RATIO * index.base.ntotal)
+
+
+def rebuild_index(vectors):
+    if ANN_PROMOTE_THRESHOLD and len(vectors) >= ANN_PROMOTE_THRESHOLD:
+        return build_ann_index(vectors)
+    return build_flat_index(vectors)
+
+
+def maybe_compact(user_id, thread_id, index):
+    """
+    Schedule a background compaction (or rebuild) when the thread needs one.
+    """
+
+    if not needs_compaction(index):
+        return
+
+    key = (user_id, thread_id)
+
+    with _compactions_guard:
+        if key in _compactions_running:
+            return
+        _compactions_running.add(key)
+
+    threading.Thread(
+        target=_compact,
+        args=(user_id, thread_id, index),
+        daemon=True
+    ).start()
+
+
+def _compact(user_id, thread_id, snapshot):
+    try:
+        # Heavy build runs without the write lock, on a snapshot
+        built = snapshot.ntotal
+        promote = needs_rebuild(snapshot)
+
+        if promote:
+            rebuilt = rebuild_index(reconstruct(snapshot, 0, built))
+        else:
+            # Same layout: fold the deltas into a private copy of the base
+            rebuilt = faiss.clone_index(snapshot.base)
+            for _, delta, _ in snapshot.deltas:
+                rebuilt.add(reconstruct(delta, 0, delta.ntotal))
+
+        with get_write_lock(user_id, thread_id):
+            current, metadata = load_thread_index(user_id, thread_id)
+
+            # Another process compacted or converted it first
+            if current.base_name != snapshot.base_name:
+                return
+
+            # Catch up with vectors added while we were building
+            if current.ntotal > built:
+                rebuilt.add(reconstruct(current, built, current.ntotal))
+
+            manifest, stamp = commit_index(user_id, thread_id, rebuilt)
+
+            index_cache.put((user_id, thread_id), ThreadIndex(rebuilt, manifest["index"]), metadata, stamp)
+
+        if promote:
+            layout = "flat" if is_flat(rebuilt) else ANN_INDEX_TYPE
+            print(f"Rebuilt {user_id}/{thread_id} as {layout}/{index_codec(rebuilt)} ({rebuilt.ntotal} vectors)")
+
+    except Exception as e:
+        print(f"Index compaction failed for {user_id}/{thread_id}: {e}")
+
+    finally:
+        with _compactions_guard:
+            _compactions_running.discard((user_id, thread_id))
+
+
+# ==========================================
+# 🎯 Document Filter (Pushed Into FAISS)
+# ==========================================
+
+def build_doc_selector(ranges):
+    """
+    Build an IDSelector covering a document's vector id ranges.
+    """
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return faiss.IDSelectorRange(start, end)
+
+    ids = np.concatenate([
+        np.arange(start, end, dtype="int64") for start, end in ranges
+    ])
+    return faiss.IDSelectorBatch(ids)
+
+
+def make_search_params(index, selector=None):
+    """
+    Search parameters for the thread's index type, carrying the tuned
+    efSearch/nprobe and an optional IDSelector.
+    """
+
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = IVF_NPROBE
+    else:
+        params = faiss.SearchParameters()
+
+    if selector is not None:
+        params.sel = selector
+
+    return params
 
 
 # ==========================================
 # 🔎 Search (Thread Scoped)
 # ==========================================
 
-def search(user_id, thread_id, query_embedding, doc_id=None, top_k=5):
+def search_hits(user_id, thread_id, query_embedding, doc_id=None, top_k=5,
+                query_text=None, mode=None):
+    """
+    Like search(), but returns hit dicts with id, doc_id, filename and
+    text, best first. Dense hits carry their L2 "distance"; lexical and
+    hybrid hits also carry "bm25" and "rrf" scores.
+    """
+
+    mode = mode or RETRIEVAL_MODE
+
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {mode}")
 
-    index_path, metadata_path = get_thread_paths(user_id, thread_id)
+    # Lexical ranking needs the query text
+    if not query_text:
+        mode = "dense"
 
-    if not os.path.exists(index_path):
+    index, metadata = load_thread_index(user_id, thread_id)
+
+    if index is None:
         return []
 
-    index = faiss.read_index(index_path)
+    ranges = None
+
+    if doc_id:
+        # Ranges of a write still in progress end past this snapshot
+        ranges = [
+            (start, min(end, index.ntotal))
+            for start, end in metadata.doc_ranges(doc_id)
+            if start < index.ntotal
+        ]
+        if not ranges:
+            return []
+
+    candidates = top_k if mode == "dense" else max(top_k, HYBRID_CANDIDATES)
+
+    dense = []
+    if mode != "lexical":
+        with OPERATION_SECONDS.time("faiss_search"):
+            dense = dense_search(index, query_embedding, candidates, ranges)
+
+    lexical = []
+    if mode != "dense":
+        lexical_index = load_lexical_index(user_id, thread_id, index, metadata)
+
+        with OPERATION_SECONDS.time("bm25_search"):
+            lexical = lexical_index.search(query_text, candidates, ranges=ranges, limit_id=index.ntotal)
+
+    distance_by_id = dict(dense)
+    bm25_by_id = dict(lexical)
+
+    if mode == "dense":
+        ranked = [idx for idx, _ in dense]
+        rrf_by_id = None
+    else:
+        # Reciprocal rank fusion: ids ranked well by either list win
+        rrf_by_id = {}
+        for ranking in (dense, lexical):
+            for rank, (idx, _) in enumerate(ranking, start=1):
+                rrf_by_id[idx] = rrf_by_id.get(idx, 0.0) + 1.0 / (RRF_K + rank)
+
+        ranked = sorted(rrf_by_id, key=rrf_by_id.get, reverse=True)[:top_k]
+
+    with OPERATION_SECONDS.time("metadata_fetch"):
+        hits = metadata.get(ranked)
 
-    with open(metadata_path, "rb") as f:
-        metadata = pickle.load(f)
+    for item in hits:
+        item["distance"] = distance_by_id.get(item["id"])
 
-    query_vector = np.array([query_embedding]).astype("float32")
+        if rrf_by_id is not None:
+            item["bm25"] = bm25_by_id.get(item["id"])
+            item["rrf"] = rrf_by_id[item["id"]]
 
-    distances, indices = index.search(query_vector, top_k)
+    return hits
 
+
+def dense_search(index, query_embedding, top_k, ranges=None):
+    """
+    FAISS top_k over a ThreadIndex as [(id, distance)], best first. The
+    base and each delta are searched on their own and merged.
+    """
+
+    query_vector = np.ascontiguousarray(query_embedding, dtype="float32").reshape(1, -1)
     results = []
 
-    for idx in indices[0]:
-        if idx < len(metadata):
+    for offset, part in index.parts():
+        if ranges is None:
+            part_ranges = None
+        else:
+            part_ranges = _clip_ranges(ranges, offset, part.ntotal)
+            if not part_ranges:
+                continue
+
+        results.extend(
+            (offset + idx, dist)
+            for idx, dist in _search_part(part, query_vector, top_k, part_ranges)
+        )
+
+    if index.deltas:
+        results.sort(key=lambda item: item[1])
+
+    return results[:top_k]
+
+
+def _search_part(index, query_vector, top_k, ranges=None):
+    if not ranges:
+        params = make_search_params(index)
+        return _search_results(*index.search(query_vector, top_k, params=params))
+
+    doc_size = sum(end - start for start, end in ranges)
+
+    # The graph walk mostly visits other documents' vectors; a small
+    # document is cheaper (and complete) to score one by one
+    if isinstance(index, faiss.IndexHNSW) and doc_size <= DOC_EXACT_SEARCH_MAX:
+        return exact_range_search(index, query_vector, top_k, ranges)
+
+    # Only the document's ids are scored, so top_k is filled from it
+    params = make_search_params(index, build_doc_selector(ranges))
+
+    if isinstance(index, faiss.IndexIVF):
+        # The document's ids may sit in lists nprobe would skip; the
+        # selector is checked before any distance is computed
+        params.nprobe = index.nlist
+
+    results = _search_results(*index.search(query_vector, top_k, params=params))
+
+    if len(results) < min(top_k, doc_size):
+        return exact_range_search(index, query_vector, top_k, ranges)
+
+    return results
+
+
+def exact_range_search(index, query_vector, top_k, ranges):
+    """
+    Exhaustive top_k over the given id ranges of an approximate index,
+    on vectors decoded from its storage.
+    """
+
+    ids = np.concatenate([np.arange(start, end, dtype="int64") for start, end in ranges])
+    # Only reached for HNSW: an IVF search over every list is never short
+    vectors = np.concatenate([reconstruct(index, start, end) for start, end in ranges])
+
+    # Squared L2, like IndexFlatL2 and IndexHNSWFlat report
+    distances = ((vectors - query_vector) ** 2).sum(axis=1)
+    order = np.argsort(distances)[:top_k]
+
+    return [(int(ids[i]), float(distances[i])) for i in order]
+
+
+def _search_results(distances, indices):
+    return [
+        (int(idx), float(dist))
+        for idx, dist in zip(indices[0], distances[0])
+        if idx >= 0
+    ]
+
+
+def search(user_id, thread_id, query_embedding, doc_id=None, top_k=5, query_text=None, mode=None):
+    hits = search_hits(
+        user_id, thread_id, query_embedding,
+        doc_id=doc_id, top_k=top_k, query_text=query_text, mode=mode
+    )
+
+    return [item["text"] for item in hits]
+
+
+def get_thread_version(user_id, thread_id):
+    """
+    Number of vectors in the thread's index; changes whenever documents
+    are added, so it can be used to invalidate derived caches.
+    """
+
+    index, _ = load_thread_index(user_id, thread_id)
+
+    return index.ntotal if index is not None else 0
+
+
+def cache_stats():
+    return index_cache.stats()
+
 
-            # If filtering by specific document
-            if doc_id:
-                if metadata[idx]["doc_id"] == doc_id:
-                    results.append(metadata[idx]["text"])
-            else:
-                results.append(metadata[idx]["text"])
+if __name__ == "__main__":
+    import sys
 
-    return results
\ No newline at end of file
+    codec = sys.argv[1] if len(sys.argv) > 1 else VECTOR_CODEC
+    BASE_PATH = sys.argv[2] if len(sys.argv) > 2 else BASE_PATH
+    print(f"Converted {convert_all(BASE_PATH, codec)} thread(s) to {codec}")
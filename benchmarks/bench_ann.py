@@ -0,0 +1,78 @@
+"""
+Recall/latency benchmark for the approximate index policy.
+
+For each corpus size, builds the flat index and the configured
+approximate index over synthetic 384-dimensional clustered vectors and
+reports recall@k against flat plus p50/p99 single-query latency.
+
+    python -m benchmarks.bench_ann --sizes 10000,100000,1000000 --index-type hnsw
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from app import vector_store
+
+
+def make_corpus(n, dim, seed=0, clusters=256):
+    # Clustered data is closer to real sentence embeddings than pure noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def measure(index, queries, k):
+    params = vector_store.make_search_params(index)
+    latencies = []
+    found = []
+
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k, params=params)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+
+    return np.array(found), np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def recall_at_k(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--index-type", default=vector_store.ANN_INDEX_TYPE)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    dim = vector_store.DIMENSION
+    print(f"{'n':>9} {'index':<10} {'build_s':>8} {'recall@k':>9} {'p50_ms':>8} {'p99_ms':>8}")
+
+    for n in [int(s) for s in args.sizes.split(",")]:
+        corpus = make_corpus(n, dim)
+        queries = make_corpus(args.queries, dim, seed=1)
+
+        flat = faiss.IndexFlatL2(dim)
+        flat.add(corpus)
+        truth, p50, p99 = measure(flat, queries, args.k)
+        print(f"{n:>9} {'flat':<10} {0:>8.1f} {1.0:>9.3f} {p50:>8.3f} {p99:>8.3f}")
+
+        start = time.perf_counter()
+        ann = vector_store.build_ann_index(corpus, args.index_type)
+        build_s = time.perf_counter() - start
+
+        found, p50, p99 = measure(ann, queries, args.k)
+        recall = recall_at_k(truth, found)
+        print(f"{n:>9} {args.index_type:<10} {build_s:>8.1f} {recall:>9.3f} {p50:>8.3f} {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Vector codec benchmark.
+
+Encodes one corpus with every storage codec (float32, sq_fp16, sq_int8,
+pq) and reports bytes per vector on disk, p50/p99 single-query latency
+and recall@k against exact float32 search.
+
+Corpus, in order of preference:
+
+    # real chunk embeddings from an ingested thread
+    python -m benchmarks.bench_codecs --thread USER_ID/THREAD_ID
+
+    # embed synthetic document text with the real model
+    python -m benchmarks.bench_codecs --embed --chunks 20000
+
+    # clustered random vectors (no model needed)
+    python -m benchmarks.bench_codecs --chunks 20000
+
+Queries are held-out chunks from the same corpus. Add --layout hnsw or
+ivf_flat to compare codecs under an approximate index as well.
+"""
+
+import argparse
+import random
+import time
+
+import faiss
+import numpy as np
+
+from app import vector_store
+from benchmarks.bench_ann import make_corpus, recall_at_k
+from benchmarks.synthetic_pdf import make_lines
+
+
+def thread_corpus(thread):
+    user_id, thread_id = thread.split("/", 1)
+    index, _ = vector_store.load_thread_index(user_id, thread_id)
+
+    if index is None:
+        raise SystemExit(f"No index for {thread}")
+
+    return vector_store.reconstruct(index, 0, index.ntotal)
+
+
+def embedded_corpus(count):
+    from app.embedding_utils import generate_embeddings
+
+    rng = random.Random(0)
+    chunks = [" ".join(make_lines(rng, 8)) for _ in range(count)]
+
+    return generate_embeddings(chunks)
+
+
+def measure(index, queries, k):
+    params = vector_store.make_search_params(index)
+    latencies = []
+    found = []
+
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k, params=params)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+
+    return np.array(found), np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--thread", help="USER_ID/THREAD_ID of an existing index")
+    parser.add_argument("--embed", action="store_true", help="embed synthetic text with the real model")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--layout", default="flat", help="flat, hnsw or ivf_flat")
+    args = parser.parse_args()
+
+    if args.thread:
+        corpus, source = thread_corpus(args.thread), f"thread {args.thread}"
+    elif args.embed:
+        corpus, source = embedded_corpus(args.chunks + args.queries), "embedded synthetic text"
+    else:
+        corpus, source = make_corpus(args.chunks + args.queries, vector_store.DIMENSION), "clustered random"
+
+    corpus = np.ascontiguousarray(corpus, dtype="float32")
+    vectors, queries = corpus[:-args.queries], corpus[-args.queries:]
+
+    exact = faiss.IndexFlatL2(vector_store.DIMENSION)
+    exact.add(vectors)
+    truth, _, _ = measure(exact, queries, args.k)
+
+    print(f"corpus: {source}, {len(vectors)} vectors, {len(queries)} queries, layout={args.layout}")
+
+    # PQ is benchmarked even below the production training threshold
+    vector_store.PQ_TRAIN_MIN = 0
+
+    for codec in vector_store.VECTOR_CODECS:
+        start = time.perf_counter()
+
+        if args.layout == "flat":
+            index = vector_store.build_flat_index(vectors, codec)
+        else:
+            index = vector_store.build_ann_index(vectors, index_type=args.layout, codec=codec)
+
+        build_s = time.perf_counter() - start
+
+        size = len(faiss.serialize_index(index))
+        found, p50, p99 = measure(index, queries, args.k)
+
+        print(f"{codec:<8} {size / len(vectors):8.1f} bytes/vector  "
+              f"p50={p50:6.2f}ms p99={p99:6.2f}ms  recall@{args.k}={recall_at_k(truth, found):.3f}  "
+              f"build={build_s:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Doc-scoped search benchmark.
+
+Builds a synthetic thread holding several documents plus one small one,
+checks that a doc-scoped search returns exactly top_k hits from the
+requested document, and compares its latency with unfiltered search.
+With --index hnsw or ivf_flat the thread is promoted to that approximate
+index first, and doc-scoped recall against exact search is reported.
+
+    python -m benchmarks.bench_doc_filter --docs 10 --chunks-per-doc 2000
+    python -m benchmarks.bench_doc_filter --index flat,hnsw,ivf_flat
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app import vector_store
+
+USER_ID = "bench_user"
+
+
+def build_thread(thread_id, docs, chunks_per_doc, small_doc_chunks, seed=0):
+    rng = np.random.default_rng(seed)
+    doc_ids = []
+    sizes = [chunks_per_doc] * docs + [small_doc_chunks]
+
+    for d, size in enumerate(sizes):
+        doc_id = f"doc_{d}"
+        vectors = rng.standard_normal((size, vector_store.DIMENSION)).astype("float32")
+        chunks = [f"{doc_id} chunk {i}" for i in range(size)]
+
+        vector_store.add_embeddings(USER_ID, thread_id, doc_id, vectors, chunks)
+        doc_ids.append(doc_id)
+
+    return doc_ids
+
+
+def promote(thread_id, index_type):
+    # Same rebuild the background compaction runs, done synchronously
+    vector_store.ANN_INDEX_TYPE = index_type
+    vector_store.ANN_PROMOTE_THRESHOLD = 1
+
+    index, _ = vector_store.load_thread_index(USER_ID, thread_id)
+    vector_store._compact(USER_ID, thread_id, index)
+
+    vector_store.ANN_PROMOTE_THRESHOLD = 0
+
+
+def exact_ids(vectors, ids, query, top_k):
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    return set(ids[np.argsort(distances)[:top_k]].tolist())
+
+
+def time_queries(thread_id, queries, top_k, doc_id=None, truth=None):
+    latencies = []
+    found = 0
+
+    for query in queries:
+        start = time.perf_counter()
+        hits = vector_store.search_hits(USER_ID, thread_id, query, doc_id=doc_id, top_k=top_k, mode="dense")
+        latencies.append(time.perf_counter() - start)
+
+        if doc_id:
+            assert len(hits) == top_k, f"expected {top_k} hits, got {len(hits)}"
+            assert all(hit["doc_id"] == doc_id for hit in hits), "hit from another document"
+
+        if truth:
+            found += len({hit["id"] for hit in hits} & exact_ids(*truth, query, top_k))
+
+    recall = found / (len(queries) * top_k) if truth else None
+
+    return np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000, recall
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--chunks-per-doc", type=int, default=2000)
+    parser.add_argument("--small-doc-chunks", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--index", default="flat", help="comma separated: flat, hnsw, ivf_flat")
+    args = parser.parse_args()
+
+    vector_store.BASE_PATH = tempfile.mkdtemp(prefix="bench_vs_")
+    # Promotion only happens when asked for below
+    vector_store.ANN_PROMOTE_THRESHOLD = 0
+
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((args.queries, vector_store.DIMENSION)).astype("float32")
+
+    for layout in args.index.split(","):
+        thread_id = f"bench_{layout}"
+        doc_ids = build_thread(thread_id, args.docs, args.chunks_per_doc, args.small_doc_chunks)
+
+        if layout != "flat":
+            promote(thread_id, layout)
+
+        index, metadata = vector_store.load_thread_index(USER_ID, thread_id)
+        print(f"{layout}: {type(index.base).__name__}, {index.ntotal} vectors, {len(index.deltas)} deltas")
+
+        p50, p99, _ = time_queries(thread_id, queries, args.top_k)
+        print(f"  {'unfiltered':<20} p50={p50:.2f}ms p99={p99:.2f}ms")
+
+        for doc_id in (doc_ids[-2], doc_ids[-1]):
+            ranges = metadata.doc_ranges(doc_id)
+            ids = np.concatenate([np.arange(start, end) for start, end in ranges])
+            vectors = np.concatenate([vector_store.reconstruct(index, start, end) for start, end in ranges])
+
+            p50, p99, recall = time_queries(thread_id, queries, args.top_k, doc_id, truth=(vectors, ids))
+            label = f"doc-scoped ({len(ids)})"
+            print(f"  {label:<20} p50={p50:.2f}ms p99={p99:.2f}ms recall@{args.top_k}={recall:.3f} (all results full)")
+
+
+if __name__ == "__main__":
+    main()
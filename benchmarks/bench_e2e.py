@@ -0,0 +1,487 @@
+"""
+Offline end-to-end benchmark.
+
+Starts the FastAPI app with uvicorn in its own working directory, with
+Gemini and Sarvam replaced by local stand-ins (benchmarks/gemini_stub.py,
+benchmarks/sarvam_stub.py) that have configurable latency and token
+rates. It uploads synthetic multilingual PDFs, then sends concurrent
+/search, /ask, /ask-stream and /voice-ask traffic over the users' threads.
+
+Writes a JSON report with per-phase throughput, p50/p95/p99 latency and
+a per-stage breakdown (/ask stage timings, ingestion queue/processing
+time). The server's /metrics scrape is saved next to the workdir's
+server.log. Pass --compare with an earlier report to print the differences.
+
+    python -m benchmarks.bench_e2e --users 4 --docs-per-user 2 --pages 20 \\
+        --languages en,hi,ta --concurrency 8 --requests 200 --output e2e.json
+    python -m benchmarks.bench_e2e ... --compare e2e.json
+
+Only the remote APIs are replaced: embeddings use the configured
+EMBEDDING_BACKEND, so its model must be available locally.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from benchmarks import gemini_stub, sarvam_stub
+from benchmarks.synthetic_pdf import LANGUAGE_WORDS, WORDS, write_pdf
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PHASES = ("search", "ask", "ask-stream", "voice-ask")
+
+QUESTION_TEMPLATES = {
+    "en": "What is the eligibility for {word} under this scheme?",
+    "hi": "इस योजना में {word} के लिए पात्रता क्या है?",
+    "ta": "இந்த திட்டத்தில் {word} தகுதி என்ன?",
+    "bn": "এই প্রকল্পে {word} এর যোগ্যতা কী?"
+}
+
+
+# ==========================================
+# 📊 Summaries
+# ==========================================
+
+def percentiles(values):
+    values = [v for v in values if v is not None]
+
+    if not values:
+        return None
+
+    return {
+        "count": len(values),
+        "mean": round(float(np.mean(values)), 1),
+        "p50": round(float(np.percentile(values, 50)), 1),
+        "p95": round(float(np.percentile(values, 95)), 1),
+        "p99": round(float(np.percentile(values, 99)), 1),
+        "max": round(float(np.max(values)), 1)
+    }
+
+
+def summarize(records, wall_s):
+    ok = [r for r in records if r["ok"]]
+
+    stage_names = sorted({name for r in ok for name in r.get("stages", {})})
+
+    summary = {
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "wall_s": round(wall_s, 2),
+        "throughput_rps": round(len(ok) / wall_s, 2) if wall_s else None,
+        "latency_ms": percentiles([r["ms"] for r in ok]),
+        "stages_ms": {name: percentiles([r["stages"].get(name) for r in ok]) for name in stage_names}
+    }
+
+    for key in sorted({key for r in ok for key in r.get("extra", {})}):
+        values = [r["extra"][key] for r in ok if key in r["extra"]]
+
+        if all(isinstance(v, bool) for v in values):
+            summary[f"{key}_ratio"] = round(sum(values) / len(values), 3)
+        else:
+            summary[f"{key}"] = percentiles(values)
+
+    return summary
+
+
+# ==========================================
+# 🌐 Client Requests
+# ==========================================
+
+_local = threading.local()
+
+
+def session():
+    if getattr(_local, "session", None) is None:
+        _local.session = requests.Session()
+    return _local.session
+
+
+def timed(func):
+    start = time.perf_counter()
+
+    try:
+        record = func() or {}
+        record["ok"] = record.get("ok", True)
+    except Exception as e:
+        record = {"ok": False, "error": str(e)}
+
+    record.setdefault("ms", (time.perf_counter() - start) * 1000)
+    return record
+
+
+def stage_durations(timings):
+    return {name: t["duration_ms"] for name, t in (timings or {}).get("stages", {}).items()}
+
+
+def upload(api_url, doc, poll_seconds):
+    start = time.perf_counter()
+
+    with open(doc["path"], "rb") as f:
+        response = session().post(
+            f"{api_url}/upload",
+            params={"user_id": doc["user_id"], "thread_id": doc["thread_id"]},
+            files={"file": (os.path.basename(doc["path"]), f, "application/pdf")}
+        )
+
+    body = response.json()
+    request_ms = (time.perf_counter() - start) * 1000
+
+    if body.get("status") != "queued":
+        return {"stages": {"request": request_ms}, "extra": {"deduplicated": True}}
+
+    while True:
+        job = session().get(f"{api_url}/upload-status", params={"job_id": body["job_id"]}).json()
+
+        if job["status"] in ("done", "failed"):
+            break
+
+        time.sleep(poll_seconds)
+
+    result = job.get("result") or {}
+
+    return {
+        "ok": job["status"] == "done",
+        "ms": (time.perf_counter() - start) * 1000,
+        "stages": {
+            "request": request_ms,
+            "queued": (job["started_at"] - job["created_at"]) * 1000,
+            "ingest": (job["finished_at"] - job["started_at"]) * 1000
+        },
+        "extra": {
+            "chunks": job["chunks_indexed"],
+            "pages": job["total_pages"],
+            "language_detected": result.get("language") == doc["language"],
+            "deduplicated": False
+        }
+    }
+
+
+def search(api_url, turn, retrieval):
+    response = session().post(f"{api_url}/search", params={
+        "user_id": turn["user_id"], "thread_id": turn["thread_id"],
+        "query": turn["question"], "retrieval": retrieval
+    })
+
+    return {"ok": response.status_code == 200 and "results" in response.json()}
+
+
+def ask(api_url, turn, retrieval):
+    response = session().post(f"{api_url}/ask", params={
+        "user_id": turn["user_id"], "thread_id": turn["thread_id"],
+        "question": turn["question"], "retrieval": retrieval
+    })
+    body = response.json()
+
+    return {
+        "ok": "answer" in body,
+        "stages": stage_durations(body.get("timings")),
+        "extra": {
+            "cached": body.get("cached", False),
+            "prompt_tokens": (body.get("prompt") or {}).get("prompt_tokens")
+        }
+    }
+
+
+def ask_stream(api_url, turn, retrieval):
+    start = time.perf_counter()
+    ttft_ms = None
+    done = None
+    event = None
+
+    with session().post(f"{api_url}/ask-stream", stream=True, params={
+        "user_id": turn["user_id"], "thread_id": turn["thread_id"],
+        "question": turn["question"], "retrieval": retrieval
+    }) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                if event == "token" and ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                elif event == "done":
+                    done = json.loads(line[len("data: "):])
+
+    if done is None:
+        return {"ok": False}
+
+    return {
+        "stages": stage_durations(done.get("timings")),
+        "extra": {"ttft_ms": ttft_ms, "cached": done.get("cached", False)}
+    }
+
+
+def voice_ask(api_url, turn, retrieval):
+    # The Sarvam stand-in ignores the audio; only the upload size matters
+    audio = os.urandom(32 * 1024)
+    name = f"bench_{threading.get_ident()}_{time.monotonic_ns()}.wav"
+
+    response = session().post(
+        f"{api_url}/voice-ask",
+        params={"user_id": turn["user_id"], "thread_id": turn["thread_id"]},
+        files={"audio": (name, audio, "audio/wav")}
+    )
+    body = response.json()
+
+    return {
+        "ok": "answer" in body,
+        "stages": stage_durations(body.get("timings")),
+        "extra": {"cached": body.get("cached", False)}
+    }
+
+
+PHASE_REQUESTS = {"search": search, "ask": ask, "ask-stream": ask_stream, "voice-ask": voice_ask}
+
+
+def run_phase(tasks, concurrency):
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        records = list(executor.map(timed, tasks))
+
+    return records, time.perf_counter() - start
+
+
+# ==========================================
+# 🏗 Workload
+# ==========================================
+
+def make_documents(workdir, args):
+    languages = args.languages.split(",")
+    docs = []
+
+    for user in range(args.users):
+        for n in range(args.docs_per_user):
+            language = languages[(user + n) % len(languages)]
+            path = os.path.join(workdir, f"user{user}_doc{n}_{language}.pdf")
+            write_pdf(path, args.pages, seed=user * 1000 + n, language=language)
+
+            docs.append({
+                "user_id": f"bench_user_{user}",
+                "thread_id": f"bench_thread_{user}",
+                "path": path,
+                "language": language
+            })
+
+    return docs
+
+
+def make_turns(docs, count, repeat_ratio, rng):
+    """
+    Questions in each thread's document languages; a share of them repeat
+    an earlier question of the same thread, as users do.
+    """
+
+    threads = {}
+    for doc in docs:
+        threads.setdefault((doc["user_id"], doc["thread_id"]), []).append(doc["language"])
+
+    keys = list(threads)
+    asked = {}
+    turns = []
+
+    for _ in range(count):
+        key = rng.choice(keys)
+        previous = asked.get(key, [])
+
+        if previous and rng.random() < repeat_ratio:
+            question = rng.choice(previous)
+        else:
+            language = rng.choice(threads[key])
+            words = WORDS if language == "en" else LANGUAGE_WORDS[language][0]
+            question = QUESTION_TEMPLATES[language].format(word=rng.choice(words))
+            asked.setdefault(key, []).append(question)
+
+        turns.append({"user_id": key[0], "thread_id": key[1], "question": question})
+
+    return turns
+
+
+# ==========================================
+# 🚀 Server + Stubs
+# ==========================================
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(workdir, args, gemini_url, sarvam_url):
+    port = free_port()
+    server_dir = os.path.join(workdir, "server")
+    os.makedirs(server_dir)
+
+    env = dict(
+        os.environ,
+        GOOGLE_API_KEY="stub",
+        GEMINI_API_URL=gemini_url,
+        SARVAM_API_KEY="stub",
+        SARVAM_API_URL=sarvam_url,
+        PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")]))
+    )
+
+    log = open(os.path.join(workdir, "server.log"), "w")
+
+    # Relative paths (threads.db, vector_store/, uploads/) land in server_dir
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", args.app, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=server_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+    api_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited during startup, see {log.name}")
+
+        try:
+            requests.get(f"{api_url}/cache-stats", timeout=1)
+            return proc, api_url, time.monotonic() - (deadline - args.startup_timeout)
+        except requests.ConnectionError:
+            time.sleep(0.2)
+
+    proc.terminate()
+    raise SystemExit(f"Server not ready after {args.startup_timeout}s, see {log.name}")
+
+
+# ==========================================
+# 🔁 Comparison
+# ==========================================
+
+def compare(previous, current):
+    print(f"\n{'phase':<12}{'metric':<12}{'before':>10}{'after':>10}{'change':>9}")
+
+    for phase, summary in current["phases"].items():
+        before = previous.get("phases", {}).get(phase)
+        if not before or not before.get("latency_ms") or not summary.get("latency_ms"):
+            continue
+
+        rows = [(p, before["latency_ms"][p], summary["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+        rows.append(("rps", before["throughput_rps"], summary["throughput_rps"]))
+
+        for metric, old, new in rows:
+            change = f"{(new - old) / old:+.0%}" if old else "n/a"
+            print(f"{phase:<12}{metric:<12}{old:>10}{new:>10}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=4, help="one thread per user")
+    parser.add_argument("--docs-per-user", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=20, help="pages per PDF")
+    parser.add_argument("--languages", default="en,hi", help="document languages: en,hi,ta,bn")
+    parser.add_argument("--requests", type=int, default=100, help="requests per query phase")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--phases", default=",".join(PHASES))
+    parser.add_argument("--retrieval", default=None, help="dense, lexical or hybrid (server default if unset)")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="share of repeated questions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-first-token-ms", type=float, default=400.0)
+    parser.add_argument("--gemini-tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--gemini-answer-tokens", type=int, default=200)
+    parser.add_argument("--sarvam-latency-ms", type=float, default=300.0)
+    parser.add_argument("--sarvam-ms-per-char", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 429s from both stubs")
+    parser.add_argument("--app", default="app.main:app")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+
+    _, gemini_url = gemini_stub.start_stub(
+        first_token_ms=args.gemini_first_token_ms,
+        tokens_per_sec=args.gemini_tokens_per_sec,
+        answer_tokens=args.gemini_answer_tokens,
+        error_rate=args.error_rate
+    )
+    _, sarvam_url = sarvam_stub.start_stub(
+        latency_ms=args.sarvam_latency_ms,
+        ms_per_char=args.sarvam_ms_per_char,
+        error_rate=args.error_rate
+    )
+
+    docs = make_documents(workdir, args)
+    proc, api_url, startup_s = start_app(workdir, args, gemini_url, sarvam_url)
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "startup_s": round(startup_s, 2),
+        "phases": {}
+    }
+
+    try:
+        print(f"server ready in {startup_s:.1f}s, workdir {workdir}")
+
+        records, wall_s = run_phase(
+            [lambda doc=doc: upload(api_url, doc, 0.2) for doc in docs],
+            args.upload_concurrency
+        )
+        summary = summarize(records, wall_s)
+        summary["chunks_per_sec"] = round(sum(r["extra"].get("chunks", 0) for r in records if r["ok"]) / wall_s, 1)
+        report["phases"]["upload"] = summary
+
+        for phase in args.phases.split(","):
+            request = PHASE_REQUESTS[phase]
+            turns = make_turns(docs, args.requests, args.repeat_ratio, rng)
+
+            records, wall_s = run_phase(
+                [lambda turn=turn: request(api_url, turn, args.retrieval) for turn in turns],
+                args.concurrency
+            )
+            report["phases"][phase] = summarize(records, wall_s)
+
+        report["server"] = requests.get(f"{api_url}/cache-stats").json()
+
+        # Server-side stage and outbound call histograms (one worker's view)
+        report["metrics_path"] = os.path.join(workdir, "metrics.txt")
+        with open(report["metrics_path"], "w", encoding="utf-8") as f:
+            f.write(requests.get(f"{api_url}/metrics").text)
+
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    report["stubs"] = {
+        "gemini": gemini_stub.stub_stats(),
+        "sarvam_calls": sarvam_stub.SarvamStubHandler.calls
+    }
+
+    for phase, summary in report["phases"].items():
+        latency = summary["latency_ms"] or {}
+        print(f"{phase:<11} n={summary['requests']:<5} errors={summary['errors']:<4} "
+              f"{summary['throughput_rps']:>7} req/s  p50={latency.get('p50')}ms "
+              f"p95={latency.get('p95')}ms p99={latency.get('p99')}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
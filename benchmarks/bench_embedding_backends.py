@@ -0,0 +1,128 @@
+"""
+Embedding backend benchmark.
+
+For each backend (PyTorch sentence-transformers, ONNX fp32, ONNX int8)
+reports, in a fresh subprocess so nothing is already imported or loaded:
+
+  - import time of app.embedding_utils (should not include the model)
+  - first generate_embedding latency, cold and after warm_up()
+  - steady-state batched chunks/sec
+
+and the cosine agreement of each ONNX backend with PyTorch vectors.
+
+    python -m app.embedding_backends export    # once, for the ONNX backends
+    python -m benchmarks.bench_embedding_backends --chunks 1000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_embeddings import make_chunks
+
+BACKENDS = {
+    "pytorch": {"EMBEDDING_BACKEND": "sentence_transformers"},
+    "onnx-fp32": {"EMBEDDING_BACKEND": "onnx", "EMBEDDING_ONNX_INT8": "0"},
+    "onnx-int8": {"EMBEDDING_BACKEND": "onnx", "EMBEDDING_ONNX_INT8": "1"}
+}
+
+
+def run_once(chunk_count, warm, vectors_path):
+    start = time.perf_counter()
+    from app import embedding_utils
+    import_ms = (time.perf_counter() - start) * 1000
+
+    warm_up_ms = 0.0
+    if warm:
+        start = time.perf_counter()
+        embedding_utils.warm_up()
+        warm_up_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    embedding_utils.generate_embedding("What documents are needed for the pension scheme?")
+    first_ms = (time.perf_counter() - start) * 1000
+
+    chunks = make_chunks(chunk_count)
+
+    # The embedding cache is bypassed so only the backend is measured
+    start = time.perf_counter()
+    vectors = embedding_utils._encode(chunks, embedding_utils.DEFAULT_BATCH_SIZE)
+    rate = len(chunks) / (time.perf_counter() - start)
+
+    np.save(vectors_path, vectors)
+
+    print(json.dumps({
+        "backend": embedding_utils.get_backend().name,
+        "import_ms": import_ms,
+        "warm_up_ms": warm_up_ms,
+        "first_request_ms": first_ms,
+        "chunks_per_sec": rate
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--run", nargs=3, metavar=("CHUNKS", "WARM", "VECTORS"))
+    args = parser.parse_args()
+
+    if args.run:
+        run_once(int(args.run[0]), args.run[1] == "1", args.run[2])
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_backends_")
+    vectors = {}
+
+    print(f"{'backend':<11}{'import ms':>11}{'cold first ms':>15}{'warm-up ms':>12}"
+          f"{'warm first ms':>15}{'chunks/sec':>12}")
+
+    for label in args.backends.split(","):
+        results = []
+
+        for warm in ("0", "1"):
+            vectors_path = os.path.join(workdir, f"{label}.npy")
+            env = dict(
+                os.environ,
+                EMBEDDING_CACHE_DIR=os.path.join(workdir, f"cache_{label}_{warm}"),
+                **BACKENDS[label]
+            )
+
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_embedding_backends",
+                 "--run", str(args.chunks), warm, vectors_path],
+                env=env, capture_output=True, text=True
+            )
+
+            if output.returncode:
+                print(f"{label:<11} failed: {output.stderr.strip().splitlines()[-1]}")
+                break
+
+            results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+        else:
+            cold, warm = results
+            vectors[label] = np.load(vectors_path)
+
+            print(f"{label:<11}{cold['import_ms']:>11.0f}{cold['first_request_ms']:>15.0f}"
+                  f"{warm['warm_up_ms']:>12.0f}{warm['first_request_ms']:>15.1f}"
+                  f"{warm['chunks_per_sec']:>12.1f}")
+
+    reference = vectors.get("pytorch")
+
+    for label, onnx_vectors in vectors.items():
+        if label == "pytorch" or reference is None:
+            continue
+
+        # Both sides are unit length, so the row-wise dot is the cosine
+        cosine = (reference * onnx_vectors).sum(axis=1)
+        print(f"{label} vs pytorch cosine: mean={cosine.mean():.4f} min={cosine.min():.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Embedding cache / dedupe benchmark.
+
+Simulates uploads of government PDFs that share boilerplate chunks
+(headers, disclaimers, footers) and re-uploads of the same document, and
+reports model passes saved per upload.
+
+    python -m benchmarks.bench_embedding_cache --uploads 5 --chunks 400
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from app import embedding_utils
+from app.embedding_cache import EmbeddingCache
+
+BOILERPLATE = [
+    "Government of India. Ministry of Rural Development. All rights reserved.",
+    "This document is for information only and does not constitute a legal notice.",
+    "For queries contact the district helpline during office hours.",
+]
+
+
+def make_upload(n, seed):
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(n):
+        if rng.random() < 0.2:
+            chunks.append(rng.choice(BOILERPLATE))
+        else:
+            chunks.append(f"Section {seed}.{i}: eligibility rule {rng.randint(0, 10 ** 6)} for applicants.")
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=400)
+    args = parser.parse_args()
+
+    embedding_utils.embedding_cache = EmbeddingCache(
+        tempfile.mkdtemp(prefix="bench_emb_"),
+        embedding_utils.get_backend().dimension,
+        capacity=50000
+    )
+
+    # Each document is uploaded twice, e.g. into two threads
+    uploads = [make_upload(args.chunks, seed) for seed in range(args.uploads)]
+    uploads = [doc for doc in uploads for _ in range(2)]
+
+    print(f"{'upload':<8}{'chunks':>8}{'encoded':>9}{'saved':>7}{'seconds':>9}")
+
+    for number, chunks in enumerate(uploads, start=1):
+        start = time.perf_counter()
+        _, stats = embedding_utils.generate_embeddings_with_stats(chunks)
+        elapsed = time.perf_counter() - start
+        print(f"{number:<8}{stats['texts']:>8}{stats['encoded']:>9}{stats['passes_saved']:>7}{elapsed:>9.2f}")
+
+    print(embedding_utils.embedding_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
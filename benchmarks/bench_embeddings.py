@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for the embedding path.
+
+Compares the old one-encode-per-chunk loop with batched, length-sorted
+encoding at several batch sizes and prints chunks/sec. The embedding
+cache is bypassed so only model throughput is measured.
+
+    python -m benchmarks.bench_embeddings --chunks 2000
+"""
+
+import argparse
+import random
+import time
+
+from app.embedding_backends import get_backend
+from app.embedding_utils import _encode
+
+WORDS = (
+    "scheme beneficiary land record survey number government order "
+    "district collector application certificate eligibility subsidy "
+    "farmer pension ration card aadhaar village panchayat revenue"
+).split()
+
+
+def make_chunks(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 180)))
+        for _ in range(n)
+    ]
+
+
+def bench_per_chunk(chunks):
+    backend = get_backend()
+    start = time.perf_counter()
+    for chunk in chunks:
+        backend.encode([chunk], 1).tolist()
+    return len(chunks) / (time.perf_counter() - start)
+
+
+def bench_batched(chunks, batch_size):
+    start = time.perf_counter()
+    _encode(chunks, batch_size)
+    return len(chunks) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-sizes", default="8,16,32,64,128")
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+
+    # Warm up once so model/kernel initialisation isn't measured
+    _encode(chunks[:16], 16)
+
+    print(f"{'mode':<20}{'chunks/sec':>12}")
+    print(f"{'per-chunk':<20}{bench_per_chunk(chunks):>12.1f}")
+
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        rate = bench_batched(chunks, batch_size)
+        print(f"{'batch=' + str(batch_size):<20}{rate:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Ingestion throughput / peak memory benchmark.
+
+Generates synthetic PDFs of increasing size and ingests each one with
+the previous whole-document path and with the streaming pipeline. Every
+run happens in a fresh subprocess so ru_maxrss is that run's peak RSS.
+
+    python -m benchmarks.bench_ingest --pages 100,500,2000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_pdf import write_pdf
+
+
+def run_once(mode, pdf_path, base_path):
+    from app import vector_store
+
+    vector_store.BASE_PATH = base_path
+    start = time.perf_counter()
+
+    if mode == "legacy":
+        from app.chunking import chunk_text
+        from app.embedding_utils import generate_embeddings
+        from app.pdf_utils import extract_text_from_pdf
+
+        text = extract_text_from_pdf(pdf_path)
+        chunks = chunk_text(text)
+        embeddings = generate_embeddings(chunks)
+        vector_store.add_embeddings("bench", "legacy", "doc", embeddings, chunks)
+        count = len(chunks)
+    else:
+        from app.ingest import ingest_pdf
+
+        count = ingest_pdf(pdf_path, "bench", "pipeline", "doc")["chunks"]
+
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(json.dumps({"chunks": count, "seconds": elapsed, "peak_rss_mb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", default="100,500,2000")
+    parser.add_argument("--run", nargs=3, metavar=("MODE", "PDF", "BASE"))
+    args = parser.parse_args()
+
+    if args.run:
+        run_once(*args.run)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_ingest_")
+    env = dict(os.environ, EMBEDDING_CACHE_DIR=os.path.join(workdir, "emb_cache"))
+
+    print(f"{'pages':>6} {'mode':<9} {'chunks':>7} {'seconds':>8} {'pages/s':>8} {'peak_rss_mb':>12}")
+
+    for pages in [int(p) for p in args.pages.split(",")]:
+        pdf_path = os.path.join(workdir, f"doc_{pages}.pdf")
+        write_pdf(pdf_path, pages)
+
+        for mode in ("legacy", "pipeline"):
+            # Fresh cache dir per run so neither mode reuses the other's vectors
+            env["EMBEDDING_CACHE_DIR"] = os.path.join(workdir, f"emb_{mode}_{pages}")
+
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_ingest", "--run", mode, pdf_path, os.path.join(workdir, "vs")],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+
+            result = json.loads(output)
+            print(f"{pages:>6} {mode:<9} {result['chunks']:>7} {result['seconds']:>8.1f} "
+                  f"{pages / result['seconds']:>8.1f} {result['peak_rss_mb']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Hybrid retrieval benchmark.
+
+Builds a synthetic thread of government-style chunks, each carrying
+identifiers (GO numbers, survey numbers, scheme codes), through
+add_embeddings in ingestion-sized batches. Reports the BM25 index size
+per 10k chunks, indexing cost, and query latency plus identifier
+recall@k for dense, lexical and hybrid (RRF) retrieval.
+
+    python -m benchmarks.bench_lexical --chunks 50000
+    python -m benchmarks.bench_lexical --chunks 10000 --embed
+
+Without --embed the dense side uses random vectors, so only its latency
+is meaningful; --embed runs the real embedding model for recall numbers.
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app import vector_store
+from app.lexical_index import open_lexical_index
+
+WRITE_BATCH = 1024
+
+WORDS = (
+    "scheme beneficiary eligibility district collector application land "
+    "revenue department order government subsidy farmer pension welfare "
+    "certificate village officer payment installment registration"
+).split()
+
+SCHEMES = ["PM-KISAN", "MGNREGA", "PMAY-G", "NSAP", "KCC", "PMFBY"]
+
+
+def make_chunk(i, rng):
+    go_number = f"G.O.Ms.No.{1000 + i}"
+    survey = f"{rng.integers(1, 999)}/{rng.integers(1, 30)}{'ABCD'[i % 4]}"
+    scheme = f"{SCHEMES[i % len(SCHEMES)]}/{2015 + i % 10}/{i:05d}"
+
+    words = " ".join(rng.choice(WORDS, 60))
+    text = f"As per {go_number}, survey no. {survey} under {scheme}: {words}."
+
+    return text, go_number
+
+
+def build_thread(count, embed):
+    rng = np.random.default_rng(0)
+    chunks, identifiers = zip(*(make_chunk(i, rng) for i in range(count)))
+
+    add_seconds = 0.0
+
+    for start in range(0, count, WRITE_BATCH):
+        batch = list(chunks[start:start + WRITE_BATCH])
+
+        if embed:
+            vectors = embed(batch)
+        else:
+            vectors = rng.standard_normal((len(batch), vector_store.DIMENSION)).astype("float32")
+
+        t0 = time.perf_counter()
+        vector_store.add_embeddings("bench_user", "bench_thread", "doc", vectors, batch)
+        add_seconds += time.perf_counter() - t0
+
+    return identifiers, add_seconds
+
+
+def run_queries(identifiers, mode, embed_query, top_k, sample):
+    latencies = []
+    found = 0
+
+    for target in sample:
+        query = f"What does {identifiers[target]} say?"
+        query_vector = embed_query(query)
+
+        start = time.perf_counter()
+        hits = vector_store.search_hits(
+            "bench_user", "bench_thread", query_vector,
+            top_k=top_k, query_text=query, mode=mode
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        found += any(hit["id"] == target for hit in hits)
+
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), found / len(sample)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embed", action="store_true", help="use the real embedding model")
+    args = parser.parse_args()
+
+    vector_store.BASE_PATH = tempfile.mkdtemp(prefix="bench_lexical_")
+    vector_store.ANN_PROMOTE_THRESHOLD = 0
+
+    if args.embed:
+        from app.embedding_utils import generate_embeddings, generate_embedding
+        embed, embed_query = generate_embeddings, generate_embedding
+    else:
+        rng = np.random.default_rng(1)
+        embed = None
+        embed_query = lambda _: rng.standard_normal(vector_store.DIMENSION).astype("float32")
+
+    build_start = time.perf_counter()
+    identifiers, add_seconds = build_thread(args.chunks, embed)
+    build_seconds = time.perf_counter() - build_start
+
+    lexical = open_lexical_index(vector_store.get_lexical_folder("bench_user", "bench_thread"))
+    stats = lexical.stats()
+
+    print(f"chunks={stats['chunks']} segments={stats['segments']} avg_tokens={stats['avg_length']}")
+    print(f"bm25 index {stats['bytes'] / 1024:.0f} KiB total, "
+          f"{stats['bytes'] / stats['chunks'] * 10000 / 1024 / 1024:.2f} MiB per 10k chunks")
+    print(f"add_embeddings (FAISS + metadata + BM25) {args.chunks / add_seconds:.0f} chunks/sec, "
+          f"build total {build_seconds:.1f}s")
+
+    sample = np.random.default_rng(2).choice(args.chunks, min(args.queries, args.chunks), replace=False)
+
+    for mode in ("dense", "lexical", "hybrid"):
+        p50, p95, recall = run_queries(identifiers, mode, embed_query, args.top_k, sample)
+        note = "" if args.embed or mode == "lexical" else "  (random vectors)"
+        print(f"{mode:<8} p50={p50:6.2f}ms p95={p95:6.2f}ms  identifier recall@{args.top_k}={recall:.2f}{note}")
+
+
+if __name__ == "__main__":
+    main()
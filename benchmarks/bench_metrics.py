@@ -0,0 +1,137 @@
+"""
+Instrumentation overhead benchmark.
+
+Measures what app.metrics adds to a request, with metrics on and off
+(METRICS_ENABLED):
+
+  - ns per Histogram.observe / Counter.inc / timer block
+  - a /ask-shaped StageGraph of 8 trivial stages, per request
+  - MetricsMiddleware around a trivial ASGI app, per request
+  - render() time for a /metrics scrape
+
+    python -m benchmarks.bench_metrics --requests 2000
+
+Stages here do no work, so the per-request difference is the whole
+instrumentation cost; compare it with /ask latencies from bench_e2e.
+"""
+
+import argparse
+import asyncio
+import time
+
+from app import metrics
+from app.stages import StageGraph
+
+# Same shape as build_turn_graph
+ASK_STAGES = [
+    ("translate", []),
+    ("previous_turn", []),
+    ("load_history", ["previous_turn"]),
+    ("embed_query", ["translate"]),
+    ("retrieve", ["translate", "embed_query"]),
+    ("answer_cache", ["embed_query", "retrieve"]),
+    ("load_memory", ["previous_turn"]),
+    ("build_prompt", ["translate", "load_history", "retrieve", "load_memory"])
+]
+
+
+def per_op_ns(func, n):
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        func()
+    return (time.perf_counter_ns() - start) / n
+
+
+def bench_primitives(n, histogram, counter):
+    def timed():
+        with histogram.time("ask", "retrieve"):
+            pass
+
+    return {
+        "observe": per_op_ns(lambda: histogram.observe(0.0042, "ask", "retrieve"), n),
+        "inc": per_op_ns(lambda: counter.inc(120, "answer", "input"), n),
+        "timer": per_op_ns(timed, n)
+    }
+
+
+async def run_graphs(requests):
+    # Coroutine stages keep executor scheduling out of the measurement
+    async def noop(**kwargs):
+        return None
+
+    start = time.perf_counter()
+
+    for _ in range(requests):
+        graph = StageGraph("bench")
+        for name, deps in ASK_STAGES:
+            graph.add(name, noop, deps=deps)
+        await graph.run()
+
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def run_middleware(requests):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    wrapped = metrics.MetricsMiddleware(app)
+    scope = {"type": "http", "path": "/ask"}
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await wrapped(scope, receive, send)
+
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    histogram = metrics.Histogram("bench_seconds", "Benchmark histogram", ["endpoint", "stage"])
+    counter = metrics.Counter("bench_total", "Benchmark counter", ["call", "direction"])
+
+    results = {False: {}, True: {}}
+
+    # Alternate on/off and keep the best round of each, so warm-up and
+    # scheduler noise don't swamp a microsecond difference
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            metrics.METRICS_ENABLED = enabled
+            best = results[enabled]
+
+            for name, value in bench_primitives(args.ops, histogram, counter).items():
+                best[name] = min(best.get(name, value), value)
+
+            for name, bench in (("graph_us", run_graphs), ("middleware_us", run_middleware)):
+                value = asyncio.run(bench(args.requests))
+                best[name] = min(best.get(name, value), value)
+
+    off, on = results[False], results[True]
+
+    print(f"{'':<24}{'off':>10}{'on':>10}")
+    for name in ("observe", "inc", "timer"):
+        print(f"{name + ' (ns/op)':<24}{off[name]:>10.0f}{on[name]:>10.0f}")
+
+    for name, label in (("graph_us", "8-stage graph (us)"), ("middleware_us", "middleware (us)")):
+        print(f"{label:<24}{off[name]:>10.1f}{on[name]:>10.1f}   +{on[name] - off[name]:.1f}us/request")
+
+    start = time.perf_counter()
+    body = metrics.render()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    print(f"render: {len(body.splitlines())} lines in {render_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Prompt size benchmark over recorded conversations.
+
+Replays every user message stored in threads.db and builds the Gemini
+prompt twice: the previous inline template (including the second wrapper
+generate_answer used to add) and app.prompt_builder. Retrieved chunks
+come from the thread's vector store, exactly as /ask would fetch them.
+
+    python -m benchmarks.bench_prompt --db threads.db --record turns.jsonl
+    python -m benchmarks.bench_prompt --replay turns.jsonl
+
+--record saves the gathered turns so later runs (--replay) need neither
+the database nor the embedding model.
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+from app.prompt_builder import build_answer_prompt, estimate_tokens
+
+HISTORY_WINDOW = 6
+
+
+def legacy_prompt(question, memory, summary, messages, hits):
+    memory_text = "\n".join([f"{k}: {v}" for k, v in memory.items()])
+    history_text = "\n".join(
+        [f"{msg['role'].upper()}: {msg['content']}" for msg in messages + [{"role": "user", "content": question}]]
+    )
+    document_context = "\n".join(hit["text"] for hit in hits)
+
+    final_prompt = f"""
+You are an intelligent and personalized AI assistant.
+
+Guidelines:
+- Use structured user memory if relevant.
+- Use document context strictly when answering document-related questions.
+- If no document context is available, rely on conversation and memory.
+- Answer completely and clearly.
+- Never cut responses midway.
+
+User Memory:
+{memory_text}
+
+Conversation Summary:
+{summary}
+
+Recent Conversation:
+{history_text}
+
+Document Context:
+{document_context}
+
+Question:
+{question}
+"""
+
+    # generate_answer wrapped the whole prompt again as "context"
+    return f"""
+    You are a helpful assistant.
+    Explain the following document content in simple language.
+    Provide a detailed and complete answer using all relevant information from the document context.
+    Do not shorten the response.
+
+    Context:
+    {final_prompt}
+
+    Question:
+    {question}
+    """
+
+
+def gather_turns(db_path, top_k):
+    from app.embedding_utils import generate_embedding
+    from app.vector_store import search_hits
+
+    conn = sqlite3.connect(db_path)
+
+    memory = {}
+    for user_id, key, value in conn.execute("SELECT user_id, key, value FROM user_memory"):
+        memory.setdefault(user_id, {})[key] = value
+
+    turns = []
+
+    for thread_id, user_id, summary in conn.execute("SELECT thread_id, user_id, summary FROM threads").fetchall():
+        rows = conn.execute("""
+        SELECT seq, role, content FROM messages
+        WHERE thread_id = ? AND user_id = ? ORDER BY seq
+        """, (thread_id, user_id)).fetchall()
+
+        messages = [{"seq": seq, "role": role, "content": content} for seq, role, content in rows]
+
+        for n, msg in enumerate(messages):
+            if msg["role"] != "user":
+                continue
+
+            hits = search_hits(user_id, thread_id, generate_embedding(msg["content"]), top_k=top_k)
+
+            turns.append({
+                "question": msg["content"],
+                "memory": memory.get(user_id, {}),
+                "summary": summary or "",
+                "messages": messages[max(n - HISTORY_WINDOW + 1, 0):n],
+                "hits": [{k: hit[k] for k in ("id", "doc_id", "text", "distance")} for hit in hits]
+            })
+
+    return turns
+
+
+def measure(build, turns):
+    tokens = []
+    start = time.perf_counter()
+
+    for turn in turns:
+        tokens.append(build(turn))
+
+    elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(turns), 1)
+    return np.array(tokens), elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="threads.db")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--record", help="write the gathered turns to this JSONL file")
+    parser.add_argument("--replay", help="read turns from a JSONL file written by --record")
+    args = parser.parse_args()
+
+    if args.replay:
+        with open(args.replay, encoding="utf-8") as f:
+            turns = [json.loads(line) for line in f if line.strip()]
+    else:
+        turns = gather_turns(args.db, args.top_k)
+
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as f:
+            for turn in turns:
+                f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+
+    if not turns:
+        print("No recorded user turns found")
+        return
+
+    legacy, legacy_ms = measure(
+        lambda t: estimate_tokens(legacy_prompt(t["question"], t["memory"], t["summary"], t["messages"], t["hits"])),
+        turns
+    )
+
+    budgeted_stats = []
+
+    def budgeted(turn):
+        prompt, stats = build_answer_prompt(
+            turn["question"], turn["memory"], turn["summary"], turn["messages"], turn["hits"]
+        )
+        budgeted_stats.append(stats)
+        return stats["prompt_tokens"]
+
+    budgeted_tokens, budgeted_ms = measure(budgeted, turns)
+
+    print(f"turns={len(turns)}")
+    for name, tokens, ms in [("legacy", legacy, legacy_ms), ("budgeted", budgeted_tokens, budgeted_ms)]:
+        print(f"{name:<9} tokens mean={tokens.mean():8.0f} p50={np.percentile(tokens, 50):8.0f} "
+              f"p95={np.percentile(tokens, 95):8.0f} max={tokens.max():8.0f}  build={ms:.2f}ms")
+
+    print(f"input tokens saved: {1 - budgeted_tokens.sum() / legacy.sum():.1%}")
+    print(f"hits merged into neighbours: {sum(s['hits'] - s['passages'] for s in budgeted_stats)}, "
+          f"near-duplicates dropped: {sum(s['duplicates_dropped'] for s in budgeted_stats)}, "
+          f"passages over budget: {sum(s['over_budget_dropped'] for s in budgeted_stats)}")
+
+
+if __name__ == "__main__":
+    main()
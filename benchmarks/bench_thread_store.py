@@ -0,0 +1,105 @@
+"""
+thread_store access benchmark.
+
+Compares ops/sec of the pooled WAL connection manager with the previous
+open-a-connection-per-call pattern, single threaded and with concurrent
+reader threads alongside one writer.
+
+    python -m benchmarks.bench_thread_store --ops 5000 --readers 4
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app import thread_store
+
+
+def legacy_load(thread_id, user_id):
+    conn = sqlite3.connect(thread_store.DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+    SELECT summary, messages FROM threads
+    WHERE thread_id = ? AND user_id = ?
+    """, (thread_id, user_id))
+    row = cursor.fetchone()
+    conn.close()
+    return json.loads(row[1]) if row and row[1] else []
+
+
+def legacy_save(thread_id, user_id, summary, messages):
+    conn = sqlite3.connect(thread_store.DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+    INSERT OR REPLACE INTO threads (thread_id, user_id, summary, messages)
+    VALUES (?, ?, ?, ?)
+    """, (thread_id, user_id, summary, json.dumps(messages)))
+    conn.commit()
+    conn.close()
+
+
+def pooled_load(thread_id, user_id):
+    # The app reads a bounded window of the message log
+    return thread_store.load_thread(thread_id, user_id, limit=6)
+
+
+def pooled_save(thread_id, user_id, summary, messages):
+    # A turn appends its question and answer instead of rewriting the thread
+    thread_store.append_messages(thread_id, user_id, messages[-2:])
+
+
+def run(load, save, ops, readers):
+    messages = [{"role": "user", "content": "hello " * 20}] * 6
+    errors = []
+
+    def reader():
+        try:
+            for i in range(ops):
+                load(f"t{i % 50}", "bench")
+        except sqlite3.OperationalError as e:
+            errors.append(str(e))
+
+    def writer():
+        try:
+            for i in range(ops):
+                save(f"t{i % 50}", "bench", "summary", messages)
+        except sqlite3.OperationalError as e:
+            errors.append(str(e))
+
+    workers = [threading.Thread(target=reader) for _ in range(readers)]
+    workers.append(threading.Thread(target=writer))
+
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    return ops * len(workers) / elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    for name, load, save in [
+        ("open-per-call", legacy_load, legacy_save),
+        ("pooled-wal", pooled_load, pooled_save)
+    ]:
+        thread_store.DB_PATH = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+        thread_store.init_db()
+
+        for readers in (0, args.readers):
+            rate, errors = run(load, save, args.ops, readers)
+            print(f"{name:<14} readers={readers:<3} {rate:>10.0f} ops/sec  locked_errors={len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Time-to-first-token benchmark against a live server.
+
+Compares the time until the user sees anything: full /ask latency versus
+the first `token` event of /ask-stream. Every request uses a new thread,
+so none is answered from the per-thread answer cache.
+
+    python -m benchmarks.bench_ttft --runs 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+import requests
+
+
+def time_ask(api_url, params):
+    start = time.perf_counter()
+    requests.post(f"{api_url}/ask", params=params)
+    return (time.perf_counter() - start) * 1000
+
+
+def time_stream(api_url, params):
+    start = time.perf_counter()
+    first = None
+
+    with requests.post(f"{api_url}/ask-stream", params=params, stream=True) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if first is None and line.startswith("event: token"):
+                first = (time.perf_counter() - start) * 1000
+
+    return first, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--question", default="Explain the eligibility criteria in detail.")
+    args = parser.parse_args()
+
+    run_id = time.time_ns()
+
+    def params(kind, n):
+        return {"user_id": "bench_user", "thread_id": f"ttft_{run_id}_{kind}_{n}", "question": args.question}
+
+    blocking = [time_ask(args.api_url, params("ask", n)) for n in range(args.runs)]
+    streamed = [time_stream(args.api_url, params("stream", n)) for n in range(args.runs)]
+
+    print(f"/ask        first visible text p50={np.median(blocking):8.1f}ms")
+    print(f"/ask-stream first token        p50={np.median([s[0] for s in streamed]):8.1f}ms")
+    print(f"/ask-stream full answer        p50={np.median([s[1] for s in streamed]):8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Local stand-in for the Gemini generateContent / streamGenerateContent
+REST endpoints, for the google-genai client via GEMINI_API_URL.
+
+Answers take a configurable time to the first token and then produce
+tokens at a fixed rate (streamed as SSE chunks for streaming calls), so
+latency and time-to-first-token can be measured offline. Memory
+extraction prompts get "{}" and summarization prompts a short summary.
+
+    python -m benchmarks.gemini_stub --port 8901 --first-token-ms 400 --tokens-per-sec 80
+    GOOGLE_API_KEY=stub GEMINI_API_URL=http://127.0.0.1:8901 uvicorn app.main:app
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER_WORDS = (
+    "the scheme provides financial assistance to eligible beneficiaries "
+    "applicants must submit the certificate to the district office "
+    "within thirty days and the subsidy is paid in installments"
+).split()
+
+# Tokens per SSE chunk, roughly what the real API sends
+TOKENS_PER_CHUNK = 8
+
+
+def classify(prompt):
+    if "memory extraction engine" in prompt:
+        return "memory"
+    if "conversation summarizer" in prompt:
+        return "summary"
+    return "answer"
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    first_token_ms = 400.0
+    tokens_per_sec = 80.0
+    answer_tokens = 200
+    error_rate = 0.0
+    calls = {}
+    prompt_tokens = 0
+    output_tokens = 0
+    calls_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _response(self, text, prompt_tokens, output_tokens, finished):
+        response = {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "index": 0
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens
+            },
+            "modelVersion": "gemini-stub"
+        }
+
+        if finished:
+            response["candidates"][0]["finishReason"] = "STOP"
+
+        return response
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        prompt = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        kind = classify(prompt)
+
+        # Same rough estimate as app.prompt_builder: ~4 chars per token
+        prompt_tokens = max(len(prompt) // 4, 1)
+
+        with GeminiStubHandler.calls_lock:
+            GeminiStubHandler.calls[kind] = GeminiStubHandler.calls.get(kind, 0) + 1
+            GeminiStubHandler.prompt_tokens += prompt_tokens
+
+        if random.random() < self.error_rate:
+            self._reply(429, {"error": {"code": 429, "message": "rate limited", "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        if kind == "memory":
+            tokens = ["{}"]
+        elif kind == "summary":
+            tokens = ["The", " user", " asked", " about", " scheme", " eligibility."]
+        else:
+            rng = random.Random(prompt_tokens)
+            tokens = [f" {rng.choice(ANSWER_WORDS)}" for _ in range(self.answer_tokens)]
+
+        with GeminiStubHandler.calls_lock:
+            GeminiStubHandler.output_tokens += len(tokens)
+
+        if ":streamGenerateContent" in self.path:
+            self._stream(tokens, prompt_tokens)
+        elif ":generateContent" in self.path:
+            time.sleep((self.first_token_ms + 1000 * len(tokens) / self.tokens_per_sec) / 1000)
+            self._reply(200, self._response("".join(tokens).strip(), prompt_tokens, len(tokens), True))
+        else:
+            self._reply(404, {"error": {"code": 404, "message": "unknown endpoint"}})
+
+    def _stream(self, tokens, prompt_tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.first_token_ms / 1000)
+
+        for start in range(0, len(tokens), TOKENS_PER_CHUNK):
+            piece = tokens[start:start + TOKENS_PER_CHUNK]
+
+            if start:
+                time.sleep(len(piece) / self.tokens_per_sec)
+
+            finished = start + TOKENS_PER_CHUNK >= len(tokens)
+            event = self._response("".join(piece), prompt_tokens, start + len(piece), finished)
+            data = f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8")
+
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def stub_stats():
+    with GeminiStubHandler.calls_lock:
+        return {
+            "calls": dict(GeminiStubHandler.calls),
+            "prompt_tokens": GeminiStubHandler.prompt_tokens,
+            "output_tokens": GeminiStubHandler.output_tokens
+        }
+
+
+def start_stub(port=0, first_token_ms=400.0, tokens_per_sec=80.0, answer_tokens=200, error_rate=0.0):
+    """
+    Start the stub in a background thread; returns (server, base_url).
+    """
+
+    GeminiStubHandler.first_token_ms = first_token_ms
+    GeminiStubHandler.tokens_per_sec = tokens_per_sec
+    GeminiStubHandler.answer_tokens = answer_tokens
+    GeminiStubHandler.error_rate = error_rate
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), GeminiStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--first-token-ms", type=float, default=400.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_stub(args.port, args.first_token_ms, args.tokens_per_sec, args.answer_tokens, args.error_rate)
+    print(f"Gemini stub listening on {url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
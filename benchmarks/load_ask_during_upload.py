@@ -0,0 +1,82 @@
+"""
+Load test: /ask latency while /upload runs concurrently.
+
+Runs against a live server. First measures /ask latency alone, then
+again while `--uploaders` clients keep uploading the given PDF into a
+separate thread. With blocking work moved off the event loop, the two
+latency distributions should stay close. Each question goes to a new
+thread, so none is answered from the per-thread answer cache.
+
+    uvicorn app.main:app --workers 1
+    python -m benchmarks.load_ask_during_upload --pdf big.pdf --uploaders 4
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import requests
+
+
+def ask_latencies(api_url, count, stop=None):
+    run_id = time.time_ns()
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        requests.post(
+            f"{api_url}/ask",
+            params={"user_id": "load_user", "thread_id": f"ask_{run_id}_{i}", "question": f"What is the scheme? {i}"}
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def upload_loop(api_url, pdf_path, stop, counter):
+    while not stop.is_set():
+        with open(pdf_path, "rb") as f:
+            requests.post(
+                f"{api_url}/upload",
+                params={"user_id": "load_user", "thread_id": "upload_thread"},
+                files={"file": (os.path.basename(pdf_path), f, "application/pdf")}
+            )
+        counter.append(1)
+
+
+def describe(name, latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{name:<22} p50={p50:8.1f}ms p95={p95:8.1f}ms p99={p99:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--pdf", required=True)
+    parser.add_argument("--asks", type=int, default=30)
+    parser.add_argument("--uploaders", type=int, default=4)
+    args = parser.parse_args()
+
+    describe("/ask idle", ask_latencies(args.api_url, args.asks))
+
+    stop = threading.Event()
+    uploads = []
+    workers = [
+        threading.Thread(target=upload_loop, args=(args.api_url, args.pdf, stop, uploads))
+        for _ in range(args.uploaders)
+    ]
+    for w in workers:
+        w.start()
+
+    time.sleep(1)
+    describe(f"/ask + {args.uploaders} uploaders", ask_latencies(args.api_url, args.asks))
+
+    stop.set()
+    for w in workers:
+        w.join()
+
+    print(f"uploads completed during run: {len(uploads)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Local stand-in for the Sarvam translate / speech-to-text endpoints.
+
+Adds configurable latency and an optional share of 429 responses so the
+client's concurrency and retry behaviour can be measured offline.
+
+    python -m benchmarks.sarvam_stub --port 8900 --latency-ms 300 --error-rate 0.05
+    SARVAM_API_URL=http://127.0.0.1:8900 uvicorn app.main:app
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SarvamStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    latency_ms = 300.0
+    ms_per_char = 0.0
+    error_rate = 0.0
+    calls = 0
+    calls_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+
+        with SarvamStubHandler.calls_lock:
+            SarvamStubHandler.calls += 1
+
+        if random.random() < self.error_rate:
+            self._reply(429, {"error": "rate limited"})
+            return
+
+        if self.path.endswith("/translate"):
+            text = json.loads(raw).get("text", "")
+            time.sleep((self.latency_ms + self.ms_per_char * len(text)) / 1000)
+            self._reply(200, {"translated_text": f"[en] {text}"})
+
+        elif self.path.endswith("/speech-to-text"):
+            time.sleep(self.latency_ms / 1000)
+            self._reply(200, {"text": "What documents are needed for this scheme?"})
+
+        else:
+            self._reply(404, {"error": "unknown endpoint"})
+
+
+def start_stub(port=0, latency_ms=300.0, ms_per_char=0.0, error_rate=0.0):
+    """
+    Start the stub in a background thread; returns (server, base_url).
+    """
+
+    SarvamStubHandler.latency_ms = latency_ms
+    SarvamStubHandler.ms_per_char = ms_per_char
+    SarvamStubHandler.error_rate = error_rate
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), SarvamStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--ms-per-char", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_stub(args.port, args.latency_ms, args.ms_per_char, args.error_rate)
+    print(f"Sarvam stub listening on {url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Multi-process stress test for vector store writes.
+
+Starts several writer processes that add documents to one thread and
+reader processes that search it meanwhile, all sharing one BASE_PATH
+(like uvicorn workers), then checks the thread:
+
+  - no write was lost: ntotal == writers * docs * chunks
+  - every vector id has metadata whose text matches the vector
+  - each document's ranges cover exactly its own chunks
+  - BM25 postings cover every chunk and find each chunk's unique token
+  - readers never saw a committed id without metadata, or a torn index
+
+    python -m benchmarks.stress_vector_store --writers 4 --readers 2 --docs 25
+
+--local-locks disables the cross-process lock in the writers to show
+what the checks catch without it.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+USER_ID = "stress_user"
+THREAD_ID = "stress_thread"
+
+
+def make_doc(writer, doc, chunks):
+    # The first three dimensions say which chunk a vector belongs to
+    rng = np.random.default_rng(writer * 100003 + doc)
+    vectors = rng.standard_normal((chunks, 384)).astype("float32") * 0.1
+    vectors[:, 0] = writer
+    vectors[:, 1] = doc
+    vectors[:, 2] = np.arange(chunks)
+
+    texts = [f"w{writer} d{doc} c{c} tok{writer}x{doc}x{c} scheme order" for c in range(chunks)]
+
+    return vectors, texts
+
+
+def expected_text(vector):
+    w, d, c = (int(round(float(x))) for x in vector[:3])
+    return f"w{w} d{d} c{c} "
+
+
+def check_snapshot(vector_store, index, metadata, rng, samples=20):
+    """
+    Count ids of one snapshot whose metadata is missing or doesn't match.
+    """
+
+    n = index.ntotal
+    ids = sorted({n - 1, *(rng.randrange(n) for _ in range(samples))})
+    rows = metadata.get(ids)
+
+    errors = len(ids) - len(rows)
+
+    for row in rows:
+        vector = vector_store.reconstruct(index, row["id"], row["id"] + 1)[0]
+        errors += not row["text"].startswith(expected_text(vector))
+
+    return errors
+
+
+def run_writer(base_path, writer, docs, chunks, local_locks):
+    from app import vector_store
+
+    vector_store.BASE_PATH = base_path
+
+    if local_locks:
+        vector_store.fcntl = None
+
+    start = time.perf_counter()
+
+    for doc in range(docs):
+        vectors, texts = make_doc(writer, doc, chunks)
+        vector_store.add_embeddings(USER_ID, THREAD_ID, f"w{writer}-d{doc}", vectors, texts)
+
+    print(json.dumps({"seconds": time.perf_counter() - start}))
+
+
+def run_reader(base_path, stop_path):
+    from app import vector_store
+
+    vector_store.BASE_PATH = base_path
+    rng = random.Random(os.getpid())
+
+    snapshots = searches = errors = 0
+    latencies = []
+
+    while not os.path.exists(stop_path):
+        try:
+            index, metadata = vector_store.load_thread_index(USER_ID, THREAD_ID)
+        except Exception:
+            errors += 1
+            continue
+
+        if index is None or not index.ntotal:
+            time.sleep(0.01)
+            continue
+
+        snapshots += 1
+        errors += check_snapshot(vector_store, index, metadata, rng)
+
+        query = np.zeros(384, dtype="float32")
+        i = rng.randrange(index.ntotal)
+        query[:3] = vector_store.reconstruct(index, i, i + 1)[0, :3]
+
+        start = time.perf_counter()
+        try:
+            hits = vector_store.search_hits(
+                USER_ID, THREAD_ID, query, top_k=5, query_text="scheme order", mode="hybrid"
+            )
+        except Exception:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        searches += 1
+
+        # Hits carry the document their text says they belong to
+        for hit in hits:
+            w, d = hit["text"].split()[:2]
+            errors += hit["doc_id"] != f"{w}-{d}"
+
+    print(json.dumps({
+        "snapshots": snapshots,
+        "searches": searches,
+        "errors": errors,
+        "p50_ms": float(np.percentile(latencies, 50)) if latencies else None,
+        "p95_ms": float(np.percentile(latencies, 95)) if latencies else None
+    }))
+
+
+def verify(base_path, writers, docs, chunks):
+    from app import vector_store
+
+    vector_store.BASE_PATH = base_path
+
+    index, metadata = vector_store.load_thread_index(USER_ID, THREAD_ID)
+    expected = writers * docs * chunks
+    problems = []
+
+    if index is None:
+        return ["no index written"]
+
+    if index.ntotal != expected:
+        problems.append(f"ntotal {index.ntotal}, expected {expected} (lost writes)")
+
+    if metadata.count() != index.ntotal:
+        problems.append(f"{metadata.count()} metadata rows for {index.ntotal} vectors")
+
+    vectors = vector_store.reconstruct(index, 0, index.ntotal)
+    rows = metadata.get(range(index.ntotal))
+    mismatched = sum(not row["text"].startswith(expected_text(v)) for row, v in zip(rows, vectors))
+
+    if mismatched:
+        problems.append(f"{mismatched} chunks whose text doesn't match their vector")
+
+    for writer in range(writers):
+        for doc in range(docs):
+            doc_id = f"w{writer}-d{doc}"
+            covered = sum(end - start for start, end in metadata.doc_ranges(doc_id))
+            owned = len(metadata.get_doc(doc_id))
+
+            if covered != chunks or owned != chunks:
+                problems.append(f"{doc_id}: ranges cover {covered}, rows {owned}, expected {chunks}")
+
+    lexical = vector_store.open_lexical_index(vector_store.get_lexical_folder(USER_ID, THREAD_ID))
+
+    if lexical.end != index.ntotal:
+        problems.append(f"BM25 covers {lexical.end} of {index.ntotal} chunks")
+
+    rng = random.Random(0)
+    for row in rng.sample(rows, min(200, len(rows))):
+        token = row["text"].split()[3]
+        found = lexical.search(token, top_k=1)
+
+        if not found or found[0][0] != row["id"]:
+            problems.append(f"BM25 lookup of {token} returned {found}")
+            break
+
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--docs", type=int, default=25, help="documents per writer")
+    parser.add_argument("--chunks", type=int, default=40, help="chunks per document")
+    parser.add_argument("--local-locks", action="store_true", help="writers skip the cross-process lock")
+    parser.add_argument("--writer", nargs=5, metavar=("BASE", "WRITER", "DOCS", "CHUNKS", "LOCAL"))
+    parser.add_argument("--reader", nargs=2, metavar=("BASE", "STOP"))
+    args = parser.parse_args()
+
+    if args.writer:
+        base, writer, docs, chunks, local = args.writer
+        run_writer(base, int(writer), int(docs), int(chunks), local == "1")
+        return
+
+    if args.reader:
+        run_reader(*args.reader)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="stress_vs_")
+    base_path = os.path.join(workdir, "vs")
+    stop_path = os.path.join(workdir, "stop")
+
+    # Keep threads flat so every write goes through the same path
+    env = dict(os.environ, ANN_PROMOTE_THRESHOLD="0")
+    command = [sys.executable, "-m", "benchmarks.stress_vector_store"]
+
+    readers = [
+        subprocess.Popen(command + ["--reader", base_path, stop_path], env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(args.readers)
+    ]
+
+    start = time.perf_counter()
+
+    writers = [
+        subprocess.Popen(
+            command + ["--writer", base_path, str(w), str(args.docs), str(args.chunks),
+                       "1" if args.local_locks else "0"],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        for w in range(args.writers)
+    ]
+
+    failed_writers = 0
+    for proc in writers:
+        out, err = proc.communicate()
+        if proc.returncode:
+            failed_writers += 1
+            print(f"writer failed: {err.strip().splitlines()[-1] if err.strip() else proc.returncode}")
+
+    elapsed = time.perf_counter() - start
+
+    open(stop_path, "w").close()
+    reader_stats = []
+    for proc in readers:
+        out = proc.communicate()[0].strip()
+        if proc.returncode or not out:
+            # A reader that crashed (e.g. on a torn file) is one inconsistency
+            out = json.dumps({"snapshots": 0, "searches": 0, "errors": 1, "p50_ms": None, "p95_ms": None})
+        reader_stats.append(json.loads(out.splitlines()[-1]))
+
+    total_docs = args.writers * args.docs
+    print(f"{args.writers} writers x {args.docs} docs x {args.chunks} chunks in {elapsed:.1f}s "
+          f"({total_docs / elapsed:.1f} adds/sec, {total_docs * args.chunks / elapsed:.0f} chunks/sec)")
+
+    for n, stats in enumerate(reader_stats):
+        print(f"reader {n}: {stats['snapshots']} snapshots, {stats['searches']} hybrid searches "
+              f"(p50={stats['p50_ms'] or 0:.2f}ms p95={stats['p95_ms'] or 0:.2f}ms), "
+              f"{stats['errors']} inconsistencies")
+
+    problems = verify(base_path, args.writers, args.docs, args.chunks)
+    reader_errors = sum(stats["errors"] for stats in reader_stats)
+
+    for problem in problems[:20]:
+        print(f"FAIL {problem}")
+
+    ok = not problems and not reader_errors and not failed_writers
+    print("OK" if ok else "INCONSISTENT")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
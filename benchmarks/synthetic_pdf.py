@@ -0,0 +1,186 @@
+"""
+Dependency-free generator for large synthetic text PDFs.
+
+Writes plain text pages directly in PDF syntax so benchmarks don't need
+reportlab. English uses Helvetica; Indic languages use a Type0 font with
+a ToUnicode map and no embedded glyphs, so viewers may not render them
+but text extraction returns the original Unicode.
+
+    python -m benchmarks.synthetic_pdf out.pdf --pages 500
+    python -m benchmarks.synthetic_pdf out_hi.pdf --pages 50 --language hi
+"""
+
+import argparse
+import random
+
+WORDS = (
+    "scheme beneficiary land record survey number government order district "
+    "collector application certificate eligibility subsidy farmer pension ration "
+    "card village panchayat revenue section clause notification amendment"
+).split()
+
+# Government-notice vocabulary per language, plus its sentence end
+LANGUAGE_WORDS = {
+    "hi": ((
+        "योजना लाभार्थी भूमि अभिलेख सर्वेक्षण संख्या सरकारी आदेश ज़िला कलेक्टर "
+        "आवेदन प्रमाणपत्र पात्रता सब्सिडी किसान पेंशन राशन कार्ड गाँव पंचायत "
+        "राजस्व धारा अधिसूचना संशोधन"
+    ).split(), "।"),
+    "ta": ((
+        "திட்டம் பயனாளி நிலம் பதிவு கணக்கெடுப்பு எண் அரசு ஆணை மாவட்ட ஆட்சியர் "
+        "விண்ணப்பம் சான்றிதழ் தகுதி மானியம் விவசாயி ஓய்வூதியம் குடும்ப அட்டை "
+        "கிராமம் ஊராட்சி வருவாய் பிரிவு அறிவிப்பு திருத்தம்"
+    ).split(), "."),
+    "bn": ((
+        "প্রকল্প সুবিধাভোগী জমি নথি জরিপ নম্বর সরকারি আদেশ জেলা কালেক্টর "
+        "আবেদন শংসাপত্র যোগ্যতা ভর্তুকি কৃষক পেনশন রেশন কার্ড গ্রাম পঞ্চায়েত "
+        "রাজস্ব ধারা বিজ্ঞপ্তি সংশোধনী"
+    ).split(), "।")
+}
+
+LANGUAGES = ("en",) + tuple(LANGUAGE_WORDS)
+
+LINES_PER_PAGE = 45
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_lines(rng, count):
+    lines = []
+    for _ in range(count):
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 9)))
+        lines.append(sentence.capitalize() + ".")
+    return lines
+
+
+def language_lines(language):
+    """
+    A line_source producing sentences in `language` ("hi", "ta", "bn").
+    """
+
+    words, end = LANGUAGE_WORDS[language]
+
+    def make(rng, count):
+        return [
+            " ".join(rng.choice(words) for _ in range(rng.randint(6, 9))) + end
+            for _ in range(count)
+        ]
+
+    return make
+
+
+def _to_unicode_cmap():
+    # Character codes are UTF-16 code units, mapped to themselves
+    ranges = [f"<{hi:02X}00> <{hi:02X}FF> <{hi:02X}00>" for hi in range(256)]
+
+    blocks = []
+    for start in range(0, len(ranges), 100):
+        block = ranges[start:start + 100]
+        blocks.append(f"{len(block)} beginbfrange\n" + "\n".join(block) + "\nendbfrange")
+
+    return "\n".join([
+        "/CIDInit /ProcSet findresource begin",
+        "12 dict begin",
+        "begincmap",
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        "/CMapName /Adobe-Identity-UCS def",
+        "/CMapType 2 def",
+        "1 begincodespacerange",
+        "<0000> <FFFF>",
+        "endcodespacerange",
+        *blocks,
+        "endcmap",
+        "CMapName currentdict /CMap defineresource pop",
+        "end",
+        "end"
+    ]).encode("latin-1")
+
+
+def write_pdf(path, pages, seed=0, line_source=None, language="en"):
+    """
+    Write a PDF with `pages` pages of text. `line_source(rng, count)` can
+    supply custom lines; defaults to random sentences in `language`.
+    Only English is written with Helvetica (Latin-1 only).
+    """
+
+    rng = random.Random(seed)
+    line_source = line_source or (make_lines if language == "en" else language_lines(language))
+    unicode_text = language != "en"
+
+    with open(path, "wb") as f:
+        offsets = []
+
+        def obj(number, body):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+
+        # 1: catalog, 2: pages, 3: font, then (page, content) pairs
+        page_ids = [4 + 2 * i for i in range(pages)]
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+        obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode("latin-1"))
+        # Unicode fonts also need a CID font, its descriptor and a ToUnicode map
+        cid_font, descriptor, to_unicode = (4 + 2 * pages + i for i in range(3))
+
+        if unicode_text:
+            obj(3, (
+                f"<< /Type /Font /Subtype /Type0 /BaseFont /IndicSans /Encoding /Identity-H "
+                f"/DescendantFonts [{cid_font} 0 R] /ToUnicode {to_unicode} 0 R >>"
+            ).encode("latin-1"))
+        else:
+            obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+        for pid in page_ids:
+            lines = line_source(rng, LINES_PER_PAGE)
+            ops = ["BT", "/F1 10 Tf", "14 TL", "50 780 Td"]
+            if unicode_text:
+                ops += [f"<{line.encode('utf-16-be').hex().upper()}> Tj T*" for line in lines]
+            else:
+                ops += [f"({_escape(line)}) Tj T*" for line in lines]
+            ops.append("ET")
+            stream = "\n".join(ops).encode("latin-1", "replace")
+
+            obj(pid, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>"
+            ).encode("latin-1"))
+            obj(pid + 1, f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+
+        if unicode_text:
+            obj(cid_font, (
+                f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /IndicSans "
+                f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                f"/FontDescriptor {descriptor} 0 R /DW 500 /CIDToGIDMap /Identity >>"
+            ).encode("latin-1"))
+            obj(descriptor, (
+                b"<< /Type /FontDescriptor /FontName /IndicSans /Flags 4 /FontBBox [0 -200 1000 800] "
+                b"/ItalicAngle 0 /Ascent 800 /Descent -200 /CapHeight 700 /StemV 80 >>"
+            ))
+            cmap = _to_unicode_cmap()
+            obj(to_unicode, f"<< /Length {len(cmap)} >>\nstream\n".encode("latin-1") + cmap + b"\nendstream")
+
+        xref = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+        f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--language", default="en", choices=LANGUAGES)
+    args = parser.parse_args()
+
+    write_pdf(args.path, args.pages, args.seed, language=args.language)
+    print(f"Wrote {args.pages} {args.language} pages to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
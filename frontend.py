@@ -1,3 +1,6 @@
+import json
+import time
+
 import streamlit as st
 import requests
 
@@ -141,7 +144,10 @@ with st.sidebar:
 
     uploaded_file = st.file_uploader("Upload PDF", type=["pdf"])
 
-    if uploaded_file:
+    # file_uploader keeps the file across reruns; only submit it once
+    if uploaded_file and st.session_state.get("last_upload") != uploaded_file.file_id:
+
+        st.session_state.last_upload = uploaded_file.file_id
 
         files = {"file": uploaded_file}
 
@@ -154,9 +160,45 @@ with st.sidebar:
             files=files
         )
 
-        if response.status_code == 200:
-            st.success("Uploaded successfully")
+        if response.status_code == 200 and response.json().get("deduplicated"):
+            st.success(f"Already ingested, reused {response.json()['chunks_added']} chunks "
+                       f"in {response.json()['elapsed_ms']:.0f} ms")
             st.session_state.documents = fetch_documents(st.session_state.thread_id)
+
+        elif response.status_code == 200 and "job_id" in response.json():
+            job_id = response.json()["job_id"]
+
+            progress = st.progress(0.0, text="Queued...")
+
+            # Poll the ingestion job until it finishes
+            while True:
+                job = requests.get(
+                    f"{API_URL}/upload-status",
+                    params={"job_id": job_id}
+                ).json()
+
+                # Unknown job ids come back without a status
+                if job.get("status") in (None, "done", "failed"):
+                    break
+
+                total = job.get("total_pages") or 0
+                done_pages = job.get("pages_processed") or 0
+                eta = job.get("eta_seconds")
+
+                text = f"{job.get('stage', 'queued').capitalize()}: {done_pages}/{total} pages, {job.get('chunks_indexed', 0)} chunks indexed"
+                if eta is not None:
+                    text += f" (~{eta:.0f}s left)"
+
+                progress.progress(min(done_pages / total, 1.0) if total else 0.0, text=text)
+                time.sleep(1)
+
+            progress.empty()
+
+            if job.get("status") == "done":
+                st.success(f"Uploaded successfully ({job.get('chunks_indexed', 0)} chunks)")
+                st.session_state.documents = fetch_documents(st.session_state.thread_id)
+            else:
+                st.error(job.get("error") or "Upload failed")
         else:
             st.error(response.text)
 
@@ -202,24 +244,45 @@ if user_input:
     })
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
 
-            response = requests.post(
-                f"{API_URL}/ask",
+        stream_info = {}
+
+        def stream_tokens():
+            """
+            Yield answer pieces from /ask-stream (Server-Sent Events).
+            """
+
+            with requests.post(
+                f"{API_URL}/ask-stream",
                 params={
                     "user_id": user_id,
                     "thread_id": st.session_state.thread_id,
                     "question": user_input,
                     "doc_id": doc_id
-                }
-            )
-
-            if response.status_code == 200:
-                answer = response.json()["answer"]
-            else:
-                answer = response.text
-
-            st.write(answer)
+                },
+                stream=True
+            ) as response:
+
+                if response.status_code != 200:
+                    yield response.text
+                    return
+
+                event = None
+
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        data = json.loads(line[len("data:"):])
+                        if event == "token":
+                            yield data["text"]
+                        elif event == "done":
+                            stream_info.update(data)
+
+        answer = st.write_stream(stream_tokens())
+
+        if stream_info.get("ttft_ms") is not None:
+            st.caption(f"First token in {stream_info['ttft_ms']:.0f} ms")
 
     st.session_state.messages.append({
         "role": "assistant",